@@ -0,0 +1,455 @@
+// Console Lightning simulado para o benchmark offline.
+// Reproduz só o DOM que a automação consulta: busca, toasts, abas do
+// console, comboboxes em shadow DOM, formulário de caso, feed/email e
+// transferência de fila. Cada reação da interface leva latenciaUiMs
+// (+ jitter), a busca passa pelo servidor e as opções dos comboboxes
+// levam latenciaComboboxMs para aparecer.
+(function() {
+    'use strict';
+
+    const CONFIG = window.MOCK_CONFIG || {};
+    const CLIENTES = CONFIG.clientes || {};
+    const CPFS = CONFIG.cpfs || {};
+
+    const conteudo = document.getElementById('conteudo');
+    const tabBar = document.querySelector('.tabBar');
+    const modais = document.getElementById('modais');
+    const toasts = document.getElementById('toasts');
+
+    const TIPOS_REGISTRO = ['Informação', 'Conta Bemol', 'Reclamação'];
+
+    const PICKLISTS = {
+        'Motivo do contato': ['Informação', 'Reclamação', 'Solicitação', 'Elogio'],
+        'Origem do caso': ['Telefone', 'Email', 'Chat', 'WhatsApp'],
+        'Unidade de registro': ['Matriz', 'Filial Centro', 'Filial Norte'],
+        'SAC responsável': ['SAC 1', 'SAC 2'],
+        'Status do caso': ['Novo', 'Em andamento', 'Concluído'],
+        'Assunto': ['Acesso ao app', 'Boleto', 'Cartão', 'Cashback', 'Cobrança', 'Conta digital',
+                    'Empréstimo', 'Limite', 'Pix', 'Senha', 'Atualização de número de telefone', 'Outros'],
+        'Sistema Operacional': ['Android', 'iOS', 'Outro'],
+        'Categoria': ['Cadastro', 'Financeiro', 'Segurança', 'Produto', 'Atendimento', 'Dados pessoais'],
+        'Subcategoria': null  // depende da Categoria
+    };
+
+    const FILAS = ['CAB - Atendimento', 'CAB - Conta Bemol', 'CAB - Retenção', 'Ouvidoria', 'Suporte N2'];
+    // Mostradas antes da busca responder, como as filas recentes do Lightning
+    const FILAS_RECENTES = ['Ouvidoria', 'Suporte N2', 'CAB - Atendimento'];
+
+    function latencia(base) {
+        return (base === undefined ? CONFIG.latenciaUiMs || 0 : base) + Math.random() * (CONFIG.jitterMs || 0);
+    }
+
+    function depois(fn, base) {
+        setTimeout(fn, latencia(base));
+    }
+
+    function el(tag, attrs, filhos) {
+        const node = document.createElement(tag);
+        for (const [k, v] of Object.entries(attrs || {})) node.setAttribute(k, v);
+        for (const f of [].concat(filhos === undefined ? [] : filhos)) {
+            node.append(f);
+        }
+        return node;
+    }
+
+    function toast(tipo, mensagem) {
+        const classe = tipo === 'error' ? 'slds-theme--error' : 'success slds-theme_success';
+        const t = el('div', {class: 'forceToastMessage ' + classe, role: 'alert'},
+                     el('span', {class: 'toastMessage'}, mensagem));
+        toasts.append(t);
+        setTimeout(() => t.remove(), CONFIG.toastMs || 3000);
+    }
+
+    // ---- $A: eventos de navegação e aura:locationChange ----
+    const handlers = {};
+
+    function eventoAura(acao) {
+        let params = {};
+        return {
+            setParams: (p) => { params = p; },
+            fire: () => setTimeout(() => acao(params), 0)
+        };
+    }
+
+    window.$A = {
+        eventService: {
+            addHandler: (c) => { (handlers[c.event] = handlers[c.event] || []).push(c.handler); },
+            removeHandler: (c) => {
+                handlers[c.event] = (handlers[c.event] || []).filter(h => h !== c.handler);
+            }
+        },
+        get: (nome) => {
+            if (nome === 'e.force:navigateToSObject') {
+                return eventoAura(p => navegar(`/lightning/r/Account/${p.recordId}/view`));
+            }
+            if (nome === 'e.force:navigateToURL') return eventoAura(p => navegar(p.url));
+            return null;
+        }
+    };
+
+    // ---- Rotas e abas do console ----
+    // Como no console, as abas voltam depois de recarregar a página, mas com
+    // outro tabid (e outro aria-controls)
+    const abas = new Map();  // id do registro -> {nome, tabid}
+    let contadorAbas = Math.floor(Math.random() * 1000) * 100;
+    for (const [id, nome] of JSON.parse(sessionStorage.getItem('sfaMockAbas') || '[]')) {
+        abas.set(id, {nome: nome, tabid: 'ctab' + (++contadorAbas)});
+    }
+
+    function idDaUrl(caminho) {
+        const partes = caminho.split('/lightning/r/')[1];
+        return partes ? partes.split('/')[1] : null;
+    }
+
+    function navegar(url) {
+        if (url !== location.pathname) history.pushState({}, '', url);
+        conteudo.innerHTML = '';
+        modais.innerHTML = '';
+        depois(renderizar);
+    }
+
+    function renderizar() {
+        const caminho = location.pathname;
+        conteudo.innerHTML = '';
+        modais.innerHTML = '';
+
+        if (caminho.startsWith('/lightning/r/')) {
+            paginaRegistro(idDaUrl(caminho));
+        } else if (caminho.startsWith('/lightning/page/home')) {
+            paginaInicio();
+        } else if (caminho.startsWith('/lightning/o/Case/new')) {
+            conteudo.append(formularioCaso());
+        } else {
+            conteudo.append(el('p', {}, 'Página não simulada'));
+        }
+
+        atualizarAbas();
+        // Telemetria a cada troca de rota, como os beacons do Lightning
+        new Image().src = '/mock/recursos/InstrumentationBeacon.gif?rota=' + encodeURIComponent(caminho);
+        for (const h of (handlers['aura:locationChange'] || []).slice()) {
+            try { h(); } catch (e) {}
+        }
+    }
+
+    function atualizarAbas() {
+        sessionStorage.setItem('sfaMockAbas', JSON.stringify(Array.from(abas, ([id, aba]) => [id, aba.nome])));
+        tabBar.innerHTML = '';
+        const atual = idDaUrl(location.pathname);
+
+        for (const [id, aba] of abas) {
+            const link = el('a', {
+                role: 'tab', href: `/lightning/r/Account/${id}/view`,
+                'aria-controls': aba.tabid, 'aria-selected': String(id === atual)
+            }, aba.nome);
+            const fechar = el('button', {title: `Fechar ${aba.nome}`}, '×');
+            fechar.addEventListener('click', () => {
+                abas.delete(id);
+                if (id === idDaUrl(location.pathname)) navegar('/lightning/page/home');
+                else atualizarAbas();
+            });
+            tabBar.append(el('li', {'data-tabid': aba.tabid}, [link, fechar]));
+        }
+    }
+
+    // Links do app trocam a rota sem recarregar, como no Lightning
+    document.addEventListener('click', (e) => {
+        const link = e.target.closest && e.target.closest('a[href^="/lightning/"]');
+        if (!link) return;
+        e.preventDefault();
+        navegar(link.getAttribute('href'));
+    });
+
+    window.addEventListener('popstate', renderizar);
+
+    // ---- Início e busca ----
+    function paginaInicio() {
+        const input = el('input', {name: 'inputSearch', type: 'search', placeholder: 'Buscar CPF/CLI'});
+        const botao = el('button', {class: 'slds-button slds-button_brand', title: 'Submit'}, 'Buscar');
+        const resultados = el('div', {class: 'searchResults resultados'});
+
+        botao.addEventListener('click', () => buscar(input.value, resultados));
+        conteudo.append(el('div', {class: 'campo'}, [input, botao]), resultados);
+    }
+
+    async function buscar(texto, resultados) {
+        resultados.innerHTML = '';
+        toasts.innerHTML = '';
+
+        const cpf = texto.split('').filter(c => c >= '0' && c <= '9').join('');
+        const resposta = await fetch('/api/buscar?cpf=' + encodeURIComponent(cpf));
+        const dados = await resposta.json();
+
+        if (dados.tipo === 'resultado') {
+            resultados.append(el('a', {href: `/lightning/r/Account/${dados.id}/view`, class: 'slds-p-around_small'}, dados.nome));
+        } else {
+            toast('error', dados.tipo === 'invalid' ? 'CPF inválido' : 'Cliente não encontrado');
+        }
+    }
+
+    // ---- Registro do cliente ----
+    function paginaRegistro(id) {
+        const nome = CLIENTES[id] || id;
+        if (!abas.has(id)) abas.set(id, {nome: nome, tabid: 'ctab' + (++contadorAbas)});
+
+        // O CPF fica nos destaques, como no layout da conta
+        const cpf = CPFS[id] || '';
+        const destaque = el('records-highlights2', {}, [
+            el('h1', {}, nome),
+            el('p', {}, cpf && `CPF ${cpf.slice(0, 3)}.${cpf.slice(3, 6)}.${cpf.slice(6, 9)}-${cpf.slice(9)}`)
+        ]);
+        const painel = el('div', {class: 'painel'});
+        const subabas = el('div', {class: 'subtabs'});
+
+        for (const [atributo, valor, texto, abrir] of [
+            ['data-tab-value', 'flexipage_tab3', 'Casos', painelCasos],
+            ['data-tab-value', 'feedTab', 'Feed', painelFeed],
+            ['data-tab-name', 'Pendente cliente', 'Pendente cliente', painelPendente]
+        ]) {
+            const link = el('a', {[atributo]: valor, tabindex: '0'}, texto);
+            link.addEventListener('click', () => depois(() => {
+                painel.innerHTML = '';
+                abrir(painel);
+            }));
+            subabas.append(link);
+        }
+
+        conteudo.append(destaque, subabas, painel);
+    }
+
+    function painelCasos(painel) {
+        const criar = el('button', {name: 'NewCase', class: 'slds-button'}, 'Criar');
+        criar.addEventListener('click', () => depois(abrirModalCaso));
+        painel.append(el('h2', {}, 'Casos (0)'), criar);
+    }
+
+    function abrirModalCaso() {
+        modais.innerHTML = '';
+        const modal = el('div', {class: 'slds-modal', role: 'dialog'});
+        modais.append(el('div', {class: 'slds-backdrop'}), modal);
+
+        modal.append(el('h2', {}, 'Novo Caso: selecionar um tipo de registro'));
+        TIPOS_REGISTRO.forEach((tipo, i) => {
+            const id = 'tipo-registro-' + i;
+            modal.append(el('div', {class: 'campo'}, [
+                el('input', {type: 'radio', name: 'recordType', id: id, value: tipo}),
+                el('label', {for: id}, tipo)
+            ]));
+        });
+
+        const avancar = el('button', {class: 'slds-button slds-button_brand'}, 'Avançar');
+        avancar.addEventListener('click', () => {
+            if (!modal.querySelector('input[name="recordType"]:checked')) return;
+            depois(() => {
+                modal.innerHTML = '';
+                modal.append(formularioCaso());
+            });
+        });
+        modal.append(avancar);
+    }
+
+    // ---- Formulário de caso ----
+    function formularioCaso() {
+        const form = el('div', {class: 'formularioCaso'});
+        form.append(el('h2', {}, 'Novo Caso'));
+        form.append(el('div', {class: 'campo'}, [el('label', {}, 'Descrição'), el('textarea', {name: 'Description', rows: '4'})]));
+
+        const combos = {};
+        for (const label of Object.keys(PICKLISTS)) {
+            combos[label] = combobox(label, PICKLISTS[label] ||
+                (() => combos['Categoria'].valor ? [1, 2, 3, 4, 5, 6].map(n => `${combos['Categoria'].valor} - ${n}`) : []));
+            form.append(combos[label].host);
+        }
+
+        form.append(el('div', {class: 'campo'}, [el('label', {}, 'Verificar em'), el('input', {name: 'CheckIn__c', type: 'text'})]));
+        form.append(el('div', {class: 'campo'}, checkboxNotificacao()));
+
+        const salvar = el('button', {name: 'SaveEdit', class: 'slds-button slds-button_brand'}, 'Salvar');
+        salvar.addEventListener('click', () => depois(() => {
+            modais.innerHTML = '';
+            if (form.isConnected) form.remove();
+            toast('success', 'Caso criado.');
+        }));
+        form.append(salvar);
+        return form;
+    }
+
+    let contadorListbox = 0;
+
+    // lightning-combobox: botão e listbox dentro de um shadow root, opções
+    // renderizadas só depois de abrir (dependentes podem vir vazias)
+    function combobox(label, opcoes) {
+        const host = el('lightning-combobox', {class: 'campo'});
+        const raiz = host.attachShadow({mode: 'open'});
+        const idLista = 'listbox-' + (++contadorListbox);
+        const estado = {host: host, valor: null};
+
+        const rotulo = el('label', {}, label);
+        const valor = el('span', {class: 'slds-truncate'}, '--Nenhum--');
+        const botao = el('button', {
+            role: 'combobox', 'aria-label': label, 'aria-controls': idLista,
+            'aria-expanded': 'false', 'aria-haspopup': 'listbox'
+        }, valor);
+        const lista = el('div', {role: 'listbox', id: idLista, style: 'display: none; border: 1px solid #ccc;'});
+
+        function fechar() {
+            lista.style.display = 'none';
+            lista.innerHTML = '';
+            botao.setAttribute('aria-expanded', 'false');
+        }
+
+        function escolher(texto) {
+            estado.valor = texto;
+            valor.textContent = texto;
+            fechar();
+            host.dispatchEvent(new CustomEvent('change', {bubbles: true, composed: true, detail: {value: texto}}));
+        }
+
+        botao.addEventListener('click', () => {
+            if (botao.getAttribute('aria-expanded') === 'true') {
+                fechar();
+                return;
+            }
+            botao.setAttribute('aria-expanded', 'true');
+            lista.style.display = 'block';
+            depois(() => {
+                if (botao.getAttribute('aria-expanded') !== 'true') return;
+                const textos = typeof opcoes === 'function' ? opcoes() : opcoes;
+                if (!textos.length) return;
+                for (const texto of ['--Nenhum--'].concat(textos)) {
+                    const opcao = el('div', {role: 'option', 'data-value': texto.toLowerCase().split(' ').join('_')},
+                                     el('span', {class: 'slds-truncate', title: texto}, texto));
+                    opcao.addEventListener('click', () => escolher(texto));
+                    lista.append(opcao);
+                }
+            }, CONFIG.latenciaComboboxMs || 0);
+        });
+
+        raiz.append(rotulo, botao, lista);
+        return estado;
+    }
+
+    // lightning-input de checkbox: input real dois shadow roots abaixo
+    function checkboxNotificacao() {
+        const titulo = 'Enviar notificação por email';
+        const host = el('lightning-input', {title: titulo, checked: ''});
+        const primitivo = document.createElement('lightning-primitive-input-checkbox');
+        const caixa = el('input', {type: 'checkbox'});
+        caixa.checked = true;
+        primitivo.attachShadow({mode: 'open'}).append(caixa, el('label', {}, titulo));
+        host.attachShadow({mode: 'open'}).append(primitivo);
+        return host;
+    }
+
+    // ---- Feed e email ----
+    function painelFeed(painel) {
+        const email = el('a', {tabindex: '0'}, el('span', {class: 'title'}, 'Email'));
+        email.addEventListener('click', () => depois(() => {
+            const antigo = painel.querySelector('.composer');
+            if (antigo) antigo.remove();
+            painel.append(composerEmail());
+        }));
+        painel.append(el('div', {class: 'subtabs'}, [el('span', {class: 'title'}, 'Publicar'), email]));
+    }
+
+    function composerEmail() {
+        const composer = el('div', {class: 'composer'});
+        const modelo = el('a', {class: 'select', role: 'combobox', tabindex: '0'}, 'Modelo de email');
+        const campos = el('div', {class: 'camposEmail'});
+
+        modelo.addEventListener('click', () => depois(() => {
+            if (composer.querySelector('ul[role="presentation"]')) return;
+            const menu = el('ul', {role: 'presentation'});
+            for (let i = 1; i <= 6; i++) {
+                const item = el('a', {tabindex: '0'}, `Modelo ${i}`);
+                item.addEventListener('click', () => {
+                    menu.remove();
+                    modelo.textContent = `Modelo ${i}`;
+                    depois(() => preencherCamposEmail(campos, composer));
+                });
+                menu.append(el('li', {}, item));
+            }
+            composer.insertBefore(menu, campos);
+        }));
+
+        composer.append(modelo, campos);
+        return composer;
+    }
+
+    function preencherCamposEmail(campos, composer) {
+        campos.innerHTML = '';
+
+        // O editor real é um <body> editável; criado pela DOM ele pode ficar dentro do composer
+        const corpo = document.createElement('body');
+        corpo.setAttribute('role', 'textbox');
+        corpo.setAttribute('contenteditable', 'true');
+
+        const enviar = el('button', {class: 'slds-button'}, el('span', {class: 'label bBody'}, 'Enviar'));
+        enviar.addEventListener('click', () => depois(() => {
+            composer.remove();
+            toast('success', 'Email enviado.');
+        }));
+
+        campos.append(
+            el('div', {class: 'campo'}, el('input', {role: 'combobox', 'aria-autocomplete': 'list', placeholder: 'Para'})),
+            el('div', {class: 'campo'}, el('input', {type: 'text', placeholder: 'Insira o assunto...'})),
+            corpo,
+            enviar
+        );
+    }
+
+    // ---- Pendente cliente e transferência de fila ----
+    function painelPendente(painel) {
+        const marcar = el('a', {tabindex: '0'}, el('span', {class: 'uiOutputText'}, 'Marcar Status do caso como concluído'));
+        marcar.addEventListener('click', () => depois(() => {
+            if (!painel.querySelector('.transferencia')) painel.append(transferenciaFila());
+        }));
+        painel.append(marcar);
+    }
+
+    function transferenciaFila() {
+        const bloco = el('div', {class: 'transferencia'});
+        const busca = el('input', {type: 'search', placeholder: 'Pesquisar Filas...'});
+        const opcoes = el('div', {role: 'listbox'});
+        const transferir = el('button', {class: 'slds-button slds-button_brand'}, 'Transferir Fila');
+        transferir.disabled = true;
+
+        function listar(filas) {
+            opcoes.innerHTML = '';
+            for (const fila of filas) {
+                const opcao = el('div', {role: 'option'}, fila);
+                opcao.addEventListener('click', () => {
+                    opcoes.querySelectorAll('[aria-selected]').forEach(o => o.removeAttribute('aria-selected'));
+                    opcao.setAttribute('aria-selected', 'true');
+                    transferir.disabled = false;
+                });
+                opcoes.append(opcao);
+            }
+        }
+
+        // As recentes ficam na lista até a busca responder
+        listar(FILAS_RECENTES);
+        let pendente = null;
+        busca.addEventListener('input', () => {
+            clearTimeout(pendente);
+            pendente = setTimeout(() => {
+                const termo = busca.value.trim().toLowerCase();
+                listar(FILAS.filter(f => termo && f.toLowerCase().includes(termo)));
+            }, latencia());
+        });
+
+        transferir.addEventListener('click', () => depois(() => {
+            const confirmar = el('button', {title: 'Transferir', class: 'slds-button'}, 'Transferir');
+            confirmar.addEventListener('click', () => depois(() => {
+                confirmar.remove();
+                bloco.remove();
+                toast('success', 'Caso transferido.');
+            }));
+            modais.append(confirmar);
+        }));
+
+        bloco.append(busca, opcoes, transferir);
+        return bloco;
+    }
+
+    renderizar();
+})();
@@ -0,0 +1,236 @@
+"""
+Servidor do console Lightning simulado (benchmark offline).
+
+Serve as páginas de benchmark/mock em localhost com latência configurável:
+- /verificacao: página de verificação do MFA (código TOTP de SEGREDO_TOTP_MOCK)
+- /lightning/...: console de uma página só (busca, registro, caso, email, fila)
+- /api/buscar?cpf=: resposta da busca, com a latência de rede
+- /mock/recursos/...: imagem, fonte e beacon de enchimento (o que o perfil
+  headless bloqueia), com o tamanho de RECURSOS_ENCHIMENTO
+- /lightning/...?captura=ARQUIVO: snapshot do --capturar-dom no caminho
+  original (replay_dom.py), quando o servidor tem pasta_capturas
+
+Uso avulso (para abrir no navegador):
+    python benchmark/mock_console.py --porta 8765 --latencia 150
+"""
+
+import argparse
+import base64
+import html
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import main  # noqa: E402
+
+DIR_MOCK = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mock")
+
+# Segredo base32 só do mock: o benchmark o passa em SF_TOTP_SECRET
+SEGREDO_TOTP_MOCK = "JBSWY3DPEHPK3PXPJBSWY3DP"
+
+ARQUIVOS_ESTATICOS = {
+    '/mock/console.js': ('console.js', 'application/javascript; charset=utf-8'),
+    '/mock/console.css': ('console.css', 'text/css; charset=utf-8'),
+}
+
+# Extensão -> (bytes, tipo): só o tamanho importa, o conteúdo é enchimento
+RECURSOS_ENCHIMENTO = {
+    '.png': (48 * 1024, 'image/png'),
+    '.woff2': (72 * 1024, 'font/woff2'),
+    '.gif': (43, 'image/gif'),
+}
+
+NOMES_CLIENTES = [
+    "Maria Souza", "João Oliveira", "Ana Pereira", "Carlos Lima", "Fernanda Costa",
+    "Paulo Ribeiro", "Juliana Alves", "Ricardo Gomes", "Beatriz Martins", "Lucas Rocha",
+]
+
+PAGINA_VERIFICACAO = """<!DOCTYPE html>
+<html lang="pt-BR">
+<head><meta charset="utf-8"><title>Verificar sua identidade</title></head>
+<body>
+<h1>Verificar sua identidade</h1>
+<p>Digite o código do seu aplicativo autenticador.</p>
+%s
+<form method="post" action="/verificacao">
+    <label for="tc">Código de verificação</label>
+    <input id="tc" name="tc" type="text" autocomplete="one-time-code" maxlength="6">
+    <input id="save" type="submit" value="Verificar">
+</form>
+</body>
+</html>
+"""
+
+
+def gerar_cpf(n):
+    """CPF válido e determinístico a partir de um número"""
+    base = [int(d) for d in f"{n:09d}"[-9:]]
+    for pesos in (range(10, 1, -1), range(11, 1, -1)):
+        soma = sum(d * p for d, p in zip(base, pesos))
+        base.append(soma * 10 % 11 % 10)
+    return ''.join(map(str, base))
+
+
+def gerar_clientes(quantidade):
+    """cpf -> {id, nome} dos clientes que a busca do mock encontra"""
+    return {
+        gerar_cpf(100000000 + n * 7919): {
+            'id': f"001{n + 1:015d}",
+            'nome': NOMES_CLIENTES[n % len(NOMES_CLIENTES)],
+        }
+        for n in range(quantidade)
+    }
+
+
+def codigo_totp_valido(codigo):
+    """Aceita o código da janela atual e das vizinhas (relógio levemente fora)"""
+    chave = base64.b32decode(SEGREDO_TOTP_MOCK)
+    agora = time.time()
+    return any(main.gerar_totp(chave, agora + d * main.TOTP_PASSO_S) == codigo for d in (-1, 0, 1))
+
+
+class ServidorMock(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, endereco, latencia_ms=0, jitter_ms=0, latencia_combobox_ms=30, clientes=None,
+                 pasta_capturas=None):
+        super().__init__(endereco, HandlerMock)
+        self.pasta_capturas = pasta_capturas
+        self.latencia_ms = latencia_ms
+        self.jitter_ms = jitter_ms
+        self.latencia_combobox_ms = latencia_combobox_ms
+        self.clientes = clientes if clientes is not None else gerar_clientes(20)
+
+    @property
+    def url_base(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def config_js(self):
+        config = {
+            'latenciaUiMs': self.latencia_ms,
+            'latenciaComboboxMs': self.latencia_combobox_ms,
+            'jitterMs': self.jitter_ms,
+            'toastMs': 3000,
+            'clientes': {c['id']: c['nome'] for c in self.clientes.values()},
+            'cpfs': {c['id']: cpf for cpf, c in self.clientes.items()},
+        }
+        return f"window.MOCK_CONFIG = {json.dumps(config, ensure_ascii=False)};\n"
+
+
+class HandlerMock(BaseHTTPRequestHandler):
+
+    def log_message(self, formato, *args):
+        pass
+
+    def _latencia_rede(self):
+        servidor = self.server
+        if servidor.latencia_ms or servidor.jitter_ms:
+            time.sleep((servidor.latencia_ms + random.random() * servidor.jitter_ms) / 1000)
+
+    def _responder(self, corpo, tipo='text/html; charset=utf-8', status=200):
+        dados = corpo.encode('utf-8') if isinstance(corpo, str) else corpo
+        self.send_response(status)
+        self.send_header('Content-Type', tipo)
+        self.send_header('Content-Length', str(len(dados)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def _redirecionar(self, destino):
+        self.send_response(303)
+        self.send_header('Location', destino)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        caminho = url.path
+        self._latencia_rede()
+
+        if caminho == '/':
+            self._redirecionar('/verificacao')
+        elif caminho == '/verificacao':
+            self._responder(PAGINA_VERIFICACAO % '')
+        elif caminho == '/mock/config.js':
+            self._responder(self.server.config_js(), 'application/javascript; charset=utf-8')
+        elif caminho in ARQUIVOS_ESTATICOS:
+            nome, tipo = ARQUIVOS_ESTATICOS[caminho]
+            with open(os.path.join(DIR_MOCK, nome), 'rb') as f:
+                self._responder(f.read(), tipo)
+        elif caminho.startswith('/mock/recursos/'):
+            tamanho, tipo = RECURSOS_ENCHIMENTO.get(os.path.splitext(caminho)[1], (0, 'application/octet-stream'))
+            self._responder(bytes(tamanho), tipo)
+        elif caminho == '/api/buscar':
+            cpf = urllib.parse.parse_qs(url.query).get('cpf', [''])[0]
+            if not main.validar_cpf(cpf):
+                resposta = {'tipo': 'invalid'}
+            elif cpf in self.server.clientes:
+                resposta = dict(self.server.clientes[cpf], tipo='resultado')
+            else:
+                resposta = {'tipo': 'not_found'}
+            self._responder(json.dumps(resposta), 'application/json')
+        elif caminho.startswith('/lightning/'):
+            captura = urllib.parse.parse_qs(url.query).get('captura', [''])[0]
+            if captura and self.server.pasta_capturas:
+                # Só o nome do arquivo: nada fora da pasta de capturas
+                arquivo = os.path.join(self.server.pasta_capturas, os.path.basename(captura))
+            else:
+                arquivo = os.path.join(DIR_MOCK, 'console.html')
+            if not os.path.isfile(arquivo):
+                self._responder('Captura não encontrada', 'text/plain; charset=utf-8', 404)
+                return
+            with open(arquivo, 'rb') as f:
+                self._responder(f.read())
+        else:
+            self._responder('Não encontrado', 'text/plain; charset=utf-8', 404)
+
+    def do_POST(self):
+        caminho = urllib.parse.urlsplit(self.path).path
+        tamanho = int(self.headers.get('Content-Length') or 0)
+        campos = urllib.parse.parse_qs(self.rfile.read(tamanho).decode('utf-8'))
+        self._latencia_rede()
+
+        if caminho != '/verificacao':
+            self._responder('Não encontrado', 'text/plain; charset=utf-8', 404)
+        elif codigo_totp_valido(campos.get('tc', [''])[0].strip()):
+            self._redirecionar('/lightning/page/home')
+        else:
+            erro = '<p class="erro">%s</p>' % html.escape("Código inválido. Tente novamente.")
+            self._responder(PAGINA_VERIFICACAO % erro)
+
+
+def iniciar_servidor(porta=0, **config):
+    """Sobe o servidor em uma thread e devolve-o (url em servidor.url_base)"""
+    servidor = ServidorMock(('127.0.0.1', porta), **config)
+    threading.Thread(target=servidor.serve_forever, name="mock-console", daemon=True).start()
+    return servidor
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Console Lightning simulado")
+    parser.add_argument('--porta', type=int, default=8765)
+    parser.add_argument('--latencia', type=int, default=150, metavar='MS',
+                        help="Latência de cada resposta e reação da interface (padrão: 150)")
+    parser.add_argument('--jitter', type=int, default=50, metavar='MS',
+                        help="Variação aleatória somada à latência (padrão: 50)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    servidor = iniciar_servidor(args.porta, latencia_ms=args.latencia, jitter_ms=args.jitter)
+    main.log_ok(f"Console simulado em {servidor.url_base}/verificacao (Ctrl+C encerra)")
+    main.log_info(f"Segredo TOTP: {SEGREDO_TOTP_MOCK}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        servidor.shutdown()
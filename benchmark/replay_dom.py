@@ -0,0 +1,136 @@
+"""
+Replay offline das capturas de DOM feitas com main.py --capturar-dom.
+
+Cada snapshot é servido pelo mock_console no caminho original da página
+(as condições de espera olham location) e, sobre ele, são medidos:
+- as consultas do __sfa com a varredura antiga e com o índice de shadow
+  roots (medir_indice_shadow), incluindo os seletores, textos e labels de
+  combobox dos fluxos do fluxos_casos.json;
+- a condição de espera que valia quando a página foi capturada.
+
+Falha (código 1) se o índice achar um elemento diferente da varredura
+antiga ou se a condição capturada não valer mais no snapshot.
+
+    python benchmark/replay_dom.py capturas_dom --repeticoes 10
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import mock_console  # coloca a raiz do projeto no sys.path
+import main  # noqa: E402
+
+# Num snapshot não há "antes": o que sumiu é tomado como sumido e qualquer
+# toast de sucesso conta como novo
+JS_AVALIAR_CONDICAO = """
+function sumiu(chave, presente) {
+    return !presente;
+}
+function toastSucessoNovo() {
+    return !!document.querySelector('.forceToastMessage.success, .slds-notify_toast.slds-theme_success');
+}
+const inicio = performance.now();
+let ok = false;
+try {
+    ok = !!(/*CONDICAO*/);
+} catch(e) {}
+return { ok: ok, ms: performance.now() - inicio };
+"""
+
+
+def carregar_capturas(pasta):
+    with open(os.path.join(pasta, 'capturas.jsonl'), encoding='utf-8') as f:
+        return [json.loads(linha) for linha in f if linha.strip()]
+
+
+def consultas_dos_fluxos():
+    """Consultas do medirIndice com os alvos dos fluxos, sem repetir"""
+    consultas = list(main.CONSULTAS_MEDICAO_INDICE)
+    for fluxo in main.carregar_fluxos().values():
+        for passo in fluxo['passos']:
+            for alvo in passo.get('alvos', []):
+                if 'seletor' in alvo and 'texto' not in alvo:
+                    consultas.append({'tipo': 'seletor', 'valor': alvo['seletor']})
+                elif 'texto' in alvo and 'seletor' not in alvo:
+                    consultas.append({'tipo': 'texto', 'valor': alvo['texto']})
+            if passo['acao'] == 'comboboxes':
+                consultas += [{'tipo': 'aria', 'valor': label} for label in passo['campos']]
+
+    unicas = []
+    for c in consultas:
+        if c not in unicas:
+            unicas.append(c)
+    return unicas
+
+
+def reproduzir(driver, url_base, captura, consultas, repeticoes):
+    """Mede um snapshot; devolve a lista de problemas encontrados"""
+    main.log_info(f"{captura['arquivo']} ({captura['nos']} nós, {captura['roots']} roots)")
+    driver.get(f"{url_base}{captura['caminho']}?captura={captura['arquivo']}")
+    main.instalar_helpers_js(driver, persistente=False)
+
+    problemas = []
+    with main.etapa('replay', arquivo=captura['arquivo']):
+        medicao = main.medir_indice_shadow(driver, consultas, repeticoes)
+
+    if not medicao:
+        return [f"{captura['arquivo']}: medição falhou"]
+
+    for c in medicao['consultas']:
+        if not c['mesmoElemento']:
+            problemas.append(f"{captura['arquivo']}: {c['tipo']} '{c['valor']}' difere da varredura antiga")
+
+    condicao = captura.get('condicao')
+    if condicao:
+        expressao = main.CONDICOES_ESPERA[condicao][0]
+        res = main.executar_js_safe(driver, JS_AVALIAR_CONDICAO.replace('/*CONDICAO*/', expressao)) or {}
+        main.log_info(f"  condição {condicao}: {'ok' if res.get('ok') else 'FALSA'} ({res.get('ms', 0):.3f} ms)")
+        if not res.get('ok'):
+            problemas.append(f"{captura['arquivo']}: condição '{condicao}' não vale no snapshot")
+
+    return problemas
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Replay offline das capturas de DOM")
+    parser.add_argument('pasta', nargs='?', default=os.path.join(main.BASE_DIR, 'capturas_dom'),
+                        help="Pasta gravada por main.py --capturar-dom (padrão: capturas_dom)")
+    parser.add_argument('--repeticoes', type=int, default=5,
+                        help="Repetições de cada consulta na medição (padrão: 5)")
+    parser.add_argument('--filtro', default='',
+                        help="Só as capturas cujo rótulo contém este texto")
+    parser.add_argument('--com-janela', action='store_true',
+                        help="Abre o Edge com janela em vez de headless")
+    return parser.parse_args(argv)
+
+
+def main_replay(argv=None):
+    args = parse_args(argv)
+    capturas = [c for c in carregar_capturas(args.pasta) if args.filtro in c['rotulo']]
+    if not capturas:
+        main.log_error(f"Nenhuma captura em {args.pasta}")
+        return 1
+
+    consultas = consultas_dos_fluxos()
+    servidor = mock_console.iniciar_servidor(pasta_capturas=os.path.abspath(args.pasta))
+    problemas = []
+    try:
+        driver = main.criar_driver(servidor.url_base + "/verificacao", headless=not args.com_janela)
+        for captura in capturas:
+            problemas += reproduzir(driver, servidor.url_base, captura, consultas, args.repeticoes)
+    finally:
+        main.cleanup_all_resources()
+        servidor.shutdown()
+
+    main.log_info(f"{len(capturas)} captura(s) reproduzidas com {len(consultas)} consultas cada")
+    for p in problemas:
+        main.log_error(p)
+    if not problemas:
+        main.log_ok("Índice e condições de espera conferem com todas as capturas")
+    return 1 if problemas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_replay())
@@ -0,0 +1,264 @@
+"""
+Benchmark offline contra o console Lightning simulado.
+
+Sobe o mock_console em localhost, abre o Edge headless e mede:
+- o MFA completado por TOTP na página de verificação simulada;
+- N jobs do lote (busca + fluxo de caso, alternando os fluxos do
+  fluxos_casos.json, com um CPF inexistente a cada 5 jobs);
+- selecionar_combobox_melhorado campo a campo no formulário de caso.
+
+Com --bloqueio os jobs rodam com o bloqueio de URLs do perfil headless
+(main.BLOQUEIO_HEADLESS); --comparar-bloqueio também mede bytes e tempo de
+carga das páginas do mock sem e com ele.
+
+As etapas vêm dos spans de main.etapa (os mesmos do --trace); o relatório
+traz p50/p95/máx de cada uma e do job de ponta a ponta. O baseline.json
+guarda um p95 por configuração (--jobs, --latencia, --jitter, --bloqueio,
+--com-janela). A execução falha (código 1) quando algum job falha, quando
+o p95 de uma etapa passa do baseline vezes a tolerância ou quando a
+configuração não tem baseline gravado; --atualizar-baseline, na máquina
+de referência, grava o da configuração e --sem-baseline roda só o
+relatório.
+
+    python benchmark/run_benchmark.py --jobs 20 --latencia 150
+    python benchmark/run_benchmark.py --atualizar-baseline
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import mock_console  # coloca a raiz do projeto no sys.path
+import main  # noqa: E402
+
+ARQUIVO_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+TOLERANCIA_PADRAO = 1.25
+
+# Etapas comparadas com o baseline (as demais só aparecem no relatório)
+ETAPAS_BASELINE = ('mfa', 'job', 'inicio', 'buscar_cpf', 'resultado', 'cache',
+                   'navegar_registro', 'fluxo', 'selecionar_combobox')
+
+# Páginas do mock medidas com --comparar-bloqueio
+PAGINAS_COMPARACAO = ['/lightning/page/home', '/lightning/o/Case/new']
+
+# Campos do formulário medidos com selecionar_combobox_melhorado (opção por posição)
+CAMPOS_COMBOBOX = ['Motivo do contato', 'Origem do caso', 'Unidade de registro', 'Status do caso',
+                   'Assunto', 'Sistema Operacional', 'Categoria', 'Subcategoria']
+
+DADOS_FLUXO = {
+    'informacao': ["Benchmark - cliente solicitou informações"],
+    'conta_bemol': ["92999990000", "cliente@example.com", "Cliente Benchmark"],
+}
+
+
+def montar_jobs(clientes, quantidade):
+    cpfs = list(clientes)
+    fluxos = list(DADOS_FLUXO)
+    jobs = []
+    for n in range(quantidade):
+        if n % 5 == 4:
+            # CPF válido que o mock não conhece: mede o caminho do toast
+            jobs.append({'cpf': mock_console.gerar_cpf(900000000 + n), 'fluxo': '', 'dados': []})
+            continue
+        fluxo = fluxos[n % len(fluxos)]
+        jobs.append({'cpf': cpfs[n % len(cpfs)], 'fluxo': fluxo, 'dados': list(DADOS_FLUXO[fluxo])})
+    return jobs
+
+
+def isolar_arquivos(pasta):
+    """Caches do benchmark numa pasta temporária: não tocam nos do operador"""
+    main.ARQUIVO_CACHE_CPF = os.path.join(pasta, "cache_cpf.sqlite3")
+    main.ARQUIVO_CHAVE_CACHE_CPF = os.path.join(pasta, "cache_cpf.key")
+    main.ARQUIVO_CACHE_PICKLIST = os.path.join(pasta, "cache_picklists.json")
+
+
+def medir_comboboxes(driver, url_base):
+    driver.get(url_base + "/lightning/o/Case/new")
+    main.aguardar_condicao(driver, 'formulario_caso')
+    for label in CAMPOS_COMBOBOX:
+        with main.etapa('selecionar_combobox', campo=label) as span:
+            span['ok'] = main.selecionar_combobox_melhorado(driver, label, 2, label)
+
+
+def estatisticas_etapas():
+    """nome do span -> lista ordenada de durações (ms)"""
+    duracoes = {}
+    for evento in main._EVENTOS_TRACE:
+        duracoes.setdefault(evento['name'], []).append(evento['dur'] / 1000)
+    return {nome: sorted(valores) for nome, valores in duracoes.items()}
+
+
+def relatorio(estatisticas):
+    main.log_info("Latência por etapa (ms):")
+    print(f"  {'etapa':<44} {'n':>4} {'p50':>8} {'p95':>8} {'máx':>8}")
+    for nome, valores in sorted(estatisticas.items(), key=lambda item: -sum(item[1])):
+        print(f"  {nome[:44]:<44} {len(valores):>4} {main._percentil(valores, 50):>8.0f} "
+              f"{main._percentil(valores, 95):>8.0f} {valores[-1]:>8.0f}")
+
+
+def chave_config(config):
+    """Nome da configuração no baseline.json: cada uma tem o seu p95"""
+    return ' '.join(f"{k}={v}" for k, v in sorted(config.items()))
+
+
+def ler_baselines(caminho):
+    """{chave_config: entrada} gravados no arquivo (vazio se não houver)"""
+    if not os.path.isfile(caminho):
+        return {}
+    with open(caminho, encoding='utf-8') as f:
+        return json.load(f).get('configuracoes', {})
+
+
+def comparar_baseline(estatisticas, config, caminho, tolerancia=None):
+    """Lista de regressões (vazia se tudo dentro do baseline).
+
+    Sem baseline gravado para esta configuração não há com o que comparar, e
+    isso também conta como falha: a regressão passaria sem ser vista. Uma
+    etapa do baseline que não foi medida nesta execução também.
+    """
+    chave = chave_config(config)
+    baseline = ler_baselines(caminho).get(chave)
+    if not baseline or not baseline.get('p95_ms'):
+        return [f"sem baseline para '{chave}' em {caminho} - rode com --atualizar-baseline "
+                f"na máquina de referência (ou --sem-baseline só para o relatório)"]
+
+    tolerancia = tolerancia or baseline.get('tolerancia', TOLERANCIA_PADRAO)
+    regressoes = []
+    for nome, referencia in baseline['p95_ms'].items():
+        valores = estatisticas.get(nome)
+        if not valores:
+            regressoes.append(f"{nome}: não foi medida nesta execução")
+            continue
+        p95 = main._percentil(valores, 95)
+        if p95 > referencia * tolerancia:
+            regressoes.append(f"{nome}: p95 {p95:.0f} ms > {referencia:.0f} ms x {tolerancia}")
+    return regressoes
+
+
+def gravar_baseline(estatisticas, config, caminho, tolerancia):
+    """Grava (ou substitui) o baseline desta configuração; as demais ficam"""
+    configuracoes = ler_baselines(caminho)
+    configuracoes[chave_config(config)] = {
+        'gravado_em': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'config': config,
+        'tolerancia': tolerancia,
+        'p95_ms': {nome: round(main._percentil(estatisticas[nome], 95))
+                   for nome in ETAPAS_BASELINE if nome in estatisticas},
+    }
+    tmp = f"{caminho}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'configuracoes': configuracoes}, f, indent=2, ensure_ascii=False, sort_keys=True)
+        f.write("\n")
+    os.replace(tmp, caminho)
+    main.log_ok(f"Baseline de '{chave_config(config)}' gravado em {caminho}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark offline da automação")
+    parser.add_argument('--jobs', type=int, default=20, metavar='N',
+                        help="Jobs do lote a medir (padrão: 20)")
+    parser.add_argument('--latencia', type=int, default=150, metavar='MS',
+                        help="Latência de rede e da interface do mock (padrão: 150)")
+    parser.add_argument('--jitter', type=int, default=50, metavar='MS',
+                        help="Variação aleatória da latência (padrão: 50)")
+    parser.add_argument('--com-janela', action='store_true',
+                        help="Abre o Edge com janela em vez de headless")
+    parser.add_argument('--bloqueio', action='store_true',
+                        help="Roda os jobs com o bloqueio de URLs do perfil headless")
+    parser.add_argument('--comparar-bloqueio', action='store_true',
+                        help="Mede as páginas do mock sem e com o bloqueio antes dos jobs")
+    parser.add_argument('--baseline', default=ARQUIVO_BASELINE, metavar='ARQUIVO')
+    parser.add_argument('--tolerancia', type=float, default=None,
+                        help=f"Fator sobre o p95 do baseline (padrão: o do arquivo ou {TOLERANCIA_PADRAO})")
+    parser.add_argument('--atualizar-baseline', action='store_true',
+                        help="Grava o p95 desta execução como baseline da configuração")
+    parser.add_argument('--sem-baseline', action='store_true',
+                        help="Só o relatório: não compara com o baseline (falha apenas com jobs que falharem)")
+    parser.add_argument('--trace', metavar='ARQUIVO',
+                        help="Também grava os spans em JSON do Chrome trace")
+    args = parser.parse_args(argv)
+
+    if args.sem_baseline and args.atualizar_baseline:
+        parser.error("--sem-baseline não combina com --atualizar-baseline")
+    return args
+
+
+def main_benchmark(argv=None):
+    args = parse_args(argv)
+    config = {'jobs': args.jobs, 'latencia_ms': args.latencia, 'jitter_ms': args.jitter}
+    if args.bloqueio:
+        config['bloqueio'] = True
+    if args.com_janela:
+        config['com_janela'] = True
+
+    main.MODO_NAO_INTERATIVO = True
+    # Os spans são a fonte das estatísticas: o rastreamento fica sempre ligado
+    main.ARQUIVO_TRACE = args.trace or os.devnull
+    os.environ['SF_TOTP_SECRET'] = mock_console.SEGREDO_TOTP_MOCK
+
+    pasta = tempfile.mkdtemp(prefix="sf_benchmark_")
+    isolar_arquivos(pasta)
+
+    servidor = mock_console.iniciar_servidor(latencia_ms=args.latencia, jitter_ms=args.jitter)
+    main.log_ok(f"Console simulado em {servidor.url_base}")
+
+    falhas = 0
+    try:
+        driver = main.criar_driver(servidor.url_base + "/verificacao", headless=not args.com_janela,
+                                   bloqueio=main.BLOQUEIO_HEADLESS if args.bloqueio else None)
+
+        if not main.esperar_mfa(driver, timeout=60):
+            main.log_error("MFA simulado não concluiu")
+            return 1
+
+        if args.comparar_bloqueio:
+            main.comparar_bloqueio(driver, [servidor.url_base + c for c in PAGINAS_COMPARACAO])
+
+        for n, job in enumerate(montar_jobs(servidor.clientes, args.jobs), 1):
+            linha = main.processar_job(driver, job)
+            esperado = 'not_found' if not job['fluxo'] else 'found'
+            ok = linha['status'] == esperado and linha['caso'] in ('', 'ok')
+            falhas += not ok
+            main.log_info(f"[{n}] {main.mascarar_cpf(linha['cpf'])} {job['fluxo'] or '-'} -> "
+                          f"{linha['status']}/{linha['caso'] or '-'} ({linha['elapsed_ms']} ms)"
+                          + ("" if ok else " FALHOU"))
+
+        medir_comboboxes(driver, servidor.url_base)
+    finally:
+        if args.trace:
+            main.gravar_trace()
+        main.cleanup_all_resources()
+        servidor.shutdown()
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    estatisticas = estatisticas_etapas()
+    relatorio(estatisticas)
+
+    if falhas:
+        main.log_error(f"{falhas} job(s) falharam contra o mock")
+
+    if args.atualizar_baseline:
+        if falhas:
+            main.log_error("Baseline não atualizado: a execução teve falhas")
+            return 1
+        gravar_baseline(estatisticas, config, args.baseline, args.tolerancia or TOLERANCIA_PADRAO)
+        return 0
+
+    if args.sem_baseline:
+        main.log_warn("Sem comparação com o baseline (--sem-baseline)")
+        return 1 if falhas else 0
+
+    regressoes = comparar_baseline(estatisticas, config, args.baseline, args.tolerancia)
+    for r in regressoes:
+        main.log_error(f"Baseline - {r}")
+    if not regressoes and not falhas:
+        main.log_ok("Dentro do baseline")
+    return 1 if regressoes or falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_benchmark())
@@ -5,9 +5,24 @@ import shutil
 import os
 import signal
 import sys
+import queue
+import threading
+import csv
+import argparse
+import json
+import hashlib
+import hmac
+import base64
+import struct
+import sqlite3
 import traceback
+import functools
+import itertools
 
+from collections import defaultdict, deque
+from contextlib import closing, contextmanager
 from datetime import datetime, timedelta
+from urllib.parse import urlsplit
 
 try:
     from selenium import webdriver
@@ -56,34 +71,319 @@ USE_COLOR = sys.stdout.isatty()
 def _c(text, code):
     return f"\033[{code}m{text}\033[0m" if USE_COLOR else text
 
+def _prefixo():
+    # Nos workers do pool cada linha identifica quem a escreveu
+    thread = threading.current_thread()
+    return "" if thread is threading.main_thread() else f"[{thread.name}] "
+
 def log_info(msg):
-    print(_c(f"[INFO] {msg}", "37"))
+    print(_c(f"{_prefixo()}[INFO] {msg}", "37"))
 
 def log_ok(msg):
-    print(_c(f"[✓] {msg}", "32"))
+    print(_c(f"{_prefixo()}[✓] {msg}", "32"))
 
 def log_warn(msg):
-    print(_c(f"[⚠] {msg}", "33"))
+    print(_c(f"{_prefixo()}[⚠] {msg}", "33"))
 
 def log_error(msg):
-    print(_c(f"[✗] {msg}", "31"))
+    print(_c(f"{_prefixo()}[✗] {msg}", "31"))
 
 def log_debug(msg):
-    print(_c(f"[DEBUG] {msg}", "36"))
+    print(_c(f"{_prefixo()}[DEBUG] {msg}", "36"))
 
 # Configurações
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-EDGE_DRIVER_PATH = os.path.join(BASE_DIR, "msedgedriver.exe")
+# SF_EDGE_DRIVER troca o caminho; sem o arquivo o Selenium Manager resolve o driver
+EDGE_DRIVER_PATH = os.environ.get('SF_EDGE_DRIVER') or os.path.join(BASE_DIR, "msedgedriver.exe")
 TIMEOUT_DEFAULT = 12
 TIMEOUT_MFA = 300
 TIMEOUT_SEARCH = 30
+TIMEOUT_SESSAO = 15
+TIMEOUT_RESULTADO_BUSCA = 23
+# Teto para execute_async_script (as esperas em página definem o próprio timeout)
+TIMEOUT_SCRIPT_ASYNC = 60
+# A espera do MFA é feita em trechos menores que TIMEOUT_SCRIPT_ASYNC
+MFA_TRECHO_S = 30
+# Script de espera sem resposta: uma navegação dá uma ou duas seguidas; mais
+# que isso é janela fechada ou sessão do driver morta (com espera crescente)
+MFA_FALHAS_SEGUIDAS_MAX = 10
+
+# MFA por TOTP (RFC 6238): segredo base32 do app autenticador na variável
+# SF_TOTP_SECRET ou no arquivo abaixo; sem segredo a aprovação é manual
+ARQUIVO_TOTP = os.path.join(BASE_DIR, "totp_secret.txt")
+TOTP_PASSO_S = 30
+TOTP_DIGITOS = 6
+TOTP_MAX_ENVIOS = 3
+# Depois de enviar o código a espera ignora o campo por até este tempo: ele
+# continua na página enquanto o login conclui
+TOTP_CONFIRMACAO_S = 10
+SELETOR_CODIGO_MFA = 'input[name="tc"], input#tc, input[name="otp"], input[autocomplete="one-time-code"]'
+SELETOR_ENVIAR_MFA = 'input#save, button#save, button[type="submit"], input[type="submit"]'
+
+# Sessão persistente (opt-in com --sessao): cookies de todos os domínios do
+# Salesforce salvos após o login. Quem tiver este arquivo tem a sessão!
+ARQUIVO_SESSAO = os.path.join(BASE_DIR, "sessao_salesforce.json")
+_CAMPOS_COOKIE_CDP = ('name', 'value', 'domain', 'path', 'secure', 'httpOnly', 'sameSite', 'expires')
+
+# Cache CPF -> URL da conta. O CPF é gravado só como HMAC com a chave desta
+# instalação (SF_CHAVE_CACHE_CPF ou o arquivo, gerado no primeiro uso): um
+# hash simples de 11 dígitos se reverte por força bruta em segundos
+USAR_CACHE_CPF = True
+ARQUIVO_CACHE_CPF = os.path.join(BASE_DIR, "cache_cpf.sqlite3")
+ARQUIVO_CHAVE_CACHE_CPF = os.path.join(BASE_DIR, "cache_cpf.key")
+CACHE_CPF_VERSAO = 1
+_CHAVE_CACHE_CPF = None
+_LOCK_CHAVE_CACHE_CPF = threading.Lock()
+CACHE_CPF_TTL = 7 * 24 * 3600
+CACHE_CPF_MAX_ENTRADAS = 5000
+# Só vai para o cache a conta que mostra o CPF buscado (espera em s)
+CACHE_CPF_CONFIRMACAO_S = 3
+# Elementos que só existem com o registro carregado
+SELETORES_REGISTRO_CARREGADO = (
+    "records-highlights2, records-lwc-highlights-panel, force-highlights-panel, "
+    ".forceHighlightsPanel, one-record-home-flexipage2"
+)
+# Campo de busca de CPF na home, em ordem de preferência
+SELETORES_BUSCA_CPF = (
+    'input[name="inputSearch"]',
+    'input[type="search"]',
+    'input[placeholder*="CPF"]',
+    'input[placeholder*="CLI"]',
+)
+
+# Cache de picklists por org (tipo de registro/label do campo, mais o valor
+# do campo controlador nas dependentes -> textos das opções). Os fluxos
+# indicam a opção pelo texto ou pela posição na tela; o cache só confere
+# se um texto indicado ainda existe
+USAR_CACHE_PICKLIST = True
+ARQUIVO_CACHE_PICKLIST = os.path.join(BASE_DIR, "cache_picklists.json")
+PICKLIST_CACHE_VERSAO = 2
+PICKLIST_CACHE_TTL = 30 * 24 * 3600
+_CACHE_PICKLIST = None
+_LOCK_PICKLIST = threading.Lock()
+
+# Definições dos fluxos de caso (passos, seletores, esperas, tentativas)
+ARQUIVO_FLUXOS = os.path.join(BASE_DIR, "fluxos_casos.json")
+_CACHE_FLUXOS = None
+_LOCK_FLUXOS = threading.Lock()
+
+# Abas de registro abertas pela automação que podem continuar abertas
+# depois de uma busca (as de fluxos concluídos são sempre fechadas)
+MAX_ABAS = 4
+
+# Amostras guardadas por condição de espera para as estatísticas
+JANELA_ESTATISTICA_ESPERA = 50
+
+# Profiler do WebDriver (--perfil): conta e cronometra cada comando por
+# etapa e local de chamada; PERFIL_TOP linhas em cada ranking do resumo
+PERFIL_DRIVER = False
+PERFIL_TOP = 8
+
+# Rastreamento (--trace): etapas aninhadas viram spans no formato Chrome
+# trace, gravados em ARQUIVO_TRACE ao encerrar
+ARQUIVO_TRACE = None
+_EVENTOS_TRACE = []
+_THREADS_TRACE = {}
+_LOCK_TRACE = threading.Lock()
+_INICIO_TRACE = time.perf_counter()
+
+# Captura de DOM (--capturar-dom): a página é gravada a cada passo, com os
+# shadow roots, para o replay offline. As letras de todo texto e dos
+# atributos title/aria-label/alt são mascaradas, menos os rótulos da
+# interface que o replay consulta (TEXTOS_UI_DOM e os textos dos fluxos);
+# dentro destes seletores nem os rótulos escapam
+PASTA_CAPTURA_DOM = None
+SELETORES_SENSIVEIS_DOM = (
+    "title, a[role='tab'], lightning-formatted-name, lightning-formatted-email, lightning-formatted-phone, "
+    "records-highlights2, records-lwc-highlights-panel, .slds-page-header__title, "
+    ".toastMessage, a[href^='mailto:'], [contenteditable='true']"
+)
+TEXTOS_UI_DOM = [
+    'Avançar', 'Buscar', 'Cancelar', 'Casos', 'Criar', 'Email', 'Enviar', 'Fechar', 'Salvar',
+    'Transferir', 'Transferir Fila', 'Pesquisar Filas', 'Marcar Status do caso como concluído',
+    '--Nenhum--',
+]
+_SEQUENCIA_CAPTURA = itertools.count(1)
+_LOCK_CAPTURA = threading.Lock()
+
+# Perfil headless dos lotes sem operador (--headless): sem janela, sem o
+# zoom de 75% e com as URLs destes padrões bloqueadas via CDP ('*' é
+# curinga). Só o visual depende delas; --bloquear acrescenta padrões na
+# lista do processo (opcoes_driver), sem alterar esta
+BLOQUEIO_HEADLESS = [
+    # Imagens
+    '*.png*', '*.jpg*', '*.jpeg*', '*.gif*', '*.webp*', '*.ico*',
+    # Fontes
+    '*.woff*', '*.ttf*', '*.otf*', '*.eot*',
+    # Telemetria
+    '*InstrumentationBeacon*', '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*',
+]
+# Páginas recarregadas por --comparar-bloqueio (caminhos na org logada)
+PAGINAS_COMPARACAO_BLOQUEIO = ['/lightning/page/home', '/lightning/o/Case/home']
+
+# Modo lote: nenhuma pergunta pode bloquear esperando o operador
+MODO_NAO_INTERATIVO = False
+COLUNAS_LOTE = ['cpf', 'status', 'url', 'elapsed_ms', 'fluxo', 'caso', 'mensagem']
+
+def novos_recursos():
+    return {
+        'driver': None,
+        'temp_dir': None,
+        'cliente_url': None,  # Armazena URL do cliente atual
+        'relatorio_fluxo': None,  # Tempo/tentativas por passo do último fluxo
+        'abas_automacao': set(),  # Abas do console abertas pela automação
+        'credenciais': None,  # (usuario, senha, usar_sessao) para relogar se a sessão expirar
+        'bloqueio': [],  # Padrões de URL bloqueados via CDP neste driver
+        'perfil': None  # (etapa, local, comando) -> [n, ms] quando o driver é instrumentado
+    }
 
 # Variável global para rastrear recursos
-_GLOBAL_RESOURCES = {
-    'driver': None,
-    'temp_dir': None,
-    'cliente_url': None  # Armazena URL do cliente atual
-}
+_GLOBAL_RESOURCES = novos_recursos()
+
+# Recursos de cada driver vivo (o global e os dos workers do pool)
+_RECURSOS_POR_DRIVER = {}
+_LOCK_RECURSOS = threading.Lock()
+
+def recursos_do_driver(driver):
+    """Dicionário de recursos dono deste driver (global se não for de um worker)"""
+    return _RECURSOS_POR_DRIVER.get(id(driver), _GLOBAL_RESOURCES)
+
+# Etapas em andamento por thread (cada worker do pool tem a sua pilha)
+_ETAPA_PERFIL = threading.local()
+
+# Funções genéricas não identificam quem gastou o round trip: o local
+# registrado é o primeiro chamador fora delas
+_FUNCOES_GENERICAS_PERFIL = {'execute_medido', 'envolvida', 'executar_js_safe',
+                             'executar_js_async_safe', 'chamar_sfa', 'chamar_sfa_async'}
+
+@contextmanager
+def etapa(nome, **args):
+    """Marca o bloco como etapa (aninhável).
+    
+    Os comandos do driver feitos dentro dele levam a etapa no perfil e, com
+    --trace, o bloco vira um span. O dict devolvido guarda o desfecho, que
+    vai para os args do span.
+    """
+    pilha = getattr(_ETAPA_PERFIL, 'pilha', None)
+    if pilha is None:
+        pilha = _ETAPA_PERFIL.pilha = []
+    pilha.append(nome)
+    inicio = time.perf_counter()
+    try:
+        yield args
+    except BaseException as e:
+        args['erro'] = f"{type(e).__name__}: {str(e)[:120]}"
+        raise
+    finally:
+        pilha.pop()
+        if ARQUIVO_TRACE:
+            _registrar_span(nome, inicio, time.perf_counter(), args)
+
+def _desfecho(resultado):
+    """Args do span a partir do retorno da função rastreada"""
+    if not isinstance(resultado, dict):
+        return {'resultado': resultado}
+    args = {k: resultado[k] for k in ('status', 'tipo', 'success', 'metodo', 'fluxo', 'caso') if k in resultado}
+    if 'cpf' in resultado:
+        args['cpf'] = mascarar_cpf(resultado['cpf'])
+    return args
+
+def rastrear(nome):
+    """Decorador: a chamada inteira vira uma etapa, com o retorno como desfecho"""
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            with etapa(nome) as span:
+                resultado = funcao(*args, **kwargs)
+                span.update(_desfecho(resultado))
+                return resultado
+        return envolvida
+    return decorador
+
+def _registrar_span(nome, inicio, fim, args):
+    """Evento 'X' (completo) do formato Chrome trace, em microssegundos"""
+    thread = threading.current_thread()
+    evento = {
+        'name': nome, 'cat': 'automacao', 'ph': 'X', 'pid': os.getpid(), 'tid': thread.ident,
+        'ts': round((inicio - _INICIO_TRACE) * 1e6), 'dur': round((fim - inicio) * 1e6),
+        'args': {k: v if v is None or isinstance(v, (bool, int, float, str)) else str(v)
+                 for k, v in args.items()},
+    }
+    with _LOCK_TRACE:
+        _EVENTOS_TRACE.append(evento)
+        _THREADS_TRACE[thread.ident] = thread.name
+
+def gravar_trace(caminho=None):
+    """Grava os spans em JSON para chrome://tracing ou ui.perfetto.dev"""
+    caminho = caminho or ARQUIVO_TRACE
+    with _LOCK_TRACE:
+        eventos = list(_EVENTOS_TRACE)
+        threads = dict(_THREADS_TRACE)
+    if not caminho or not eventos:
+        return
+    
+    nomes = [{'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid, 'args': {'name': nome}}
+             for tid, nome in threads.items()]
+    try:
+        tmp = f"{caminho}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': nomes + eventos, 'displayTimeUnit': 'ms'}, f)
+        os.replace(tmp, caminho)
+        log_ok(f"Trace gravado em {caminho} ({len(eventos)} spans)")
+    except Exception as e:
+        log_warn(f"Não foi possível gravar o trace: {str(e)[:80]}")
+
+def _local_chamada():
+    """funcao:linha do primeiro frame deste arquivo fora das funções genéricas"""
+    frame = sys._getframe(2)
+    while frame:
+        codigo = frame.f_code
+        if codigo.co_filename == __file__ and codigo.co_name not in _FUNCOES_GENERICAS_PERFIL:
+            return f"{codigo.co_name}:{frame.f_lineno}"
+        frame = frame.f_back
+    return '?'
+
+def instrumentar_driver(driver):
+    """Envolve driver.execute, por onde passam todos os comandos (inclusive de
+    WebElement e CDP), acumulando contagem e tempo em recursos['perfil']"""
+    recursos = recursos_do_driver(driver)
+    recursos['perfil'] = {}
+    execute = driver.execute
+    
+    def execute_medido(comando, params=None):
+        inicio = time.perf_counter()
+        try:
+            return execute(comando, params)
+        finally:
+            ms = (time.perf_counter() - inicio) * 1000
+            etapa = '/'.join(getattr(_ETAPA_PERFIL, 'pilha', None) or ['-'])
+            contagem = recursos['perfil'].setdefault((etapa, _local_chamada(), comando), [0, 0.0])
+            contagem[0] += 1
+            contagem[1] += ms
+    
+    driver.execute = execute_medido
+
+def zerar_perfil(driver):
+    recursos = recursos_do_driver(driver)
+    if recursos.get('perfil') is not None:
+        recursos['perfil'] = {}
+
+def resumo_perfil(driver, titulo):
+    """Loga os round trips acumulados desde o último resumo e zera o perfil"""
+    recursos = recursos_do_driver(driver)
+    perfil = recursos.get('perfil')
+    if not perfil:
+        return
+    recursos['perfil'] = {}
+    
+    total = sum(n for n, _ in perfil.values())
+    total_ms = sum(ms for _, ms in perfil.values())
+    log_info(f"Perfil de {titulo}: {total} comandos do driver em {int(total_ms)} ms")
+    
+    for rotulo, indice in (("por quantidade", 0), ("por tempo", 1)):
+        log_info(f"  Locais {rotulo}:")
+        for (etapa, local, comando), (n, ms) in sorted(perfil.items(), key=lambda item: -item[1][indice])[:PERFIL_TOP]:
+            log_info(f"    {n:>5}x {int(ms):>7} ms  {etapa} @ {local} ({comando})")
 
 def input_com_timeout(prompt, timeout=60):
     """Input com timeout para evitar travamentos"""
@@ -106,6 +406,16 @@ def input_com_timeout(prompt, timeout=60):
             print(f"\n[TIMEOUT {timeout}s] - Usando valor padrão")
             return ''
 
+def perguntar(prompt, padrao=''):
+    """input() que no modo não interativo devolve o padrão sem bloquear"""
+    if MODO_NAO_INTERATIVO:
+        log_debug(f"Pergunta ignorada (modo lote): {prompt.strip()[:60]} -> '{padrao}'")
+        return padrao
+    try:
+        return input(prompt)
+    except EOFError:
+        return padrao
+
 def limpar_cpf(texto):
     return re.sub(r"\D", "", texto or "")
 
@@ -121,25 +431,40 @@ def validar_cpf(cpf):
     
     return cpf[-2:] == f"{digito1}{digito2}"
 
-def cleanup_all_resources():
-    """Limpa TODOS os recursos - chamado sempre ao finalizar"""
-    global _GLOBAL_RESOURCES
-    
-    if _GLOBAL_RESOURCES['driver']:
+def mascarar_cpf(cpf):
+    return f"{cpf[:3]}.***.***-{cpf[-2:]}" if len(cpf) == 11 else cpf
+
+def liberar_recursos(recursos):
+    """Encerra o driver e remove o perfil temporário de um conjunto de recursos"""
+    driver = recursos['driver']
+    if driver:
+        with _LOCK_RECURSOS:
+            _RECURSOS_POR_DRIVER.pop(id(driver), None)
         try:
-            _GLOBAL_RESOURCES['driver'].quit()
+            driver.quit()
             log_ok("Driver encerrado")
         except Exception:
             pass
-        _GLOBAL_RESOURCES['driver'] = None
+        recursos['driver'] = None
     
-    if _GLOBAL_RESOURCES['temp_dir'] and os.path.isdir(_GLOBAL_RESOURCES['temp_dir']):
+    if recursos['temp_dir'] and os.path.isdir(recursos['temp_dir']):
         try:
-            shutil.rmtree(_GLOBAL_RESOURCES['temp_dir'], ignore_errors=True)
+            shutil.rmtree(recursos['temp_dir'], ignore_errors=True)
             log_ok(f"Perfil temporário removido")
         except Exception as e:
             log_warn(f"Não foi possível remover perfil: {e}")
-        _GLOBAL_RESOURCES['temp_dir'] = None
+        recursos['temp_dir'] = None
+
+def cleanup_all_resources():
+    """Limpa TODOS os recursos - chamado sempre ao finalizar"""
+    with _LOCK_RECURSOS:
+        pendentes = [r for r in _RECURSOS_POR_DRIVER.values() if r is not _GLOBAL_RESOURCES]
+    
+    # Workers que ainda estiverem vivos (ex.: Ctrl+C no meio do pool)
+    for recursos in pendentes:
+        liberar_recursos(recursos)
+    
+    liberar_recursos(_GLOBAL_RESOURCES)
 
 def signal_handler(signum, frame):
     """Handler para Ctrl+C"""
@@ -150,18 +475,47 @@ def signal_handler(signum, frame):
 
 signal.signal(signal.SIGINT, signal_handler)
 
-def criar_driver(initial_url="https://login.salesforce.com/"):
-    global _GLOBAL_RESOURCES
+def opcoes_driver(headless=False, bloqueio=None):
+    """Argumentos de criar_driver: perfil headless com o bloqueio dado (padrão BLOQUEIO_HEADLESS)"""
+    if not headless:
+        return {}
+    return {'headless': True, 'bloqueio': list(BLOQUEIO_HEADLESS if bloqueio is None else bloqueio)}
+
+def bloquear_recursos(driver, padroes):
+    """Bloqueia via CDP as requisições cujas URLs casam com os padrões.
+    
+    Vale para a aba do driver, inclusive nas navegações seguintes; uma
+    lista vazia desbloqueia tudo.
+    """
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': list(padroes)})
+    except Exception as e:
+        log_warn(f"CDP indisponível para bloquear recursos: {str(e)[:60]}")
+        return False
+    recursos_do_driver(driver)['bloqueio'] = list(padroes)
+    return True
+
+def criar_driver(initial_url="https://login.salesforce.com/", recursos=None, headless=False, bloqueio=None):
+    """Inicia o Edge com perfil temporário próprio.
+    
+    recursos: dicionário (novos_recursos()) onde driver e perfil ficam
+    registrados; por padrão o global, usado pelo modo interativo.
+    headless: sem janela e sem o zoom de 75% (lotes, benchmark offline,
+    servidores Linux).
+    bloqueio: padrões de URL bloqueados desde a primeira página.
+    """
+    if recursos is None:
+        recursos = _GLOBAL_RESOURCES
     
-    service = Service(EDGE_DRIVER_PATH)
+    service = Service(EDGE_DRIVER_PATH) if os.path.isfile(EDGE_DRIVER_PATH) else Service()
     tmp_profile = None
     
     try:
         tmp_profile = tempfile.mkdtemp(prefix="edge_sf_")
-        _GLOBAL_RESOURCES['temp_dir'] = tmp_profile
+        recursos['temp_dir'] = tmp_profile
         
         opts = Options()
-        opts.add_argument("--start-maximized")
         opts.add_argument(f"--user-data-dir={tmp_profile}")
         opts.add_argument("--disable-extensions")
         opts.add_argument("--disable-background-networking")
@@ -169,24 +523,39 @@ def criar_driver(initial_url="https://login.salesforce.com/"):
         opts.add_argument("--no-first-run")
         opts.add_argument("--disable-dev-shm-usage")
         opts.page_load_strategy = 'eager'
-        opts.add_argument("--force-device-scale-factor=0.75")
+        if headless:
+            opts.add_argument("--headless=new")
+            opts.add_argument("--window-size=1920,1080")
+        else:
+            opts.add_argument("--start-maximized")
+            opts.add_argument("--force-device-scale-factor=0.75")
         
         driver = webdriver.Edge(service=service, options=opts)
-        _GLOBAL_RESOURCES['driver'] = driver
+        recursos['driver'] = driver
+        with _LOCK_RECURSOS:
+            _RECURSOS_POR_DRIVER[id(driver)] = recursos
+        if PERFIL_DRIVER:
+            instrumentar_driver(driver)
         driver.implicitly_wait(1)
+        driver.set_script_timeout(TIMEOUT_SCRIPT_ASYNC)
+        instalar_helpers_js(driver)
+        if bloqueio:
+            bloquear_recursos(driver, bloqueio)
         
-        log_ok(f"Edge iniciado")
+        log_ok("Edge iniciado" + (" (headless)" if headless else "")
+               + (f", {len(bloqueio)} padrões de URL bloqueados" if bloqueio else ""))
         
         try:
             driver.get(initial_url)
             time.sleep(1)
         except Exception:
             pass
-        try:
-            driver.execute_script("document.body.style.zoom='75%'")
-        except Exception as e:
-            log_debug(f"Aviso: não conseguiu aplicar zoom via JS: {str(e)[:50]}")
-        if sys.platform == 'win32':
+        if not headless:
+            try:
+                driver.execute_script("document.body.style.zoom='75%'")
+            except Exception as e:
+                log_debug(f"Aviso: não conseguiu aplicar zoom via JS: {str(e)[:50]}")
+        if not headless and sys.platform == 'win32':
             try:
                 import ctypes
                 hwnd = ctypes.windll.kernel32.GetConsoleWindow()
@@ -199,115 +568,178 @@ def criar_driver(initial_url="https://login.salesforce.com/"):
         
     except Exception as e:
         log_error(f"Falha ao iniciar Edge: {e}")
-        cleanup_all_resources()
+        liberar_recursos(recursos)
         raise
+
+
+JS_AGUARDAR_LOGIN = """
+const timeoutMs = arguments[0];
+const seletorCodigo = arguments[1];
+const done = arguments[arguments.length - 1];
+const inicio = performance.now();
+
+let finalizado = false;
+let observer = null;
+let timer = null;
+
+function logado() {
+    return location.pathname.startsWith('/lightning/') &&
+        !!document.querySelector('header.slds-global-header, [class*="oneHeader"], [data-aura-class*="oneHeader"]');
+}
+
+function finalizar(resultado) {
+    if (finalizado) return;
+    finalizado = true;
+    if (observer) observer.disconnect();
+    clearTimeout(timer);
+    window.removeEventListener('pagehide', saiu);
+    resultado.ms = Math.round(performance.now() - inicio);
+    done(resultado);
+}
+
+// A página de verificação redireciona ao aprovar: a espera recomeça no novo documento
+function saiu() {
+    finalizar({ estado: 'navegou' });
+}
+
+function pedeCodigo() {
+    const input = seletorCodigo && document.querySelector(seletorCodigo);
+    return !!input && input.offsetParent !== null && !input.disabled;
+}
+
+function verificar() {
+    if (logado()) finalizar({ estado: 'logado' });
+    else if (pedeCodigo()) finalizar({ estado: 'codigo' });
+}
+
+observer = new MutationObserver(verificar);
+observer.observe(document.documentElement, { childList: true, subtree: true });
+window.addEventListener('pagehide', saiu);
+timer = setTimeout(() => finalizar({ estado: 'aguardando' }), timeoutMs);
+verificar();
+"""
+
+JS_PREENCHER_CODIGO_MFA = """
+const input = document.querySelector(arguments[0]);
+if (!input) return { success: false, error: 'Campo do código não encontrado' };
+
+input.focus();
+input.value = arguments[2];
+input.dispatchEvent(new Event('input', {bubbles: true}));
+input.dispatchEvent(new Event('change', {bubbles: true}));
+
+const botao = document.querySelector(arguments[1]);
+if (botao) {
+    botao.click();
+} else if (input.form) {
+    input.form.submit();
+} else {
+    return { success: false, error: 'Botão de verificar não encontrado' };
+}
+return { success: true };
+"""
+
+def carregar_segredo_totp():
+    """Segredo TOTP decodificado de SF_TOTP_SECRET ou do ARQUIVO_TOTP (None se não houver)"""
+    segredo = os.environ.get('SF_TOTP_SECRET', '')
+    if not segredo and os.path.isfile(ARQUIVO_TOTP):
+        with open(ARQUIVO_TOTP, encoding='utf-8') as f:
+            segredo = f.read()
+    
+    segredo = segredo.replace(' ', '').strip().upper()
+    if not segredo:
+        return None
+    
+    try:
+        return base64.b32decode(segredo + '=' * (-len(segredo) % 8))
+    except (ValueError, TypeError):
+        log_warn("Segredo TOTP inválido (esperado base32) - MFA será manual")
+        return None
+
+def gerar_totp(chave, instante=None, passo=TOTP_PASSO_S, digitos=TOTP_DIGITOS):
+    """Código TOTP (RFC 6238, HMAC-SHA1) da chave para o instante informado"""
+    contador = int((time.time() if instante is None else instante) // passo)
+    digest = hmac.new(chave, struct.pack('>Q', contador), hashlib.sha1).digest()
+    deslocamento = digest[-1] & 0x0F
+    valor = struct.unpack('>I', digest[deslocamento:deslocamento + 4])[0] & 0x7FFFFFFF
+    return str(valor % 10 ** digitos).zfill(digitos)
+
+@rastrear('mfa')
 def esperar_mfa(driver, timeout=TIMEOUT_MFA):
     """
-    Aguarda a aprovação do MFA automaticamente, verificando continuamente
-    se o usuário já passou pela autenticação. NÃO precisa apertar Enter!
-    """
+    Aguarda a aprovação do MFA automaticamente. NÃO precisa apertar Enter!
     
-    wait_start = time.time()
-    last_check = 0
-    check_interval = 2  # Verifica a cada 2 segundos
-    
-    # JavaScript para verificar se ainda está na página de MFA
-    js_verificar_mfa = """
-    const url = window.location.href.toLowerCase();
-    const pageText = document.body.innerText.toLowerCase();
-    const pageHTML = document.body.innerHTML.toLowerCase();
-    
-    // Indicadores de que AINDA está no MFA
-    const mfaIndicators = [
-        url.includes('verification'),
-        url.includes('mfa'),
-        url.includes('authenticate'),
-        url.includes('verify'),
-        pageText.includes('verificação'),
-        pageText.includes('verification'),
-        pageText.includes('autenticação'),
-        pageText.includes('authentication'),
-        pageText.includes('approve'),
-        pageText.includes('aprovar'),
-        pageText.includes('código'),
-        pageText.includes('code'),
-        pageHTML.includes('mfa'),
-        pageHTML.includes('verification')
-    ];
-    
-    const stillInMFA = mfaIndicators.some(indicator => indicator === true);
-    
-    // Indicadores de que JÁ passou do MFA (está logado)
-    const loggedInIndicators = [
-        url.includes('/lightning/'),
-        url.includes('/home'),
-        url.includes('/setup'),
-        document.querySelector('header.slds-global-header') !== null,
-        document.querySelector('[class*="oneHeader"]') !== null,
-        document.querySelector('[data-aura-class*="oneHeader"]') !== null
-    ];
-    
-    const isLoggedIn = loggedInIndicators.some(indicator => indicator === true);
+    Uma espera assíncrona na página termina assim que o header do Lightning
+    aparece; quando a página navega (redirect após a aprovação) ela é
+    reinstalada no novo documento. O conteúdo da página não é lido.
     
-    return {
-        stillInMFA: stillInMFA,
-        isLoggedIn: isLoggedIn,
-        url: url,
-        hasLightning: url.includes('lightning')
-    };
+    Com segredo TOTP configurado, o código é gerado e enviado sozinho
+    quando a página pede a verificação (no máximo um envio por janela).
     """
-    
-    while time.time() - wait_start < timeout:
-        try:
-            current_time = time.time() - wait_start
-            
-            # Log de progresso a cada intervalo
-            if int(current_time) - last_check >= check_interval:
-                last_check = int(current_time)
-                elapsed_minutes = int(current_time // 60)
-                elapsed_seconds = int(current_time % 60)
-                log_debug(f"Aguardando MFA... ({elapsed_minutes}m {elapsed_seconds}s)")
-            
-            # Executar verificação JavaScript
-            resultado = executar_js_safe(driver, js_verificar_mfa)
-            
-            if resultado:
-                # Se já está logado (passou do MFA)
-                if resultado.get('isLoggedIn'):
-                    log_ok("✓ MFA aprovado! Login concluído.")
-                    time.sleep(1)  # Aguarda um pouco para garantir carregamento
-                    return True
-                
-                # Se claramente NÃO está mais no MFA
-                if not resultado.get('stillInMFA') and resultado.get('hasLightning'):
-                    log_ok("✓ MFA concluído! Redirecionado com sucesso.")
-                    time.sleep(1)
-                    return True
-            
-            # Verificação adicional pela URL (fallback)
-            try:
-                url_atual = driver.current_url.lower()
-                
-                # Se já está no Lightning e não tem indicadores de MFA
-                if 'lightning' in url_atual and 'verification' not in url_atual and 'mfa' not in url_atual:
-                    # Verificar se há elementos da interface do Salesforce
-                    try:
-                        header = driver.find_elements(By.XPATH, "//header[contains(@class,'slds-global-header')]")
-                        if header:
-                            log_ok("✓ Interface Lightning detectada! MFA concluído.")
-                            time.sleep(0.5)
-                            return True
-                    except:
-                        pass
-            except:
-                pass
-            
-            # Aguardar antes da próxima verificação
-            time.sleep(1)
+    wait_start = time.time()
+    chave = carregar_segredo_totp()
+    ultimo_contador = None
+    envios = 0
+    confirmando = False
+    falhas_seguidas = 0
+    if chave:
+        log_info("TOTP configurado - o código de verificação será preenchido automaticamente")
+    
+    while True:
+        restante = timeout - (time.time() - wait_start)
+        if restante <= 0:
+            break
+        
+        # Logo após o envio o campo ainda existe: espera só login ou navegação
+        seletor_codigo = SELETOR_CODIGO_MFA if chave and envios < TOTP_MAX_ENVIOS and not confirmando else None
+        trecho = TOTP_CONFIRMACAO_S if confirmando else MFA_TRECHO_S
+        resultado = executar_js_async_safe(driver, JS_AGUARDAR_LOGIN,
+                                           int(min(restante, trecho) * 1000), seletor_codigo)
+        # Navegou ou o trecho acabou: campo de código que continuar na página
+        # é código recusado
+        confirmando = False
+        
+        # None: o documento foi descarregado no meio da espera, ou o driver
+        # não responde mais
+        if resultado is None:
+            falhas_seguidas += 1
+            if falhas_seguidas >= MFA_FALHAS_SEGUIDAS_MAX:
+                log_error("A página não responde à espera do MFA (janela fechada ou sessão do driver perdida)")
+                return False
+            time.sleep(min(0.1 * 2 ** (falhas_seguidas - 1), 2, max(restante, 0)))
+            continue
+        falhas_seguidas = 0
+        
+        if resultado.get('estado') == 'logado':
+            log_ok(f"✓ MFA aprovado! Login concluído ({int(time.time() - wait_start)}s).")
+            return True
+        
+        if resultado.get('estado') == 'codigo':
+            contador = int(time.time() // TOTP_PASSO_S)
+            if contador == ultimo_contador:
+                # Código desta janela já foi recusado: espera o próximo
+                time.sleep(min(TOTP_PASSO_S - time.time() % TOTP_PASSO_S + 0.1, max(restante, 0)))
+                continue
             
-        except Exception as e:
-            log_debug(f"Erro na verificação MFA: {str(e)[:100]}")
-            time.sleep(1)
+            ultimo_contador = contador
+            envios += 1
+            res = executar_js_safe(driver, JS_PREENCHER_CODIGO_MFA, SELETOR_CODIGO_MFA,
+                                   SELETOR_ENVIAR_MFA, gerar_totp(chave))
+            if res and res.get('success'):
+                log_ok(f"Código TOTP enviado ({envios}/{TOTP_MAX_ENVIOS})")
+                confirmando = True
+            else:
+                log_warn(f"Não conseguiu enviar o código TOTP: {res.get('error') if res else 'sem resposta'}")
+            if envios >= TOTP_MAX_ENVIOS:
+                log_warn("Limite de envios TOTP atingido - aguardando aprovação manual")
+            continue
+        
+        if resultado.get('estado') == 'navegou':
+            time.sleep(0.1)
+            continue
+        
+        current_time = time.time() - wait_start
+        log_debug(f"Aguardando MFA... ({int(current_time // 60)}m {int(current_time % 60)}s)")
     
     # Se chegou aqui, deu timeout
     log_error(f"⏱️  Timeout MFA ({timeout}s)")
@@ -416,13 +848,7 @@ def logar(driver, usuario, senha):
         if result and result.get('success'):
             log_ok("Credenciais preenchidas e login clicado via JavaScript")
             
-            # Aguardar redirecionamento
-            time.sleep(3)
-            
-            # Verificar se precisa de MFA
-            current_url = driver.current_url
-            page_text = driver.page_source.lower()
-
+            # Aguarda o redirecionamento e, se houver, a aprovação do MFA
             esperar_mfa(driver, timeout=TIMEOUT_MFA)
             
             # Verificar se login foi bem-sucedido
@@ -563,469 +989,255 @@ def verificar_login_salesforce(driver):
     log_warn("⚠ Status de login incerto")
     return None
 
-def executar_js_safe(driver, script, *args):
+def salvar_sessao(driver, caminho=ARQUIVO_SESSAO):
+    """Salva os cookies da sessão autenticada para reaproveitar no próximo início"""
     try:
-        return driver.execute_script(script, *args)
+        # Network.getAllCookies traz os cookies de todos os domínios
+        # (login, my.salesforce.com, lightning.force.com); get_cookies só o atual
+        try:
+            cookies = driver.execute_cdp_cmd('Network.getAllCookies', {}).get('cookies', [])
+        except Exception:
+            cookies = driver.get_cookies()
+        
+        url = driver.current_url
+        base_url = url.split('/lightning/')[0] if '/lightning/' in url else url.split('.com')[0] + '.com'
+        
+        sessao = {
+            'salvo_em': datetime.now().isoformat(timespec='seconds'),
+            'url_inicio': base_url + '/lightning/page/home',
+            'cookies': cookies,
+        }
+        
+        # Escrita atômica e só para o usuário: workers do pool podem salvar juntos
+        tmp = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(sessao, f)
+        os.replace(tmp, caminho)
+        
+        log_ok(f"Sessão salva ({len(cookies)} cookies)")
+        return True
     except Exception as e:
-        log_debug(f"JS Error: {str(e)[:100]}")
-        return None
+        log_warn(f"Não foi possível salvar a sessão: {str(e)[:80]}")
+        return False
 
-def verificar_pagina_inicial(driver, timeout=10):
-    log_info("Verificando página atual...")
+def restaurar_sessao(driver, caminho=ARQUIVO_SESSAO, timeout=TIMEOUT_SESSAO):
+    """Restaura os cookies salvos e confirma se a sessão ainda vale.
     
-    time.sleep(1.2)
-    
-    js_verificar = """
-    const url = window.location.href;
+    Retorna False (sem erro) quando não há sessão salva ou ela expirou;
+    nesse caso quem chamou deve fazer o login completo.
+    """
+    if not os.path.isfile(caminho):
+        return False
     
-    if (url.includes('/lightning/r/Account/') || 
-        url.includes('/lightning/r/Contact/') ||
-        url.includes('/view')) {
-        return { onHome: false, onClient: true, url: url };
-    }
+    try:
+        with open(caminho, encoding='utf-8') as f:
+            sessao = json.load(f)
+    except Exception as e:
+        log_warn(f"Sessão salva ilegível: {str(e)[:80]}")
+        return False
     
-    if (url.includes('/lightning/page/home')) {
-        return { onHome: true, onClient: false, url: url };
-    }
+    log_info(f"Restaurando sessão salva em {sessao.get('salvo_em', '?')}...")
     
-    const links = document.querySelectorAll('a[href*="/lightning/page/home"]');
-    for (const link of links) {
-        const text = (link.innerText || link.textContent || '').trim();
-        if (text.toLowerCase() === 'início' || text.toLowerCase() === 'inicio') {
-            return { onHome: true, onClient: false, url: url };
-        }
-    }
+    cookies = []
+    for cookie in sessao.get('cookies', []):
+        c = {k: cookie[k] for k in _CAMPOS_COOKIE_CDP if k in cookie}
+        # Cookie de sessão vem com expires -1; passar adiante o tornaria expirado
+        if cookie.get('session') or c.get('expires', -1) < 0:
+            c.pop('expires', None)
+        cookies.append(c)
     
-    return { onHome: false, onClient: false, url: url };
-    """
+    try:
+        driver.execute_cdp_cmd('Network.setCookies', {'cookies': cookies})
+    except Exception as e:
+        log_warn(f"Não foi possível restaurar cookies: {str(e)[:80]}")
+        return False
     
-    for i in range(3):
-        time.sleep(1.2)
-        
-        resultado = executar_js_safe(driver, js_verificar)
+    try:
+        driver.get(sessao['url_inicio'])
         
-        if resultado:
-            if resultado.get('onClient'):
-                log_warn("Está na página do CLIENTE - Navegando para Início...")
-                url = resultado.get('url', '')
-                
-                try:
-                    log_info("Navegando para Início...")
-                    base_url = url.split('/lightning/')[0] if '/lightning/' in url else url.split('.com')[0] + '.com'
-                    driver.get(base_url + '/lightning/page/home')
-                    time.sleep(2)
-                    
-                    for _ in range(2):
-                        time.sleep(1)
-                        verif = executar_js_safe(driver, js_verificar)
-                        if verif and verif.get('onHome'):
-                            log_ok("Navegação bem-sucedida")
-                            return True
-                    
-                    log_warn("Ainda não está em Início")
-                    return False
-                except Exception as e:
-                    log_error(f"Erro ao navegar: {e}")
-                    return False
-            
-            if resultado.get('onHome'):
-                log_ok("Página Início detectada")
-                return True
+        # Termina assim que aparecer o header do Lightning ou a tela de login
+        WebDriverWait(driver, timeout).until(lambda d: (
+            'login' in d.current_url or '/secur/' in d.current_url or
+            d.find_elements(By.XPATH, "//header[contains(@class,'slds-global-header')]")
+        ))
         
-        if i < 2:
-            log_debug(f"Verificação {i+1}/3 - aguardando...")
+        url = driver.current_url
+        if '/lightning/' in url and 'login' not in url:
+            log_ok("✓ Sessão restaurada - login e MFA dispensados")
+            return True
+    except Exception as e:
+        log_debug(f"Sessão não confirmada: {str(e)[:80]}")
     
-    log_warn("Não identificou a página")
+    log_warn("Sessão salva expirou - será feito login completo")
     return False
 
-def verificar_notificacao_erro_cpf(driver):
-    """Verifica se há notificação de erro de CPF (inválido ou não encontrado)"""
+@rastrear('login')
+def garantir_login(driver, usuario, senha, usar_sessao=False):
+    """Reaproveita a sessão salva (se habilitado) ou faz o login completo"""
+    recursos_do_driver(driver)['credenciais'] = (usuario, senha, usar_sessao)
     
-    js_verificar_notificacao = """
-    const toasts = document.querySelectorAll('.forceToastMessage');
+    if usar_sessao and restaurar_sessao(driver):
+        return True
     
-    for (const toast of toasts) {
-        const isVisible = toast.offsetWidth > 0 && toast.offsetHeight > 0;
-        
-        if (isVisible) {
-            const isError = toast.classList.contains('slds-theme--error');
-            const isWarning = toast.classList.contains('slds-theme--warning');
-            
-            if (isError || isWarning) {
-                const messageElement = toast.querySelector('.toastMessage');
-                if (messageElement) {
-                    const message = (messageElement.innerText || messageElement.textContent || '').trim();
-                    
-                    if (message.toLowerCase().includes('cpf inválido') || 
-                        message.toLowerCase().includes('cpf invalido')) {
-                        return { hasError: true, type: 'invalid', message: message };
-                    }
-                    
-                    if (message.toLowerCase().includes('cliente não encontrado') ||
-                        message.toLowerCase().includes('cliente nao encontrado') ||
-                        message.toLowerCase().includes('não encontrado') ||
-                        message.toLowerCase().includes('nao encontrado')) {
-                        return { hasError: true, type: 'not_found', message: message };
-                    }
-                }
-            }
-        }
-    }
+    if usar_sessao:
+        # A restauração pode ter deixado a página em outro ponto do fluxo
+        try:
+            driver.get("https://login.salesforce.com/")
+        except Exception:
+            pass
     
-    return { hasError: false };
-    """
+    if not logar_salesforce_robusto(driver, usuario, senha):
+        log_error("Login falhou após todas as tentativas")
+        return False
     
-    try:
-        resultado = executar_js_safe(driver, js_verificar_notificacao)
-        
-        if resultado and resultado.get('hasError'):
-            erro_tipo = resultado.get('type')
-            mensagem = resultado.get('message')
-            
-            if erro_tipo == 'invalid':
-                log_error(f"❌ {mensagem}")
-                return 'invalid'
-            elif erro_tipo == 'not_found':
-                log_warn(f"⚠️ {mensagem}")
-                return 'not_found'
-        
-        return None
-        
-    except Exception as e:
-        log_debug(f"Erro ao verificar notificação: {str(e)[:100]}")
-        return None
-
-def buscar_cpf_automatico(driver, cpf, max_tentativas=3):
-    wait = WebDriverWait(driver, TIMEOUT_SEARCH)
+    if not verificar_login_salesforce(driver):
+        log_error("Verificação de login falhou")
+        return False
     
-    log_info(f"Buscando CPF {cpf}...")
+    if usar_sessao:
+        salvar_sessao(driver)
+    
+    return True
+
+JS_FORMULARIO_LOGIN = """
+return !!(document.querySelector('input#username') && document.querySelector('input#password'));
+"""
+
+JS_SESSAO_EXPIRADA = """
+if (document.querySelector('input#username') && document.querySelector('input#password')) return true;
+const TERMOS = ['sessão expirou', 'sessao expirou', 'sessão expirada', 'sessao expirada',
+                'session has expired', 'session expired', 'invalid_session_id'];
+const avisos = document.querySelectorAll('.forceToastMessage, .slds-notify, .toastMessage, .modal-container, .auraErrorBox, [role="alertdialog"]');
+for (const aviso of avisos) {
+    if (!(aviso.offsetWidth || aviso.offsetHeight)) continue;
+    const texto = (aviso.innerText || aviso.textContent || '').toLowerCase();
+    if (TERMOS.some(t => texto.includes(t))) return true;
+}
+return false;
+"""
+
+def _url_de_login(url):
+    """A URL é da tela de login (redirect de sessão expirada)?
     
+    O redirect mais comum é para a raiz do My Domain com
+    ?ec=302&startURL=/lightning/..., sem 'login' no endereço.
+    """
+    partes = urlsplit(url)
+    if partes.path.startswith('/lightning/'):
+        return False
+    return ('login' in url or partes.path.startswith('/secur/')
+            or re.search(r'(^|&)ec=30[12](&|$)', partes.query) is not None)
+
+def na_tela_de_login(driver):
+    """URL de login ou o formulário de login (#username e #password) na página"""
+    if _url_de_login(driver.current_url):
+        return True
+    return bool(executar_js_safe(driver, JS_FORMULARIO_LOGIN))
+
+def sessao_expirada(driver):
+    """Detecta sessão expirada: tela de login (URL ou formulário) ou aviso de sessão expirada"""
     try:
-        wait.until(EC.presence_of_element_located(
-            (By.XPATH, "//header[contains(@class,'slds-global-header')]")
-        ))
-    except TimeoutException:
-        log_error("Timeout Lightning")
+        if _url_de_login(driver.current_url):
+            return True
+    except Exception:
         return False
+    return bool(executar_js_safe(driver, JS_SESSAO_EXPIRADA))
+
+@rastrear('relogin')
+def relogar(driver):
+    """Refaz o login com as credenciais do garantir_login deste driver.
     
-    log_info("Aguardando carregamento completo da página...")
-    time.sleep(0.1)
+    Com --sessao tenta antes a sessão salva (outro worker pode já ter
+    renovado); o MFA só é automático com segredo TOTP configurado.
+    """
+    credenciais = recursos_do_driver(driver).get('credenciais')
+    if not credenciais:
+        log_error("Sessão expirada e não há credenciais para refazer o login")
+        return False
     
-    for tentativa in range(1, max_tentativas + 1):
-        log_info(f"Tentativa {tentativa}/{max_tentativas}...")
-        
+    log_warn("Sessão expirada - refazendo o login...")
+    usuario, senha, usar_sessao = credenciais
+    
+    if not usar_sessao:
         try:
-            log_debug("Localizando input para digitação...")
-            
-            input_element = None
-            
-            try:
-                wait = WebDriverWait(driver, 1)
-                input_element = wait.until(
-                    EC.element_to_be_clickable((By.NAME, "inputSearch"))
-                )
-            except:
-                try:
-                    input_element = wait.until(
-                        EC.element_to_be_clickable((By.CSS_SELECTOR, "input[type='search']"))
-                    )
-                except:
-                    try:
-                        input_element = wait.until(
-                            EC.element_to_be_clickable((By.XPATH, "//input[contains(@placeholder, 'CPF') or contains(@placeholder, 'CLI')]"))
-                        )
-                    except:
-                        log_warn("Input não encontrado ou não está clicável")
-                        continue
-            
-            if input_element:
-                log_debug("Input encontrado e clicável!")
-                
-                try:
-                    driver.execute_script("""
-                        const overlays = document.querySelectorAll('.slds-backdrop, .slds-modal, [role="dialog"]');
-                        overlays.forEach(el => {
-                            if (el.style) el.style.display = 'none';
-                        });
-                    """)
-                    
-                    driver.execute_script("arguments[0].scrollIntoView({block: 'center', behavior: 'instant'});", input_element)
-                    
-                    driver.execute_script("""
-                        arguments[0].focus();
-                        arguments[0].click();
-                    """, input_element)
-                    
-                    driver.execute_script("arguments[0].value = '';", input_element)
-                    
-                    for i, char in enumerate(cpf):
-                        driver.execute_script("""
-                            const input = arguments[0];
-                            const char = arguments[1];
-                            
-                            input.value += char;
-                            
-                            input.dispatchEvent(new KeyboardEvent('keydown', {key: char, bubbles: true}));
-                            input.dispatchEvent(new KeyboardEvent('keypress', {key: char, bubbles: true}));
-                            input.dispatchEvent(new Event('input', {bubbles: true}));
-                            input.dispatchEvent(new KeyboardEvent('keyup', {key: char, bubbles: true}));
-                        """, input_element, char)
-                        time.sleep(0.02)
-                    
-                    driver.execute_script("""
-                        arguments[0].dispatchEvent(new Event('change', {bubbles: true}));
-                    """, input_element)
-                    
-                    
-                    valor_digitado = input_element.get_attribute('value')
-                    
-                    if valor_digitado and cpf in valor_digitado.replace('-', '').replace('.', ''):
-                        log_ok(f"CPF digitado com sucesso: {valor_digitado}")
-                    else:
-                        log_warn(f"CPF pode não ter sido digitado corretamente. Valor no campo: '{valor_digitado}'")
-                    
-                except Exception as e:
-                    log_warn(f"Erro na digitação: {str(e)[:100]}")
-                    continue
-            else:
-                log_warn("Input não foi localizado")
-                continue
-            
-            script_buscar = """
-            let searchButton = null;
-            
-            const brandButtons = Array.from(document.querySelectorAll('button.slds-button_brand, button[class*="slds-button"]'));
-            for (const btn of brandButtons) {
-                const text = (btn.innerText || btn.textContent || '').trim().toLowerCase();
-                const title = (btn.getAttribute('title') || '').toLowerCase();
-                
-                if (text === 'buscar' || title === 'submit' || text.includes('buscar')) {
-                    searchButton = btn;
-                    break;
-                }
-            }
-            
-            if (!searchButton) {
-                const searchInShadow = (root) => {
-                    const buttons = root.querySelectorAll('button');
-                    for (const btn of buttons) {
-                        const text = (btn.innerText || btn.textContent || '').trim().toLowerCase();
-                        const title = (btn.getAttribute('title') || '').toLowerCase();
-                        if (text === 'buscar' || text.includes('buscar') || title === 'submit') {
-                            return btn;
-                        }
-                    }
-                    
-                    const allElements = root.querySelectorAll('*');
-                    for (const el of allElements) {
-                        if (el.shadowRoot) {
-                            const found = searchInShadow(el.shadowRoot);
-                            if (found) return found;
-                        }
-                    }
-                    return null;
-                };
-                
-                searchButton = searchInShadow(document);
-            }
-            
-            if (!searchButton) {
-                const input = document.querySelector('input[name="inputSearch"]');
-                if (input) {
-                    const parent = input.closest('form, div, lightning-card') || input.parentElement;
-                    if (parent) {
-                        const nearButtons = parent.querySelectorAll('button');
-                        for (const btn of nearButtons) {
-                            const text = (btn.innerText || btn.textContent || '').trim().toLowerCase();
-                            if (text && text.length < 20) {
-                                searchButton = btn;
-                                break;
-                            }
-                        }
-                    }
-                }
-            }
-            
-            if (!searchButton) {
-                return { success: false, error: 'Botão Buscar não encontrado após 3 métodos' };
-            }
-            
-            searchButton.scrollIntoView({block: 'center'});
-            searchButton.click();
-            searchButton.dispatchEvent(new MouseEvent('click', {bubbles: true}));
-            
-            return { success: true, buttonText: searchButton.innerText || searchButton.textContent };
-            """
-            
-            resultado_click = executar_js_safe(driver, script_buscar)
-            
-            if not resultado_click or not resultado_click.get('success'):
-                log_warn(f"Erro ao clicar Buscar: {resultado_click.get('error') if resultado_click else 'sem resposta'}")
-                
-                log_debug("Tentando via Selenium...")
-                try:
-                    btn_selenium = driver.find_element(By.XPATH, "//button[contains(text(), 'Buscar') or @title='Submit']")
-                    btn_selenium.click()
-                    log_ok("Botão Buscar clicado via Selenium")
-                except Exception as e:
-                    log_debug(f"Selenium também falhou: {str(e)[:60]}")
-                    time.sleep(1)
-                    continue
-            else:
-                log_ok(f"Botão Buscar clicado: {resultado_click.get('buttonText', 'Buscar')}")
-            
-            log_info("Verificando resposta da busca...")
-            time.sleep(3)
-            
-            erro_tipo = verificar_notificacao_erro_cpf(driver)
-            
-            if erro_tipo:
-                return erro_tipo
-            
-            log_info("Aguardando resultado aparecer (usando Selenium)...")
-            
-            resultado_apareceu = False
-            elemento_resultado = None
-            
-            seletores_resultado = [
-                "//a[contains(@class, 'slds-p-') or contains(@class, 'slds-m-')]",
-                "//a[contains(@href, '#') and string-length(text()) > 10]",
-                "//a[contains(text(), ' ') and not(contains(text(), 'Pular')) and not(contains(text(), 'Início')) and not(contains(text(), 'Ações'))]",
-                "//div[contains(@class, 'search')]//a",
-                "//div[contains(@class, 'result')]//a",
-                "//lightning-formatted-name//a",
-                "//span[contains(@class, 'uiOutputText')]/..//a"
-            ]
-            
-            for tentativa_espera in range(20):
-                try:
-                    for seletor in seletores_resultado:
-                        try:
-                            elementos = driver.find_elements(By.XPATH, seletor)
-                            
-                            for elem in elementos:
-                                try:
-                                    if not elem.is_displayed():
-                                        continue
-                                    
-                                    texto = elem.text.strip()
-                                    
-                                    if not texto or len(texto) < 6:
-                                        continue
-                                    
-                                    texto_lower = texto.lower()
-                                    
-                                    if any(palavra in texto_lower for palavra in ['pular', 'skip', 'navegação', 'navigation', 
-                                                                                     'início', 'inicio', 'cases', 'contas',
-                                                                                     'configurações', 'home', 'help', 'ajuda',
-                                                                                     'ações globais', 'global actions', 'ações']):
-                                        continue
-                                    
-                                    if ' ' in texto and any(c.isupper() for c in texto) and not texto.isdigit():
-                                        log_ok(f"✓ Resultado encontrado via Selenium: {texto[:40]}")
-                                        elemento_resultado = elem
-                                        resultado_apareceu = True
-                                        break
-                                
-                                except Exception:
-                                    continue
-                            
-                            if resultado_apareceu:
-                                break
-                        
-                        except Exception:
-                            continue
-                    
-                    if resultado_apareceu:
-                        break
-                    
-                    if tentativa_espera % 3 == 0:
-                        log_info(f"Aguardando resultado... ({tentativa_espera + 1}s)")
-                    
-                    time.sleep(1)
-                
-                except Exception as e:
-                    log_debug(f"Erro na tentativa {tentativa_espera}: {str(e)[:50]}")
-                    time.sleep(1)
-            
-            if not resultado_apareceu:
-                log_warn("Resultado não apareceu após 20s")
-                time.sleep(0.5)
-                continue
-            
-            log_info("Clicando no resultado...")
-            
-            if elemento_resultado:
-                try:
-                    driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", elemento_resultado)
-                    time.sleep(0.5)
-                    
-                    clicado = False
-                    
-                    try:
-                        elemento_resultado.click()
-                        clicado = True
-                    except Exception:
-                        pass
-                    
-                    if not clicado:
-                        try:
-                            actions = ActionChains(driver)
-                            actions.move_to_element(elemento_resultado).click().perform()
-                            clicado = True
-                        except Exception:
-                            pass
-                    
-                    if not clicado:
-                        try:
-                            driver.execute_script("arguments[0].click();", elemento_resultado)
-                            clicado = True
-                        except Exception:
-                            pass
-                    
-                    if clicado:
-                        time.sleep(2.5)
-                        
-                        try:
-                            url_atual = driver.current_url
-                            if '/lightning/r/' in url_atual or '/Account/' in url_atual or '/Contact/' in url_atual or '/view' in url_atual:
-                                log_ok("✓ Navegação confirmada para página do cliente!")
-                                # Armazena a URL do cliente para referência futura
-                                _GLOBAL_RESOURCES['cliente_url'] = url_atual
-                                return True
-                            else:
-                                log_warn(f"Ainda na página: {url_atual[:60]}")
-                        except:
-                            pass
-                        
-                        return True
-                    else:
-                        log_error("Não conseguiu clicar no resultado")
-                        time.sleep(1)
-                        continue
-                
-                except Exception as e:
-                    log_error(f"Erro ao clicar: {str(e)[:100]}")
-                    time.sleep(1)
-                    continue
-            
-            log_warn(f"Resultado não encontrado na tentativa {tentativa}")
-            time.sleep(1)
-            
+            driver.get("https://login.salesforce.com/")
         except Exception as e:
-            log_debug(f"Exceção: {str(e)[:100]}")
-            time.sleep(1)
+            log_warn(f"Não abriu a página de login: {str(e)[:60]}")
     
-    log_error(f"Falha após {max_tentativas} tentativas")
+    if garantir_login(driver, usuario, senha, usar_sessao):
+        log_ok("Login refeito - retomando")
+        return True
     return False
 
-def selecionar_combobox_melhorado(driver, label, arrow_count, descricao="", max_tentativas=3):
-    log_info(f"Selecionando '{label}' (opção {arrow_count})")
+def executar_js_safe(driver, script, *args):
+    try:
+        return driver.execute_script(script, *args)
+    except Exception as e:
+        log_debug(f"JS Error: {str(e)[:100]}")
+        return None
+
+def executar_js_async_safe(driver, script, *args):
+    """execute_async_script: o script resolve chamando o último argumento"""
+    try:
+        return driver.execute_async_script(script, *args)
+    except Exception as e:
+        log_debug(f"JS Async Error: {str(e)[:100]}")
+        return None
+
+# Biblioteca de helpers instalada uma vez por documento como window.__sfa.
+# Cada chamada envia só o nome do método e os argumentos (chamar_sfa).
+SFA_VERSAO = 10
+
+JS_SFA_HELPERS = """
+(function() {
+    const VERSAO = %d;
+    if (window.__sfa && window.__sfa.versao === VERSAO) return;
+    
+    function isVisible(el) {
+        try {
+            const rect = el.getBoundingClientRect();
+            const style = window.getComputedStyle(el);
+            return rect.width > 0 && rect.height > 0 && 
+                   style.display !== 'none' && style.visibility !== 'hidden';
+        } catch(e) {
+            return false;
+        }
+    }
     
-    js_preparar = """
-    const label = arguments[0];
+    // Varreduras recursivas originais: ficam só como referência para medirIndice
+    function walkDeep(root, q, isText) {
+        if (!isText) {
+            try {
+                const el = root.querySelector(q);
+                if (el && isVisible(el)) return el;
+            } catch(e){}
+        } else {
+            const tags = ['button', 'a', 'span', 'lightning-button'];
+            for (const tag of tags) {
+                const els = Array.from(root.querySelectorAll(tag));
+                for (const el of els) {
+                    if (isVisible(el)) {
+                        const text = (el.innerText || '').trim();
+                        if (text.toLowerCase().includes(q.toLowerCase())) return el;
+                    }
+                }
+            }
+        }
+        
+        const all = root.querySelectorAll('*');
+        for (const el of all) {
+            try {
+                if (el.shadowRoot) {
+                    const found = walkDeep(el.shadowRoot, q, isText);
+                    if (found) return found;
+                }
+            } catch(e){}
+        }
+        return null;
+    }
     
-    function findInShadow(root, selector, attrCheck) {
+    function walkInShadow(root, selector, attrCheck) {
         const elements = Array.from(root.querySelectorAll(selector));
         for (const el of elements) {
             if (attrCheck(el)) {
@@ -1038,7 +1250,7 @@ def selecionar_combobox_melhorado(driver, label, arrow_count, descricao="", max_
         for (const el of allElements) {
             try {
                 if (el.shadowRoot) {
-                    const found = findInShadow(el.shadowRoot, selector, attrCheck);
+                    const found = walkInShadow(el.shadowRoot, selector, attrCheck);
                     if (found) return found;
                 }
             } catch(e) {}
@@ -1046,35 +1258,7 @@ def selecionar_combobox_melhorado(driver, label, arrow_count, descricao="", max_
         return null;
     }
     
-    const button = findInShadow(
-        document,
-        'button[role="combobox"]',
-        (btn) => {
-            const ariaLabel = (btn.getAttribute('aria-label') || '').toLowerCase();
-            return ariaLabel === label.toLowerCase();
-        }
-    );
-    
-    if (!button) {
-        return { success: false, error: 'Button not found' };
-    }
-    
-    button.scrollIntoView({block: 'center', behavior: 'instant'});
-    button.classList.add('sf-automation-target');
-    window.__sfAutomationButton = button;
-    
-    return { success: true, hasClass: true };
-    """
-    
-    js_verificar_aberto = """
-    const button = window.__sfAutomationButton || document.querySelector('.sf-automation-target');
-    
-    if (!button) return { opened: false, error: 'Button lost' };
-    
-    const dropdownId = button.getAttribute('aria-controls');
-    const expanded = button.getAttribute('aria-expanded');
-    
-    function findDropdown(root, id) {
+    function walkDropdown(root, id) {
         if (id) {
             const el = root.getElementById(id);
             if (el) return el;
@@ -1084,7 +1268,7 @@ def selecionar_combobox_melhorado(driver, label, arrow_count, descricao="", max_
         for (const elem of all) {
             try {
                 if (elem.shadowRoot) {
-                    const found = findDropdown(elem.shadowRoot, id);
+                    const found = walkDropdown(elem.shadowRoot, id);
                     if (found) return found;
                 }
             } catch(e) {}
@@ -1092,1270 +1276,2848 @@ def selecionar_combobox_melhorado(driver, label, arrow_count, descricao="", max_
         return null;
     }
     
-    let dropdown = findDropdown(document, dropdownId);
-    
-    if (!dropdown) {
-        const parent = button.closest('lightning-combobox, .slds-combobox') || button.parentElement;
-        if (parent) {
-            dropdown = parent.querySelector('div[role="listbox"], ul[role="listbox"]');
-        }
-    }
-    
-    if (dropdown) {
-        const rect = dropdown.getBoundingClientRect();
-        const items = dropdown.querySelectorAll('[role="option"]');
+    function walkBySelector(root, selector) {
+        try {
+            const el = root.querySelector(selector);
+            if (el && el.offsetWidth > 0) return el;
+        } catch(e){}
         
-        if (rect.height > 20 && items.length > 0) {
-            return { 
-                opened: true, 
-                items: items.length,
-                expanded: expanded === 'true'
-            };
+        const all = root.querySelectorAll('*');
+        for (const elem of all) {
+            try {
+                if (elem.shadowRoot) {
+                    const found = walkBySelector(elem.shadowRoot, selector);
+                    if (found) return found;
+                }
+            } catch(e){}
         }
+        return null;
     }
     
-    return { 
-        opened: false, 
-        expanded: expanded === 'true',
-        hasDropdownId: !!dropdownId
-    };
-    """
-    
-    js_clicar_opcao = """
-    const targetIndex = arguments[0];
-    
-    const button = window.__sfAutomationButton || document.querySelector('.sf-automation-target');
-    if (!button) return { success: false, error: 'Button not found' };
-    
-    const dropdownId = button.getAttribute('aria-controls');
-    
-    function findDropdown(root, id) {
-        if (id) {
-            const el = root.getElementById(id);
-            if (el) return el;
+    function walkTextarea(root) {
+        const textareas = Array.from(root.querySelectorAll('textarea'));
+        for (const ta of textareas) {
+            const rect = ta.getBoundingClientRect();
+            if (rect.width > 0 && rect.height > 0) return ta;
         }
+        
         const all = root.querySelectorAll('*');
-        for (const elem of all) {
+        for (const el of all) {
             try {
-                if (elem.shadowRoot) {
-                    const found = findDropdown(elem.shadowRoot, id);
+                if (el.shadowRoot) {
+                    const found = walkTextarea(el.shadowRoot);
                     if (found) return found;
                 }
-            } catch(e) {}
+            } catch(e){}
         }
         return null;
     }
     
-    let dropdown = findDropdown(document, dropdownId);
+    // ---- Índice de shadow roots ----
+    // Em vez de querySelectorAll('*') em toda a árvore a cada consulta, os
+    // shadow roots são descobertos uma vez e mantidos por MutationObserver;
+    // as consultas rodam só dentro de cada root, começando pela aba ativa.
+    const indice = { roots: new Set(), observados: new WeakSet(), pronto: false, escopos: new WeakMap() };
     
-    if (!dropdown) {
-        const parent = button.closest('lightning-combobox, .slds-combobox') || button.parentElement;
-        if (parent) {
-            dropdown = parent.querySelector('div[role="listbox"], ul[role="listbox"]');
+    const observer = new MutationObserver((mutacoes) => {
+        for (const m of mutacoes) {
+            for (const n of m.addedNodes) {
+                if (n.nodeType === 1) descobrirRoots(n);
+            }
         }
+    });
+    
+    function registrarRoot(root) {
+        if (indice.observados.has(root)) return;
+        indice.observados.add(root);
+        indice.roots.add(root);
+        observer.observe(root, { childList: true, subtree: true });
+        descobrirRoots(root);
     }
     
-    if (!dropdown) {
-        return { success: false, error: 'Dropdown not found' };
+    function descobrirRoots(node) {
+        if (node.shadowRoot) registrarRoot(node.shadowRoot);
+        const els = node.querySelectorAll ? node.querySelectorAll('*') : [];
+        for (const el of els) {
+            if (el.shadowRoot) registrarRoot(el.shadowRoot);
+        }
     }
     
-    const options = Array.from(dropdown.querySelectorAll('[role="option"]'));
+    function construirIndice() {
+        if (!indice.pronto) {
+            registrarRoot(document);
+            indice.pronto = true;
+        }
+    }
     
-    if (options.length === 0) {
-        return { success: false, error: 'No options found' };
+    // attachShadow e o upgrade de custom elements não geram mutação: um root
+    // criado depois da inserção do host só aparece varrendo de novo. Retorna
+    // true se algum root novo entrou no índice.
+    function redescobrirRoots() {
+        construirIndice();
+        const antes = indice.roots.size;
+        for (const root of Array.from(indice.roots)) descobrirRoots(root);
+        return indice.roots.size > antes;
     }
     
-    const validOptions = options.filter(opt => {
-        const text = (opt.innerText || opt.textContent || '').trim();
-        return text && text !== '--Nenhum--' && text !== 'Nenhum';
-    });
+    const SELETOR_ABA_ATIVA = 'section.tabContent.active, .oneWorkspace.active, div.oneContent.active';
     
-    if (validOptions.length === 0) {
-        return { success: false, error: 'No valid options' };
+    function abaAtiva() {
+        const abas = document.querySelectorAll(SELETOR_ABA_ATIVA);
+        for (const aba of abas) {
+            if (aba.offsetWidth > 0 || aba.offsetHeight > 0) return aba;
+        }
+        return null;
     }
     
-    if (targetIndex > validOptions.length) {
-        return { success: false, error: `Index ${targetIndex} out of range (${validOptions.length} options disponíveis)` };
+    // O elemento (ou o host do root, subindo pelos hosts) está dentro da aba?
+    function dentroDe(node, escopo) {
+        while (node) {
+            if (escopo.contains(node)) return true;
+            const raiz = node.getRootNode();
+            node = raiz && raiz.host ? raiz.host : null;
+        }
+        return false;
     }
     
-    const actualIndex = Math.min(targetIndex, validOptions.length - 1);
-    const targetOption = validOptions[actualIndex];
-    const optionText = (targetOption.innerText || targetOption.textContent || '').trim();
+    function rootDentroDe(root, escopo) {
+        let cache = indice.escopos.get(root);
+        if (!cache || cache.escopo !== escopo) {
+            cache = { escopo: escopo, dentro: dentroDe(root.host, escopo) };
+            indice.escopos.set(root, cache);
+        }
+        return cache.dentro;
+    }
     
-    try {
-        const dropdownRect = dropdown.getBoundingClientRect();
-        const optionRect = targetOption.getBoundingClientRect();
-        
-        // Scroll apenas se necessário
-        if (optionRect.bottom > dropdownRect.bottom || optionRect.top < dropdownRect.top) {
-            targetOption.scrollIntoView({block: 'nearest', behavior: 'instant'});
+    function rootsIndexados(escopo) {
+        construirIndice();
+        const lista = [];
+        for (const root of indice.roots) {
+            if (root !== document && !root.host.isConnected) {
+                indice.roots.delete(root);
+                indice.observados.delete(root);
+                continue;
+            }
+            if (escopo && root !== document && !rootDentroDe(root, escopo)) continue;
+            lista.push(root);
         }
+        return lista;
+    }
+    
+    // Procura primeiro na aba ativa do console; se não achar (modais ficam
+    // fora dela), no documento inteiro
+    function buscarNosRoots(buscarNoRoot) {
+        const escopo = abaAtiva();
+        const tentativas = escopo ? [escopo, null] : [null];
         
-        // Clique direto - eventos em lote
-        targetOption.dispatchEvent(new MouseEvent('mousedown', {bubbles: true}));
-        targetOption.dispatchEvent(new MouseEvent('mouseup', {bubbles: true}));
-        targetOption.dispatchEvent(new MouseEvent('click', {bubbles: true}));
-        targetOption.click();
-        
-        const span = button.querySelector('span.slds-truncate');
-        const currentValue = span ? (span.innerText || '').trim() : '';
-        
-        button.classList.remove('sf-automation-target');
-        delete window.__sfAutomationButton;
-        
-        if (currentValue && currentValue !== '--Nenhum--') {
-            return { 
-                success: true, 
-                value: currentValue,
-                targetText: optionText,
-                method: 'click'
-            };
+        for (const esc of tentativas) {
+            for (const root of rootsIndexados(esc)) {
+                const el = buscarNoRoot(root, esc);
+                if (el) return el;
+            }
         }
-        
-        return { 
-            success: true,
-            value: optionText,
-            targetText: optionText,
-            method: 'click'
-        };
-        
-    } catch(e) {
-        return { success: false, error: String(e) };
+        return null;
     }
-    """
-    
-    for tentativa in range(1, max_tentativas + 1):
-        try:
-            prep = executar_js_safe(driver, js_preparar, label)
-            if not prep or not prep.get('success'):
-                if tentativa < max_tentativas:
-                    time.sleep(0.05)
-                continue
-            
-            try:
-                button_element = driver.execute_script("return window.__sfAutomationButton;")
-                if not button_element:
-                    try:
-                        button_element = driver.find_element(By.CLASS_NAME, 'sf-automation-target')
-                    except:
-                        raise Exception("Button not accessible")
-                
-                # Clique mais direto e rápido
-                driver.execute_script("arguments[0].click();", button_element)
-                
-            except Exception:
-                executar_js_safe(driver, "const b = document.querySelector('.sf-automation-target'); if(b) b.classList.remove('sf-automation-target'); delete window.__sfAutomationButton;")
-                if tentativa < max_tentativas:
-                    time.sleep(0.05)
-                continue
-            
-            # Aguarda brevemente para dropdown abrir
-            time.sleep(0.1)
-            
-            verif = executar_js_safe(driver, js_verificar_aberto)
-            
-            if not verif:
-                if tentativa < max_tentativas:
-                    time.sleep(0.05)
-                continue
-            
-            # Se não abriu, tenta novamente
-            if not verif.get('opened') and tentativa < max_tentativas:
-                try:
-                    driver.execute_script("arguments[0].click();", button_element)
-                    time.sleep(0.1)
-                    verif = executar_js_safe(driver, js_verificar_aberto)
-                    if not verif or not verif.get('opened'):
-                        continue
-                except Exception:
-                    continue
-            
-            option_index = arrow_count - 1
-            
-            resultado = executar_js_safe(driver, js_clicar_opcao, option_index)
-            
-            if resultado and resultado.get('success'):
-                valor = resultado.get('value', descricao)
-                log_ok(f"Selecionado: {valor}")
-                return True
-            
-        except Exception:
-            if tentativa < max_tentativas:
-                time.sleep(0.05)
     
-    log_warn(f"Automação falhou após {max_tentativas} tentativas")
+    // Se o índice não achar, uma varredura completa (como a antiga) registra
+    // os roots que ele perdeu e a busca é refeita uma vez
+    function buscarIndexado(buscarNoRoot) {
+        const el = buscarNosRoots(buscarNoRoot);
+        if (el) return el;
+        return redescobrirRoots() ? buscarNosRoots(buscarNoRoot) : null;
+    }
     
-    manual = input(f"\nSelecionar '{descricao}' MANUALMENTE? (s/n): ").strip().lower()
+    function primeiroQue(selector, aceita) {
+        return buscarIndexado((root, escopo) => {
+            let els;
+            try {
+                els = root.querySelectorAll(selector);
+            } catch(e) {
+                return null;
+            }
+            for (const el of els) {
+                if (escopo && root === document && !escopo.contains(el)) continue;
+                if (aceita(el)) return el;
+            }
+            return null;
+        });
+    }
     
-    if manual == 's':
-        input(f"Selecione '{descricao}' e pressione Enter...")
-        log_ok(f"Seleção manual: {descricao}")
-        return True
+    function temTamanho(el) {
+        const rect = el.getBoundingClientRect();
+        return rect.width > 0 && rect.height > 0;
+    }
     
-    log_warn(f"'{label}' não foi selecionado")
-    return False
-
-def voltar_para_cliente(driver, forcar_retorno=False):
-    """Navega de volta para a aba do cliente (Account) após salvar um caso"""
-    global _GLOBAL_RESOURCES
+    function findDeep(q, isText) {
+        if (!isText) return primeiroQue(q, isVisible);
+        
+        // Mesma prioridade da varredura antiga: tag a tag dentro de cada root
+        const alvo = q.toLowerCase();
+        const aceita = (el) => isVisible(el) && (el.innerText || '').trim().toLowerCase().includes(alvo);
+        return buscarIndexado((root, escopo) => {
+            for (const tag of ['button', 'a', 'span', 'lightning-button']) {
+                for (const el of root.querySelectorAll(tag)) {
+                    if (escopo && root === document && !escopo.contains(el)) continue;
+                    if (aceita(el)) return el;
+                }
+            }
+            return null;
+        });
+    }
     
-    log_info("Retornando para a página do cliente...")
+    function findInShadow(selector, attrCheck) {
+        return primeiroQue(selector, (el) => attrCheck(el) && temTamanho(el));
+    }
     
-    # PRIMEIRO: Verificar se JÁ está na página do cliente (pular se forcar_retorno=True)
-    if not forcar_retorno:
-        try:
-            url_atual = driver.current_url
-            log_debug(f"URL atual: {url_atual[:70]}")
-            
-            if '/lightning/r/Account/' in url_atual or '/lightning/r/Contact/' in url_atual:
-                log_ok("✓ Já está na página do cliente!")
-                _GLOBAL_RESOURCES['cliente_url'] = url_atual
-                return True
-        except Exception as e:
-            log_debug(f"Erro ao verificar URL: {str(e)[:60]}")
+    function findByAriaLabel(selector, label) {
+        const alvo = label.toLowerCase();
+        return findInShadow(selector, (el) => (el.getAttribute('aria-label') || '').toLowerCase() === alvo);
+    }
     
-    # MÉTODO 1: Procurar e clicar na aba do cliente (MAIS CONFIÁVEL)
-    log_info("Procurando aba do cliente aberta...")
+    function findBySelector(selector) {
+        return primeiroQue(selector, (el) => el.offsetWidth > 0);
+    }
     
-    js_voltar = """
-    // Procura TODAS as abas abertas, incluindo as que estão no overflow
-    let allTabs = [];
+    function findTextarea() {
+        return primeiroQue('textarea', temTamanho);
+    }
     
-    // Abas visíveis
-    const visibleTabs = document.querySelectorAll('a[role="tab"]');
-    allTabs.push(...Array.from(visibleTabs));
+    function findDropdown(id) {
+        if (!id) return null;
+        const buscar = () => {
+            for (const root of rootsIndexados(null)) {
+                const el = root.getElementById(id);
+                if (el) return el;
+            }
+            return null;
+        };
+        return buscar() || (redescobrirRoots() ? buscar() : null);
+    }
     
-    // Abas no menu overflow (quando tem muitas abas)
-    const overflowItems = document.querySelectorAll('li[role="presentation"] a[data-tab-value]');
-    allTabs.push(...Array.from(overflowItems));
+    function contarNos() {
+        let total = 0;
+        for (const root of rootsIndexados(null)) {
+            total += root.querySelectorAll('*').length;
+        }
+        return total;
+    }
     
-    let targetTab = null;
-    let foundTabs = [];
+    function medirConsulta(fn, repeticoes) {
+        const inicio = performance.now();
+        let el = null;
+        for (let i = 0; i < repeticoes; i++) el = fn();
+        return { ms: (performance.now() - inicio) / repeticoes, el: el };
+    }
     
-    // Procurar por aba de Account ou Contact
-    for (const tab of allTabs) {
-        const href = tab.getAttribute('href') || '';
-        const title = tab.getAttribute('title') || '';
-        const dataValue = tab.getAttribute('data-tab-value') || '';
+    // Compara a varredura antiga com o índice para uma lista de consultas
+    // {tipo: 'seletor' | 'texto' | 'aria', valor, seletor}
+    function medirIndice(consultas, repeticoes) {
+        repeticoes = repeticoes || 5;
+        
+        const t0 = performance.now();
+        construirIndice();
+        const construcaoMs = performance.now() - t0;
         
-        foundTabs.push({
-            title: title.substring(0, 40),
-            href: href.substring(0, 40),
-            visible: tab.offsetParent !== null
+        const resultados = consultas.map((c) => {
+            let legado, indexado;
+            if (c.tipo === 'texto') {
+                legado = () => walkDeep(document, c.valor, true);
+                indexado = () => findDeep(c.valor, true);
+            } else if (c.tipo === 'aria') {
+                const sel = c.seletor || 'button[role="combobox"]';
+                const alvo = c.valor.toLowerCase();
+                legado = () => walkInShadow(document, sel, (el) => (el.getAttribute('aria-label') || '').toLowerCase() === alvo);
+                indexado = () => findByAriaLabel(sel, c.valor);
+            } else {
+                legado = () => walkDeep(document, c.valor, false);
+                indexado = () => findDeep(c.valor, false);
+            }
+            
+            const a = medirConsulta(legado, repeticoes);
+            const b = medirConsulta(indexado, repeticoes);
+            return {
+                tipo: c.tipo,
+                valor: c.valor,
+                legadoMs: Math.round(a.ms * 1000) / 1000,
+                indiceMs: Math.round(b.ms * 1000) / 1000,
+                encontrado: !!b.el,
+                mesmoElemento: a.el === b.el
+            };
         });
         
-        // Verifica se é uma aba de Account/Contact
-        if (href.includes('/lightning/r/Account/') || 
-            href.includes('/lightning/r/Contact/') ||
-            dataValue.includes('Account') ||
-            dataValue.includes('Contact')) {
-            targetTab = tab;
-            break;
-        }
+        return {
+            nos: contarNos(),
+            roots: indice.roots.size,
+            construcaoMs: Math.round(construcaoMs * 1000) / 1000,
+            consultas: resultados
+        };
     }
     
-    if (!targetTab) {
-        return { 
-            success: false, 
-            error: 'Aba do cliente não encontrada',
-            foundTabs: foundTabs.slice(0, 5)
-        };
+    let comboboxAtual = null;
+    
+    function esperar(ms) {
+        return new Promise(r => setTimeout(r, ms));
     }
     
-    try {
-        // Se a aba não estiver visível, tentar torná-la visível
-        if (targetTab.offsetParent === null) {
-            const overflowButton = document.querySelector('button[title="Mais abas"]');
-            if (overflowButton) {
-                overflowButton.click();
-                // Pequena pausa
-                let w = 0;
-                while(w < 50) { w++; }
-            }
+    // Reavalia a condição a cada quadro (sem bloquear a thread da página)
+    async function aguardar(condicao, timeoutMs) {
+        const limite = performance.now() + timeoutMs;
+        while (performance.now() < limite) {
+            try {
+                if (condicao()) return true;
+            } catch(e) {}
+            await esperar(16);
         }
-        
-        // Scroll até a aba
-        targetTab.scrollIntoView({block: 'center', behavior: 'instant'});
-        
-        // Pequena pausa
-        let w = 0;
-        while(w < 30) { w++; }
-        
-        // Clicar múltiplas vezes para garantir
-        targetTab.click();
-        targetTab.dispatchEvent(new MouseEvent('click', {bubbles: true}));
-        
-        return { 
-            success: true, 
-            title: targetTab.getAttribute('title') || 'Cliente',
-            href: targetTab.getAttribute('href') || ''
-        };
-    } catch(e) {
-        return { success: false, error: String(e) };
+        return false;
     }
-    """
     
-    try:
-        resultado = executar_js_safe(driver, js_voltar)
-        
-        if resultado and resultado.get('success'):
-            log_ok(f"✓ Clicou na aba: {resultado.get('title', 'Cliente')}")
-            time.sleep(1.5)
+    // Resolve quando condicao() vale, sem bloquear a renderização: reage às
+    // mutações do document e, para o que muda em shadow roots, a cada 100 ms.
+    // assinar(agendar) pode ligar outros eventos e devolver quem os desliga.
+    function aguardarMutacao(condicao, timeoutMs, assinar) {
+        return new Promise(resolve => {
+            const inicio = performance.now();
+            let finalizado = false;
+            let agendado = false;
+            let observer = null;
+            let intervalo = null;
+            let timer = null;
+            let desligar = null;
             
-            # Verificar se realmente mudou
-            url_final = driver.current_url
-            if '/lightning/r/Account/' in url_final or '/lightning/r/Contact/' in url_final:
-                log_ok("✓ Confirmado na página do cliente!")
-                _GLOBAL_RESOURCES['cliente_url'] = url_final
-                return True
-            else:
-                log_debug(f"URL após clique: {url_final[:60]}")
-        else:
-            erro = resultado.get('error', 'sem resposta') if resultado else 'sem resposta'
-            log_warn(f"Não encontrou aba: {erro}")
-            
-            # Mostrar abas encontradas para debug
-            if resultado and resultado.get('foundTabs'):
-                log_debug("Abas abertas:")
-                for tab in resultado.get('foundTabs', [])[:3]:
-                    log_debug(f"  - {tab.get('title', '?')[:30]}")
-    except Exception as e:
-        log_error(f"Erro ao procurar aba: {str(e)[:100]}")
-    
-    # MÉTODO 2: Usar a URL armazenada
-    if _GLOBAL_RESOURCES.get('cliente_url'):
-        try:
-            url_cliente = _GLOBAL_RESOURCES['cliente_url']
-            log_info("Tentando URL armazenada...")
-            log_debug(f"URL: {url_cliente[:50]}...")
+            function finalizar(ok) {
+                if (finalizado) return;
+                finalizado = true;
+                if (observer) observer.disconnect();
+                if (desligar) desligar();
+                clearInterval(intervalo);
+                clearTimeout(timer);
+                resolve({ ok: ok, ms: Math.round(performance.now() - inicio) });
+            }
             
-            driver.get(url_cliente)
-            time.sleep(1.5)
+            function verificar() {
+                agendado = false;
+                if (finalizado) return;
+                try {
+                    if (condicao()) finalizar(true);
+                } catch(e) {}
+            }
             
-            url_nova = driver.current_url
-            if '/lightning/r/Account/' in url_nova or '/lightning/r/Contact/' in url_nova:
-                log_ok("✓ Retornou usando URL direta!")
-                return True
-        except Exception as e:
-            log_debug(f"Erro com URL direta: {str(e)[:60]}")
-    
-    # MÉTODO 3: Histórico do navegador
-    log_info("Tentando usar histórico...")
-    try:
-        for i in range(3):  # Tentar voltar até 3 páginas
-            driver.back()
-            time.sleep(1)
+            function agendar() {
+                if (!agendado) {
+                    agendado = true;
+                    setTimeout(verificar, 0);
+                }
+            }
             
-            url_back = driver.current_url
-            if '/lightning/r/Account/' in url_back or '/lightning/r/Contact/' in url_back:
-                log_ok(f"✓ Voltou para cliente (histórico -{i+1})!")
-                _GLOBAL_RESOURCES['cliente_url'] = url_back
-                return True
-    except Exception as e:
-        log_debug(f"Erro no histórico: {str(e)[:60]}")
+            observer = new MutationObserver(agendar);
+            observer.observe(document.documentElement, { childList: true, subtree: true });
+            intervalo = setInterval(agendar, 100);
+            timer = setTimeout(() => finalizar(false), timeoutMs);
+            if (assinar) desligar = assinar(agendar);
+            verificar();
+        });
+    }
     
-    # Se nada funcionou
-    log_error("✗ Não conseguiu voltar automaticamente")
-    return False
-
-
-def verificar_se_esta_na_pagina_cliente(driver):
-    """Verifica se realmente está na página do cliente"""
-    try:
-        url_atual = driver.current_url
-        
-        if '/lightning/r/Account/' in url_atual or '/lightning/r/Contact/' in url_atual:
-            log_debug("✓ Está na página do cliente")
-            return True
-        
-        log_debug(f"✗ NÃO está na página do cliente. URL: {url_atual[:60]}")
-        return False
-    except Exception as e:
-        log_debug(f"Erro ao verificar página: {str(e)[:60]}")
-        return False
-
-def registrar_informacao_automatico(driver):
-    log_info("Iniciando registro automático...")
+    // Navegação: id do registro -> aba do console em que ele está aberto
+    const abasRegistro = new Map();
+    const PREFIXOS_CLIENTE = ['/lightning/r/Account/', '/lightning/r/Contact/'];
     
-    js_click = """
-    const query = arguments[0];
-    const mode = arguments[1] || 'selector';
+    function idDoRegistro(url) {
+        const resto = (url || '').split('/lightning/r/')[1];
+        if (!resto) return null;
+        const partes = resto.split('/');
+        return partes.length > 1 && partes[1].length >= 15 ? partes[1] : null;
+    }
     
-    function findDeep(root, q, isText) {
-        if (!isText) {
-            try {
-                const el = root.querySelector(q);
-                if (el && isVisible(el)) return el;
-            } catch(e){}
-        } else {
-            const tags = ['button', 'a', 'span', 'lightning-button'];
-            for (const tag of tags) {
-                const els = Array.from(root.querySelectorAll(tag));
-                for (const el of els) {
-                    if (isVisible(el)) {
-                        const text = (el.innerText || '').trim();
-                        if (text.toLowerCase().includes(q.toLowerCase())) return el;
-                    }
-                }
+    function chaveDaAba(tab) {
+        const item = tab.closest('[data-tabid]');
+        return tab.getAttribute('aria-controls') || (item ? item.getAttribute('data-tabid') : null);
+    }
+    
+    // Sem id, vale a primeira aba de conta/contato
+    function abaDoRegistro(recordId) {
+        const chave = recordId && abasRegistro.get(recordId);
+        if (chave) {
+            const c = CSS.escape(chave);
+            const tab = document.querySelector(`a[role="tab"][aria-controls="${c}"], [data-tabid="${c}"] a[role="tab"]`);
+            if (tab) return tab;
+            abasRegistro.delete(recordId);
+        }
+        
+        // Abas visíveis e as do menu overflow (quando tem muitas abas)
+        const abas = document.querySelectorAll('a[role="tab"], li[role="presentation"] a[data-tab-value]');
+        for (const tab of abas) {
+            const href = tab.getAttribute('href') || '';
+            const valor = tab.getAttribute('data-tab-value') || '';
+            const casa = recordId
+                ? href.includes(recordId) || valor.includes(recordId)
+                : PREFIXOS_CLIENTE.some(p => href.includes(p)) || valor.includes('Account') || valor.includes('Contact');
+            if (casa) {
+                const id = recordId || idDoRegistro(href);
+                if (id && chaveDaAba(tab)) abasRegistro.set(id, chaveDaAba(tab));
+                return tab;
             }
         }
+        return null;
+    }
+    
+    function chegouNoRegistro(recordId, seletorCarregado) {
+        const url = location.href;
+        const noRegistro = recordId ? url.includes(recordId) : PREFIXOS_CLIENTE.some(p => url.includes(p));
+        return noRegistro && !!document.querySelector(seletorCarregado);
+    }
+    
+    // Troca de rota do Lightning: aura:locationChange (e popstate no histórico)
+    function assinarRota(agendar) {
+        let handlerAura = null;
+        window.addEventListener('popstate', agendar);
+        try {
+            if (window.$A && $A.eventService) {
+                $A.eventService.addHandler({ event: 'aura:locationChange', handler: agendar });
+                handlerAura = agendar;
+            }
+        } catch(e) {}
         
-        const all = root.querySelectorAll('*');
-        for (const el of all) {
+        return () => {
+            window.removeEventListener('popstate', agendar);
             try {
-                if (el.shadowRoot) {
-                    const found = findDeep(el.shadowRoot, q, isText);
-                    if (found) return found;
-                }
-            } catch(e){}
+                if (handlerAura) $A.eventService.removeHandler({ event: 'aura:locationChange', handler: handlerAura });
+            } catch(e) {}
+        };
+    }
+    
+    // Abas de registro do console (workspace e subabas)
+    function abasDoConsole() {
+        return Array.from(document.querySelectorAll('a[role="tab"][href*="/lightning/r/"]'));
+    }
+    
+    // Chave que sobrevive a um recarregamento da página: aria-controls e
+    // data-tabid são gerados de novo, o registro da aba não
+    function identificadorAba(tab) {
+        const href = tab.getAttribute('href') || '';
+        return idDoRegistro(href) || href.split(/[?#]/)[0];
+    }
+    
+    function clicarAba(tab) {
+        // Aba escondida no overflow: abre o menu "Mais abas" antes
+        if (tab.offsetParent === null) {
+            const mais = document.querySelector('button[title="Mais abas"]');
+            if (mais) mais.click();
         }
-        return null;
+        tab.scrollIntoView({block: 'center', behavior: 'instant'});
+        tab.click();
+        return true;
     }
     
-    function isVisible(el) {
+    function navegarPorEvento(recordId) {
+        if (!recordId || !window.$A) return false;
         try {
-            const rect = el.getBoundingClientRect();
-            const style = window.getComputedStyle(el);
-            return rect.width > 0 && rect.height > 0 && 
-                   style.display !== 'none' && style.visibility !== 'hidden';
+            const evento = $A.get('e.force:navigateToSObject');
+            if (!evento) return false;
+            evento.setParams({ recordId: recordId });
+            evento.fire();
+            return true;
         } catch(e) {
             return false;
         }
     }
     
-    const el = findDeep(document, query, mode === 'text');
-    if (!el) return { success: false };
+    function textoOpcao(opt) {
+        return (opt.innerText || opt.textContent || '').trim();
+    }
     
-    try {
-        el.scrollIntoView({block: 'center'});
-        el.click();
-        return { success: true };
-    } catch(e) {
-        try {
-            ['mousedown', 'click'].forEach(ev => {
-                el.dispatchEvent(new MouseEvent(ev, {bubbles: true}));
-            });
-            return { success: true };
-        } catch(e2) {
-            return { success: false };
+    function opcoesValidas(dropdown) {
+        const options = Array.from(dropdown.querySelectorAll('[role="option"]'));
+        if (options.length === 0) return null;
+        
+        return options.filter(opt => {
+            const text = textoOpcao(opt);
+            return text && text !== '--Nenhum--' && text !== 'Nenhum';
+        });
+    }
+    
+    // Texto e data-value (API name) -> opção, para seleção por label
+    function indiceOpcoes(validOptions) {
+        const mapa = new Map();
+        for (const opt of validOptions) {
+            const valor = (opt.getAttribute('data-value') || '').toLowerCase();
+            if (valor && !mapa.has(valor)) mapa.set(valor, opt);
+            mapa.set(textoOpcao(opt).toLowerCase(), opt);
         }
+        return mapa;
     }
-    """
     
-    js_fill_textarea = """
-    const text = arguments[0];
+    // Anexa os textos das opções ao resultado para o cache de picklists
+    function comOpcoes(resultado, validOptions) {
+        resultado.opcoes = validOptions.map(textoOpcao);
+        return resultado;
+    }
     
-    function findDeep(root) {
-        const textareas = Array.from(root.querySelectorAll('textarea'));
-        for (const ta of textareas) {
-            const rect = ta.getBoundingClientRect();
-            if (rect.width > 0 && rect.height > 0) return ta;
-        }
+    function selecionarOpcao(button, dropdown, targetOption) {
+        const optionText = textoOpcao(targetOption);
         
-        const all = root.querySelectorAll('*');
-        for (const el of all) {
-            try {
-                if (el.shadowRoot) {
-                    const found = findDeep(el.shadowRoot);
-                    if (found) return found;
-                }
-            } catch(e){}
+        try {
+            const dropdownRect = dropdown.getBoundingClientRect();
+            const optionRect = targetOption.getBoundingClientRect();
+            
+            // Scroll apenas se necessário
+            if (optionRect.bottom > dropdownRect.bottom || optionRect.top < dropdownRect.top) {
+                targetOption.scrollIntoView({block: 'nearest', behavior: 'instant'});
+            }
+            
+            // Clique direto - eventos em lote
+            targetOption.dispatchEvent(new MouseEvent('mousedown', {bubbles: true}));
+            targetOption.dispatchEvent(new MouseEvent('mouseup', {bubbles: true}));
+            targetOption.dispatchEvent(new MouseEvent('click', {bubbles: true}));
+            targetOption.click();
+            
+            const span = button.querySelector('span.slds-truncate');
+            const currentValue = span ? (span.innerText || '').trim() : '';
+            
+            comboboxAtual = null;
+            
+            return { 
+                success: true, 
+                value: currentValue && currentValue !== '--Nenhum--' ? currentValue : optionText,
+                targetText: optionText,
+                method: 'click'
+            };
+            
+        } catch(e) {
+            return { success: false, error: String(e) };
         }
-        return null;
     }
     
-    const textarea = findDeep(document);
-    if (!textarea) return { success: false };
-    
-    try {
-        textarea.focus();
-        textarea.value = text;
-        textarea.dispatchEvent(new Event('input', {bubbles: true}));
-        textarea.dispatchEvent(new Event('change', {bubbles: true}));
-        return { success: true };
-    } catch(e) {
-        return { success: false };
-    }
-    """
-    
-    def click_element(query, mode='selector', tries=3):
-        for i in range(tries):
-            res = executar_js_safe(driver, js_click, query, mode)
-            if res and res.get('success'):
-                log_ok(f"Clicado: {query}")
-                return True
-            time.sleep(0.1)
-        log_warn(f"Falha: {query}")
-        return False
-    
-    print("\n" + "="*70)
-    print("   REGISTRO AUTOMÁTICO")
-    print("="*70 + "\n")
-    
-    log_info("1. Abrindo Casos...")
-    if not click_element('a[data-tab-value="flexipage_tab3"]'):
-        click_element('Casos', 'text')
-    time.sleep(0.3)
-    
-    log_info("2. Clicando Criar...")
-    if not click_element('button[name="NewCase"]'):
-        click_element('Criar', 'text')
-    time.sleep(0.5)
-    
-    log_info("3. Aguardando carregamento do formulário...")
-    # AGUARDAR O FORMULÁRIO CARREGAR COMPLETAMENTE
-    js_aguardar_radio = """
-    let tentativas = 0;
-    const maxTentativas = 30; // 3 segundos (30 x 100ms)
-    
-    function verificarRadios() {
-        const labels = Array.from(document.querySelectorAll('label, span'));
+    // Radio do tipo de registro cujo label contém algum dos textos
+    function radioPorTexto(textos) {
+        const termos = textos.map(t => t.toLowerCase());
+        const labels = document.querySelectorAll('label, span');
         for (const label of labels) {
-            const text = (label.innerText || '').toLowerCase();
-            if (text.includes('informação') || text.includes('informacao') || 
-                text.includes('dúvida') || text.includes('elogio')) {
+            const text = (label.innerText || label.textContent || '').toLowerCase();
+            if (termos.some(t => text.includes(t))) {
                 const input = label.querySelector('input[type="radio"]') ||
                              document.querySelector(`input[id="${label.getAttribute('for')}"]`);
-                if (input) {
-                    return true; // Radio encontrado
-                }
+                if (input) return input;
             }
         }
-        return false;
+        return null;
     }
     
-    while (tentativas < maxTentativas) {
-        if (verificarRadios()) {
-            return { ready: true, tentativas: tentativas };
-        }
+    function dropdownDoCombobox(button) {
+        let dropdown = findDropdown(button.getAttribute('aria-controls'));
         
-        // Aguardar 100ms de forma síncrona
-        const start = Date.now();
-        while (Date.now() - start < 100) {}
-        
-        tentativas++;
+        if (!dropdown) {
+            const parent = button.closest('lightning-combobox, .slds-combobox') || button.parentElement;
+            if (parent) {
+                dropdown = parent.querySelector('div[role="listbox"], ul[role="listbox"]');
+            }
+        }
+        return dropdown;
     }
     
-    return { ready: false, tentativas: tentativas };
-    """
-    
-    resultado_espera = executar_js_safe(driver, js_aguardar_radio)
-    
-    if resultado_espera and resultado_espera.get('ready'):
-        log_ok(f"Formulário carregado ({resultado_espera.get('tentativas')*100}ms)")
-    else:
-        log_warn("Formulário pode não ter carregado completamente")
-        time.sleep(0.5)  # Espera adicional de segurança
-    
-    log_info("4. Selecionando tipo...")
-    
-    js_radio = """
-    const labels = Array.from(document.querySelectorAll('label, span'));
-    for (const label of labels) {
-        const text = (label.innerText || '').toLowerCase();
-        if (text.includes('informação') || text.includes('informacao') || 
-            text.includes('dúvida') || text.includes('elogio')) {
-            const input = label.querySelector('input[type="radio"]') ||
-                         document.querySelector(`input[id="${label.getAttribute('for')}"]`);
-            if (input) {
+    const sfa = {
+        versao: VERSAO,
+        isVisible: isVisible,
+        findDeep: findDeep,
+        findInShadow: findInShadow,
+        findDropdown: findDropdown,
+        findBySelector: findBySelector,
+        findTextarea: findTextarea,
+        findByAriaLabel: findByAriaLabel,
+        medirIndice: medirIndice,
+        
+        click: function(query, mode) {
+            const el = findDeep(query, (mode || 'selector') === 'text');
+            if (!el) return { success: false };
+            
+            try {
+                el.scrollIntoView({block: 'center'});
+                el.click();
+                return { success: true };
+            } catch(e) {
                 try {
-                    input.checked = true;
-                    input.click();
-                    input.dispatchEvent(new Event('change', {bubbles: true}));
+                    ['mousedown', 'click'].forEach(ev => {
+                        el.dispatchEvent(new MouseEvent(ev, {bubbles: true}));
+                    });
                     return { success: true };
+                } catch(e2) {
+                    return { success: false };
+                }
+            }
+        },
+        
+        fillTextarea: function(text) {
+            const textarea = findTextarea();
+            if (!textarea) return { success: false };
+            
+            try {
+                textarea.focus();
+                textarea.value = text;
+                textarea.dispatchEvent(new Event('input', {bubbles: true}));
+                textarea.dispatchEvent(new Event('change', {bubbles: true}));
+                return { success: true };
+            } catch(e) {
+                return { success: false };
+            }
+        },
+        
+        fillInput: function(selector, value, blur) {
+            const input = findBySelector(selector);
+            if (!input) return { success: false, error: 'Input não encontrado' };
+            
+            try {
+                input.focus();
+                input.value = '';
+                input.value = value;
+                input.dispatchEvent(new Event('input', {bubbles: true}));
+                input.dispatchEvent(new Event('change', {bubbles: true}));
+                if (blur) input.dispatchEvent(new Event('blur', {bubbles: true}));
+                return { success: true, value: value };
+            } catch(e) {
+                return { success: false, error: String(e) };
+            }
+        },
+        
+        prepararCombobox: function(label) {
+            const button = findByAriaLabel('button[role="combobox"]', label);
+            
+            if (!button) {
+                return { success: false, error: 'Button not found' };
+            }
+            
+            button.scrollIntoView({block: 'center', behavior: 'instant'});
+            comboboxAtual = button;
+            
+            return { success: true, button: button };
+        },
+        
+        abrirCombobox: function() {
+            if (!comboboxAtual) return { success: false, error: 'Button lost' };
+            comboboxAtual.click();
+            return { success: true };
+        },
+        
+        limparCombobox: function() {
+            comboboxAtual = null;
+            return { success: true };
+        },
+        
+        comboboxAberto: function() {
+            const button = comboboxAtual;
+            if (!button) return { opened: false, error: 'Button lost' };
+            
+            const expanded = button.getAttribute('aria-expanded');
+            const dropdown = dropdownDoCombobox(button);
+            
+            if (dropdown) {
+                const rect = dropdown.getBoundingClientRect();
+                const items = dropdown.querySelectorAll('[role="option"]');
+                
+                if (rect.height > 20 && items.length > 0) {
+                    return { 
+                        opened: true, 
+                        items: items.length,
+                        expanded: expanded === 'true'
+                    };
+                }
+            }
+            
+            return { 
+                opened: false, 
+                expanded: expanded === 'true',
+                hasDropdownId: !!button.getAttribute('aria-controls')
+            };
+        },
+        
+        clicarOpcao: function(targetIndex) {
+            const button = comboboxAtual;
+            if (!button) return { success: false, error: 'Button not found' };
+            
+            const dropdown = dropdownDoCombobox(button);
+            if (!dropdown) {
+                return { success: false, error: 'Dropdown not found' };
+            }
+            
+            const validOptions = opcoesValidas(dropdown);
+            if (!validOptions) return { success: false, error: 'No options found' };
+            
+            if (validOptions.length === 0) {
+                return { success: false, error: 'No valid options' };
+            }
+            
+            if (targetIndex > validOptions.length) {
+                return { success: false, error: `Index ${targetIndex} out of range (${validOptions.length} options disponíveis)` };
+            }
+            
+            const actualIndex = Math.min(targetIndex, validOptions.length - 1);
+            return comOpcoes(selecionarOpcao(button, dropdown, validOptions[actualIndex]), validOptions);
+        },
+        
+        clicarOpcaoPorTexto: function(texto) {
+            const button = comboboxAtual;
+            if (!button) return { success: false, error: 'Button not found' };
+            
+            const dropdown = dropdownDoCombobox(button);
+            if (!dropdown) {
+                return { success: false, error: 'Dropdown not found' };
+            }
+            
+            const validOptions = opcoesValidas(dropdown);
+            if (!validOptions || validOptions.length === 0) {
+                return { success: false, error: 'No valid options' };
+            }
+            
+            const targetOption = indiceOpcoes(validOptions).get(texto.trim().toLowerCase());
+            
+            if (!targetOption) {
+                return comOpcoes({ success: false, error: `Opção '${texto}' não existe (${validOptions.length} opções)` }, validOptions);
+            }
+            
+            return comOpcoes(selecionarOpcao(button, dropdown, targetOption), validOptions);
+        },
+        
+        // Preenche vários comboboxes em sequência numa única chamada assíncrona.
+        // campos: [{label, opcao}] com opcao = posição (1 = primeira válida) ou texto
+        preencherComboboxes: async function(campos, opcoes) {
+            opcoes = opcoes || {};
+            const maxTentativas = opcoes.maxTentativas || 3;
+            const timeoutAbrirMs = opcoes.timeoutAbrirMs || 1500;
+            const relatorio = [];
+            
+            for (const campo of campos) {
+                const inicio = performance.now();
+                let tentativas = 0;
+                let resultado = { success: false, error: 'não tentado' };
+                
+                while (tentativas < maxTentativas && !resultado.success) {
+                    tentativas++;
+                    
+                    const prep = sfa.prepararCombobox(campo.label);
+                    if (!prep.success) {
+                        resultado = prep;
+                        await esperar(50);
+                        continue;
+                    }
+                    
+                    comboboxAtual.click();
+                    
+                    // Dependentes (ex.: Subcategoria) só ganham opções depois do pai
+                    const abriu = await aguardar(() => sfa.comboboxAberto().opened, timeoutAbrirMs);
+                    if (!abriu) {
+                        resultado = { success: false, error: 'Dropdown não abriu' };
+                        continue;
+                    }
+                    
+                    resultado = typeof campo.opcao === 'number'
+                        ? sfa.clicarOpcao(campo.opcao - 1)
+                        : sfa.clicarOpcaoPorTexto(String(campo.opcao));
+                }
+                
+                comboboxAtual = null;
+                relatorio.push({
+                    label: campo.label,
+                    opcao: campo.opcao,
+                    success: !!resultado.success,
+                    valor: resultado.value || null,
+                    opcoes: resultado.opcoes || null,
+                    erro: resultado.success ? null : (resultado.error || null),
+                    tentativas: tentativas,
+                    ms: Math.round(performance.now() - inicio)
+                });
+                
+                // Deixa o LWC processar a seleção antes do próximo campo
+                await esperar(0);
+            }
+            
+            return relatorio;
+        },
+        
+        // Primitivas dos fluxos declarativos (fluxos_casos.json)
+        // Opções da listbox ligada ao campo de busca que contêm o termo
+        // digitado nele: outra listbox aberta ou resultados antigos não contam
+        opcoesDaBusca: function(seletorBusca) {
+            const busca = document.querySelector(seletorBusca);
+            const termo = busca ? (busca.value || '').trim().toLowerCase() : '';
+            if (!termo) return [];
+            
+            const id = busca.getAttribute('aria-controls') || busca.getAttribute('aria-owns');
+            let lista = id ? document.getElementById(id) : null;
+            for (let p = busca.parentElement; !lista && p && p !== document.body; p = p.parentElement) {
+                lista = p.querySelector('[role="listbox"]');
+            }
+            if (!lista) return [];
+            
+            return Array.from(lista.querySelectorAll('[role="option"]'))
+                .filter(o => (o.textContent || '').toLowerCase().includes(termo));
+        },
+        
+        clicarOpcaoDaBusca: function(seletorBusca, indice) {
+            const opcoes = sfa.opcoesDaBusca(seletorBusca);
+            const el = opcoes[indice || 0];
+            if (!el) return { success: false, encontrados: opcoes.length };
+            
+            el.scrollIntoView({block: 'center'});
+            el.click();
+            return { success: true, texto: (el.textContent || '').trim() };
+        },
+        
+        clicarElemento: function(seletor, texto, exato, indice) {
+            let candidatos = Array.from(document.querySelectorAll(seletor));
+            if (texto) {
+                candidatos = candidatos.filter(el => {
+                    const t = (el.textContent || '').trim();
+                    return exato ? t === texto : t.includes(texto);
+                });
+            }
+            
+            const el = candidatos[indice || 0];
+            if (!el) return { success: false, encontrados: candidatos.length };
+            
+            el.scrollIntoView({block: 'center'});
+            el.click();
+            return { success: true };
+        },
+        
+        aguardarRadio: async function(textos, timeoutMs) {
+            const r = await aguardarMutacao(() => !!radioPorTexto(textos), timeoutMs || 5000);
+            return { success: r.ok, ms: r.ms };
+        },
+        
+        selecionarRadio: function(textos) {
+            const input = radioPorTexto(textos);
+            if (!input) return { success: false };
+            
+            try {
+                input.checked = true;
+                input.click();
+                input.dispatchEvent(new Event('change', {bubbles: true}));
+                return { success: true };
+            } catch(e) {
+                return { success: false, error: String(e) };
+            }
+        },
+        
+        desmarcarCheckboxes: function(termos) {
+            let desmarcados = 0;
+            for (const input of document.querySelectorAll('lightning-input')) {
+                const title = input.getAttribute('title') || '';
+                if (!termos.some(t => title.includes(t))) continue;
+                
+                input.removeAttribute('checked');
+                try {
+                    const primitive = input.shadowRoot &&
+                        input.shadowRoot.querySelector('lightning-primitive-input-checkbox');
+                    const realInput = primitive && primitive.shadowRoot &&
+                        primitive.shadowRoot.querySelector('input[type="checkbox"]');
+                    if (realInput) {
+                        realInput.checked = false;
+                        realInput.dispatchEvent(new Event('change', {bubbles: true}));
+                        desmarcados++;
+                    }
                 } catch(e) {}
             }
+            return { success: true, desmarcados: desmarcados };
+        },
+        
+        preencherEditor: function(seletor, texto) {
+            const body = document.querySelector(seletor);
+            if (!body) return { success: false };
+            
+            body.focus();
+            body.innerHTML = texto.replace(/\\n/g, '<br>');
+            body.dispatchEvent(new Event('input', {bubbles: true}));
+            return { success: true };
+        },
+        
+        preencherLookup: function(seletor, valor) {
+            const input = document.querySelector(seletor);
+            if (!input) return { success: false };
+            
+            input.focus();
+            input.value = valor;
+            input.dispatchEvent(new Event('input', {bubbles: true}));
+            input.dispatchEvent(new KeyboardEvent('keydown', {key: 'Enter', bubbles: true}));
+            return { success: true };
+        },
+        
+        escolherNoMenu: async function(seletorAbrir, seletorOpcoes, indice, timeoutMs) {
+            const botao = document.querySelector(seletorAbrir);
+            if (!botao) return { success: false, error: 'Menu não encontrado' };
+            
+            botao.click();
+            const abriu = await aguardar(
+                () => document.querySelectorAll(seletorOpcoes).length > indice, timeoutMs || 3000
+            );
+            if (!abriu) return { success: false, error: 'Opção não apareceu' };
+            
+            document.querySelectorAll(seletorOpcoes)[indice].click();
+            return { success: true };
+        },
+        
+        // Leva o console ao registro sem recarregar o app: aba já aberta,
+        // depois force:navigateToSObject. semApi = nenhum dos dois disponível.
+        navegarParaRegistro: async function(recordId, seletorCarregado, timeoutMs) {
+            if (chegouNoRegistro(recordId, seletorCarregado)) {
+                abaDoRegistro(recordId || idDoRegistro(location.href));
+                return { success: true, metodo: 'já estava', ms: 0 };
+            }
+            
+            const tentativas = [
+                ['aba', () => { const tab = abaDoRegistro(recordId); return !!tab && clicarAba(tab); }],
+                ['navigateToSObject', () => navegarPorEvento(recordId)]
+            ];
+            
+            let usado = null;
+            for (const [metodo, navegar] of tentativas) {
+                if (!navegar()) continue;
+                usado = metodo;
+                const r = await aguardarMutacao(() => chegouNoRegistro(recordId, seletorCarregado), timeoutMs || 10000, assinarRota);
+                if (r.ok) {
+                    abaDoRegistro(recordId || idDoRegistro(location.href));
+                    return { success: true, metodo: metodo, ms: r.ms };
+                }
+            }
+            
+            return { success: false, semApi: !usado, metodo: usado };
+        },
+        
+        registrarAbaAtual: function() {
+            const id = idDoRegistro(location.href);
+            return { success: !!(id && abaDoRegistro(id)), id: id };
+        },
+        
+        listarAbas: function() {
+            return abasDoConsole().map(tab => ({
+                chave: identificadorAba(tab),
+                id: idDoRegistro(tab.getAttribute('href')),
+                ativa: tab.getAttribute('aria-selected') === 'true'
+            }));
+        },
+        
+        fecharAbas: function(chaves) {
+            let fechadas = 0;
+            for (const tab of abasDoConsole()) {
+                if (!chaves.includes(identificadorAba(tab))) continue;
+                const item = tab.closest('li') || tab.parentElement;
+                const botao = item && item.querySelector('button[title^="Fechar"], button[title^="Close"]');
+                if (botao) {
+                    botao.click();
+                    fechadas++;
+                }
+            }
+            return { success: true, fechadas: fechadas };
+        },
+        
+        metricasPagina: function() {
+            const memoria = performance.memory;
+            return {
+                nos: contarNos(),
+                abas: abasDoConsole().length,
+                heapMb: memoria ? Math.round(memoria.usedJSHeapSize / 1048576 * 10) / 10 : null
+            };
+        },
+        
+        // Início sem recarregar o app: item Início da navegação e, sem ele,
+        // force:navigateToURL. semApi = nenhum dos dois disponível.
+        irParaInicio: function() {
+            if (location.pathname.startsWith('/lightning/page/home')) {
+                return { success: true, metodo: 'já estava' };
+            }
+            
+            const links = Array.from(document.querySelectorAll('a[href*="/lightning/page/home"]')).filter(isVisible);
+            const link = links.find(l => ['início', 'inicio'].includes((l.innerText || l.textContent || '').trim().toLowerCase())) || links[0];
+            if (link) {
+                link.click();
+                return { success: true, metodo: 'menu Início' };
+            }
+            
+            try {
+                const evento = window.$A && $A.get('e.force:navigateToURL');
+                if (evento) {
+                    evento.setParams({ url: '/lightning/page/home' });
+                    evento.fire();
+                    return { success: true, metodo: 'navigateToURL' };
+                }
+            } catch(e) {}
+            
+            return { success: false, semApi: true };
         }
-    }
-    return { success: false };
+    };
+    
+    window.__sfa = sfa;
+})();
+""" % SFA_VERSAO
+
+JS_CHAMAR_SFA = """
+const sfa = window.__sfa;
+if (!sfa || sfa.versao !== arguments[0]) return { __sfaAusente: true };
+return sfa[arguments[1]].apply(sfa, Array.from(arguments).slice(2));
+"""
+
+JS_CHAMAR_SFA_ASYNC = """
+const done = arguments[arguments.length - 1];
+const sfa = window.__sfa;
+if (!sfa || sfa.versao !== arguments[0]) {
+    done({ __sfaAusente: true });
+} else {
+    Promise.resolve(sfa[arguments[1]].apply(sfa, Array.from(arguments).slice(2, -1)))
+        .then(done, (e) => done({ __sfaErro: String(e) }));
+}
+"""
+
+def instalar_helpers_js(driver, persistente=True):
+    """Instala window.__sfa no documento atual.
+    
+    persistente=True também registra o bundle via CDP para que todo
+    documento novo (driver.get, reload) já nasça com ele.
     """
+    if persistente:
+        try:
+            driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': JS_SFA_HELPERS})
+        except Exception as e:
+            log_debug(f"CDP indisponível para helpers JS: {str(e)[:60]}")
+    executar_js_safe(driver, JS_SFA_HELPERS)
+
+CONSULTAS_MEDICAO_INDICE = [
+    {'tipo': 'seletor', 'valor': 'button[name="NewCase"]'},
+    {'tipo': 'seletor', 'valor': 'button[name="SaveEdit"]'},
+    {'tipo': 'seletor', 'valor': 'textarea'},
+    {'tipo': 'texto', 'valor': 'Avançar'},
+    {'tipo': 'aria', 'valor': 'Origem do caso'},
+    {'tipo': 'aria', 'valor': 'Motivo do contato'},
+]
+
+def chamar_sfa_async(driver, metodo, *args):
+    """Como chamar_sfa, para métodos que devolvem Promise (execute_async_script)"""
+    resultado = executar_js_async_safe(driver, JS_CHAMAR_SFA_ASYNC, SFA_VERSAO, metodo, *args)
     
-    res_radio = executar_js_safe(driver, js_radio)
-    if res_radio and res_radio.get('success'):
-        log_ok("Radio selecionado")
+    if isinstance(resultado, dict) and resultado.get('__sfaAusente'):
+        instalar_helpers_js(driver, persistente=False)
+        resultado = executar_js_async_safe(driver, JS_CHAMAR_SFA_ASYNC, SFA_VERSAO, metodo, *args)
     
-    time.sleep(0.1)
+    if isinstance(resultado, dict) and resultado.get('__sfaErro'):
+        log_debug(f"JS Error em __sfa.{metodo}: {resultado['__sfaErro'][:100]}")
+        return None
     
-    log_info("5. Avançar...")
-    for _ in range(4):
-        if click_element('Avançar', 'text', tries=2):
-            break
-        time.sleep(0.05)
-    time.sleep(0.8)
+    return resultado
+
+def medir_indice_shadow(driver, consultas=None, repeticoes=5):
+    """Mede na página atual o custo das consultas com a varredura antiga e com o índice"""
+    resultado = chamar_sfa(driver, 'medirIndice', consultas or CONSULTAS_MEDICAO_INDICE, repeticoes)
+    if not resultado:
+        log_warn("Medição do índice falhou")
+        return None
     
-    log_info("6. Descrição...")
-    try:
-        descricao = input("\nDescrição: ").strip()
-    except (EOFError, KeyboardInterrupt):
-        descricao = ""
+    log_info(f"Página: {resultado['nos']} nós em {resultado['roots']} roots "
+             f"(índice construído em {resultado['construcaoMs']} ms)")
+    for c in resultado['consultas']:
+        status = "ok" if c['mesmoElemento'] else "DIFERENTE"
+        log_info(f"  {c['tipo']:<7} {c['valor'][:30]:<30} legado {c['legadoMs']:>8.3f} ms | "
+                 f"índice {c['indiceMs']:>8.3f} ms | {status}")
+    return resultado
+
+JS_CAPTURAR_DOM = """
+const SENSIVEIS = arguments[0];
+const PERMITIDOS = arguments[1].map(t => t.trim().toLowerCase());
+const VAZIOS = new Set(['area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link',
+                        'meta', 'source', 'track', 'wbr']);
+// Atributos com texto livre: tratados como os nós de texto
+const ATRIBUTOS_ROTULO = new Set(['title', 'alt', 'aria-label']);
+// Atributos que podem carregar dados do cliente (e-mails, números)
+const ATRIBUTOS_TEXTO = new Set(['value', 'href', 'data-value', 'placeholder']);
+const LETRA = /[a-zà-ÿ]/;
+let nos = 0;
+let roots = 0;
+
+function esc(t) {
+    return t.split('&').join('&amp;').split('<').join('&lt;').split('>').join('&gt;');
+}
+
+function mascararDados(t) {
+    return t.replace(/[^\\s@<>"']+@[^\\s@<>"']+/g, 'email@mascarado')
+            .replace(/\\d{3,}/g, d => '0'.repeat(d.length));
+}
+
+function mascararLetras(t) {
+    return t.replace(/[A-Za-zÀ-ÿ]/g, 'x');
+}
+
+// Rótulo da interface: igual a um permitido ou ele seguido de algo sem
+// letras ("Casos (3)", "Pesquisar Filas..."); texto sem letras também passa
+function permitido(t) {
+    const n = t.trim().toLowerCase();
+    if (!LETRA.test(n)) return true;
+    return PERMITIDOS.some(p => n.startsWith(p) && !LETRA.test(n.slice(p.length)));
+}
+
+function mascararTexto(t, forcar) {
+    t = mascararDados(t);
+    return forcar || !permitido(t) ? mascararLetras(t) : t;
+}
+
+function sensivel(el) {
+    try {
+        return el.matches(SENSIVEIS);
+    } catch(e) {
+        return false;
+    }
+}
+
+function atributos(el, mascarar) {
+    const mapa = new Map();
+    for (const a of el.attributes) {
+        if (a.name.startsWith('on')) continue;
+        let v = a.value;
+        if (ATRIBUTOS_ROTULO.has(a.name)) {
+            v = mascararTexto(v, mascarar);
+        } else if (ATRIBUTOS_TEXTO.has(a.name)) {
+            v = mascararDados(v);
+            if (mascarar && a.name !== 'href') v = mascararLetras(v);
+        }
+        mapa.set(a.name, v);
+    }
     
-    if not descricao:
-        descricao = "Registro de informação - Cliente solicitou informações"
-        log_info("Descrição padrão aplicada")
+    // Recursos externos não existem no replay
+    if (el.localName === 'link' || el.localName === 'iframe' || el.localName === 'img') {
+        mapa.delete('src');
+        if (el.localName === 'link') mapa.delete('href');
+    }
     
-    res_desc = executar_js_safe(driver, js_fill_textarea, descricao)
-    if res_desc and res_desc.get('success'):
-        log_ok("Descrição preenchida")
+    // O que foi digitado fica na propriedade, não no atributo
+    if (el.localName === 'input' && el.value && el.type !== 'checkbox' && el.type !== 'radio') {
+        mapa.set('value', 'x'.repeat(el.value.length));
+    }
+    if ((el.localName === 'input') && el.checked) mapa.set('checked', '');
     
-    log_info("7. Motivo do contato...")
-    selecionar_combobox_melhorado(driver, 'Motivo do contato', 3, 'Informação')
+    // Sem o CSS do Lightning, o que estava escondido precisa continuar escondido
+    if (getComputedStyle(el).display === 'none') {
+        mapa.set('style', (mapa.get('style') || '') + ';display:none !important');
+        mapa.set('data-sfa-oculto', '');
+    }
     
-    log_info("8. Origem do caso (Telefone - 13ª opção)...")
-    selecionar_combobox_melhorado(driver, 'Origem do caso', 13, 'Telefone')
+    let html = '';
+    for (const [nome, valor] of mapa) {
+        html += ' ' + nome + '="' + esc(valor).split('"').join('&quot;') + '"';
+    }
+    return html;
+}
+
+function filhos(pai, mascarar) {
+    let html = '';
+    for (const filho of pai.childNodes) html += serializar(filho, mascarar);
+    return html;
+}
+
+function serializar(node, mascarar) {
+    if (node.nodeType === 3) {
+        return esc(mascararTexto(node.nodeValue, mascarar));
+    }
+    if (node.nodeType !== 1) return '';
     
-    log_info("9. Unidade de registro...")
-    selecionar_combobox_melhorado(driver, 'Unidade de registro', 1, 'Unidade de registro')
+    const tag = node.localName;
+    if (tag === 'script' || tag === 'noscript') return '';
+    nos++;
     
-    log_info("10. SAC responsável...")
-    selecionar_combobox_melhorado(driver, 'SAC responsável', 1, 'SAC responsável')
+    mascarar = mascarar || sensivel(node);
+    let html = '<' + tag + atributos(node, mascarar) + '>';
+    if (VAZIOS.has(tag)) return html;
     
-    log_info("11. Status do caso (Concluído)...")
-    selecionar_combobox_melhorado(driver, 'Status do caso', 2, 'Concluído')
+    if (node.shadowRoot) {
+        roots++;
+        html += '<template shadowrootmode="' + node.shadowRoot.mode + '">' +
+                filhos(node.shadowRoot, mascarar) + '</template>';
+    }
     
-    print("\n" + "="*70)
-    log_ok("FORMULÁRIO COMPLETO!")
-    print("="*70)
-    print(f"\nDescrição: {descricao[:50]}...")
-    print(f"Motivo: Informação (3ª opção)")
-    print(f"Origem: Telefone (13ª opção)")
-    print(f"Unidade: 1ª opção")
-    print(f"SAC: 1ª opção")
-    print(f"Status: Concluído (2ª opção)")
-    print("="*70 + "\n")
+    if (tag === 'style') {
+        html += node.textContent;
+    } else if (tag === 'textarea') {
+        html += 'x'.repeat(node.value.length);
+    } else {
+        html += filhos(tag === 'template' ? node.content : node, mascarar);
+    }
+    return html + '</' + tag + '>';
+}
+
+const html = '<!DOCTYPE html>\\n' + serializar(document.documentElement, false);
+return { html: html, nos: nos, roots: roots, caminho: location.pathname };
+"""
+
+def textos_permitidos_dom():
+    """Rótulos que a captura mantém legíveis: os fixos e os que os fluxos e a medição consultam"""
+    textos = set(TEXTOS_UI_DOM)
+    textos.update(c['valor'] for c in CONSULTAS_MEDICAO_INDICE if c['tipo'] != 'seletor')
+    try:
+        fluxos = carregar_fluxos()
+    except (OSError, ValueError):
+        fluxos = {}
+    for fluxo in fluxos.values():
+        textos.add(fluxo.get('tipo_registro', ''))
+        for passo in fluxo['passos']:
+            textos.update(alvo['texto'] for alvo in passo.get('alvos', []) if 'texto' in alvo)
+            textos.update(passo.get('textos', []))
+            if passo['acao'] == 'comboboxes':
+                textos.update(passo['campos'])
+                textos.update(v for v in passo['campos'].values() if isinstance(v, str))
+    return sorted(t for t in textos if t)
+
+def capturar_dom(driver, rotulo, condicao=None):
+    """Grava a página atual em PASTA_CAPTURA_DOM (se a captura estiver ligada).
+    
+    condicao: nome em CONDICOES_ESPERA que valia no momento da captura; o
+    replay confere se ela continua verdadeira sobre o snapshot.
+    """
+    if not PASTA_CAPTURA_DOM:
+        return None
     
-    salvar = input("SALVAR CASO? (s/n): ").strip().lower()
+    res = executar_js_safe(driver, JS_CAPTURAR_DOM, SELETORES_SENSIVEIS_DOM, textos_permitidos_dom())
+    if not res:
+        log_warn(f"Captura de DOM falhou: {rotulo}")
+        return None
     
-    if salvar == 's' or salvar == '':
-        log_info("Salvando...")
+    dados = res['html'].encode('utf-8')
+    slug = re.sub(r'\W+', '_', rotulo.lower()).strip('_')[:40]
+    with _LOCK_CAPTURA:
+        os.makedirs(PASTA_CAPTURA_DOM, exist_ok=True)
+        nome = f"{next(_SEQUENCIA_CAPTURA):04d}_{slug}.html"
+        with open(os.path.join(PASTA_CAPTURA_DOM, nome), 'wb') as f:
+            f.write(dados)
         
-        if click_element('button[name="SaveEdit"]'):
-            log_ok("CASO SALVO COM SUCESSO!")
-            time.sleep(0.8)
-        elif click_element('Salvar', 'text'):
-            log_ok("CASO SALVO COM SUCESSO!")
-            time.sleep(0.8)
-        else:
-            log_warn("Salve manualmente se necessário")
-    else:
-        log_info("Revise e salve manualmente")
+        metadados = {'arquivo': nome, 'rotulo': rotulo, 'caminho': res['caminho'], 'condicao': condicao,
+                     'nos': res['nos'], 'roots': res['roots'], 'bytes': len(dados),
+                     'capturado_em': datetime.now().isoformat(timespec='seconds')}
+        with open(os.path.join(PASTA_CAPTURA_DOM, 'capturas.jsonl'), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(metadados, ensure_ascii=False) + "\n")
+    
+    log_debug(f"DOM capturado: {nome} ({res['nos']} nós, {res['roots']} roots, {len(dados) // 1024} KB)")
+    return nome
+
+JS_METRICAS_CARGA = """
+const quietoMs = arguments[0];
+const timeoutMs = arguments[1];
+const done = arguments[arguments.length - 1];
+const inicio = performance.now();
+let vistos = -1;
+let desde = inicio;
+
+// Espera o load e a rede ficar quieta (nenhum recurso novo por quietoMs)
+function medir() {
+    const nav = performance.getEntriesByType('navigation')[0];
+    const recursos = performance.getEntriesByType('resource');
+    const agora = performance.now();
+    if (recursos.length !== vistos) {
+        vistos = recursos.length;
+        desde = agora;
+    }
+    const carregado = document.readyState === 'complete' && nav && nav.loadEventEnd > 0;
+    const esgotado = agora - inicio >= timeoutMs;
+    if (!esgotado && !(carregado && agora - desde >= quietoMs)) {
+        setTimeout(medir, 100);
+        return;
+    }
     
-    return True
+    let bytes = nav ? nav.transferSize : 0;
+    let fim = 0;
+    for (const r of recursos) {
+        bytes += r.transferSize;
+        fim = Math.max(fim, r.responseEnd);
+    }
+    done({
+        bytes: bytes,
+        requisicoes: recursos.length + 1,
+        cargaMs: nav && nav.loadEventEnd > 0 ? Math.round(nav.loadEventEnd) : null,
+        redeMs: Math.round(fim),
+        esgotado: esgotado
+    });
+}
+medir();
+"""
+
+# O buffer padrão da Resource Timing guarda só 250 recursos
+JS_BUFFER_RESOURCE_TIMING = "performance.setResourceTimingBufferSize(20000);"
 
-def registrar_conta_bemol_automatico(driver):
-    """Nova função para registrar casos de Conta Bemol com fluxo completo de email"""
-    log_info("Iniciando registro de Conta Bemol...")
+def _medir_carga(driver, url, quieto_ms=1000, timeout_ms=30000):
+    try:
+        driver.get(url)
+    except Exception as e:
+        log_debug(f"driver.get falhou em {url}: {str(e)[:60]}")
+        return None
+    return executar_js_async_safe(driver, JS_METRICAS_CARGA, quieto_ms, timeout_ms)
+
+def comparar_bloqueio(driver, urls, padroes=None, repeticoes=3):
+    """Carrega cada página sem e com o bloqueio e loga bytes e tempo economizados.
     
-    js_click = """
-    const query = arguments[0];
-    const mode = arguments[1] || 'selector';
+    Cache desligado nas duas rodadas; vale a mediana das repetições. Os
+    bytes vêm da Resource Timing, onde recursos de outra origem sem
+    Timing-Allow-Origin contam 0: a economia medida é um piso.
+    """
+    padroes = BLOQUEIO_HEADLESS if padroes is None else padroes
+    anterior = recursos_do_driver(driver)['bloqueio']
+    script_buffer = None
+    resultados = []
     
-    function findDeep(root, q, isText) {
-        if (!isText) {
-            try {
-                const el = root.querySelector(q);
-                if (el && isVisible(el)) return el;
-            } catch(e){}
-        } else {
-            const tags = ['button', 'a', 'span', 'lightning-button'];
-            for (const tag of tags) {
-                const els = Array.from(root.querySelectorAll(tag));
-                for (const el of els) {
-                    if (isVisible(el)) {
-                        const text = (el.innerText || '').trim();
-                        if (text.toLowerCase().includes(q.toLowerCase())) return el;
-                    }
-                }
-            }
-        }
-        
-        const all = root.querySelectorAll('*');
-        for (const el of all) {
-            try {
-                if (el.shadowRoot) {
-                    const found = findDeep(el.shadowRoot, q, isText);
-                    if (found) return found;
-                }
-            } catch(e){}
-        }
-        return null;
-    }
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setCacheDisabled', {'cacheDisabled': True})
+        script_buffer = driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument',
+                                               {'source': JS_BUFFER_RESOURCE_TIMING}).get('identifier')
+    except Exception as e:
+        log_error(f"CDP indisponível para a comparação: {str(e)[:60]}")
+        return None
     
-    function isVisible(el) {
-        try {
-            const rect = el.getBoundingClientRect();
-            const style = window.getComputedStyle(el);
-            return rect.width > 0 && rect.height > 0 && 
-                   style.display !== 'none' && style.visibility !== 'hidden';
-        } catch(e) {
-            return false;
-        }
-    }
+    try:
+        for url in urls:
+            medianas = {}
+            for modo, lista in (('padrao', []), ('bloqueio', padroes)):
+                bloquear_recursos(driver, lista)
+                amostras = [m for m in (_medir_carga(driver, url) for _ in range(repeticoes)) if m]
+                if not amostras:
+                    break
+                medianas[modo] = {chave: _percentil(sorted(m[chave] or 0 for m in amostras), 50)
+                                  for chave in ('bytes', 'requisicoes', 'cargaMs', 'redeMs')}
+            if len(medianas) < 2:
+                log_warn(f"Sem medição em {url}")
+                continue
+            resultados.append({'url': url, **medianas})
+    finally:
+        bloquear_recursos(driver, anterior)
+        try:
+            driver.execute_cdp_cmd('Network.setCacheDisabled', {'cacheDisabled': False})
+            if script_buffer:
+                driver.execute_cdp_cmd('Page.removeScriptToEvaluateOnNewDocument', {'identifier': script_buffer})
+        except Exception:
+            pass
+    
+    log_info(f"Bloqueio de {len(padroes)} padrões - mediana de {repeticoes} cargas sem cache:")
+    print(f"  {'página':<32} {'req':>9} {'KB':>15} {'economia':>9} {'load ms':>13} {'rede ms':>13}")
+    for r in resultados:
+        p, b = r['padrao'], r['bloqueio']
+        economia = (1 - b['bytes'] / p['bytes']) * 100 if p['bytes'] else 0
+        caminho = urlsplit(r['url']).path
+        print(f"  {caminho[:32]:<32} {p['requisicoes']:>4}>{b['requisicoes']:<4} "
+              f"{p['bytes'] // 1024:>7}>{b['bytes'] // 1024:<7} {economia:>8.0f}% "
+              f"{p['cargaMs']:>6}>{b['cargaMs']:<6} {p['redeMs']:>6}>{b['redeMs']:<6}")
+    return resultados
+
+def chamar_sfa(driver, metodo, *args):
+    """Chama window.__sfa[metodo](...args), reinstalando o bundle se a página o perdeu"""
+    resultado = executar_js_safe(driver, JS_CHAMAR_SFA, SFA_VERSAO, metodo, *args)
+    
+    if isinstance(resultado, dict) and resultado.get('__sfaAusente'):
+        instalar_helpers_js(driver, persistente=False)
+        resultado = executar_js_safe(driver, JS_CHAMAR_SFA, SFA_VERSAO, metodo, *args)
+    
+    return resultado
+
+JS_DIGITAR_TEXTO = """
+const alvo = arguments[0];
+const texto = arguments[1];
+const opcoes = arguments[2] || {};
+
+const input = typeof alvo === 'string' ? document.querySelector(alvo) : alvo;
+if (!input) return { success: false, error: 'Campo não encontrado' };
+
+if (opcoes.esconderOverlays) {
+    const overlays = document.querySelectorAll('.slds-backdrop, .slds-modal, [role="dialog"]');
+    overlays.forEach(el => {
+        if (el.style) el.style.display = 'none';
+    });
+}
+
+input.scrollIntoView({block: 'center', behavior: 'instant'});
+input.focus();
+if (opcoes.clicar) input.click();
+if (opcoes.limpar !== false) input.value = '';
+
+// Mesma sequência de eventos de uma digitação real, caractere a caractere
+for (const char of texto) {
+    input.value += char;
+    
+    input.dispatchEvent(new KeyboardEvent('keydown', {key: char, bubbles: true}));
+    input.dispatchEvent(new KeyboardEvent('keypress', {key: char, bubbles: true}));
+    input.dispatchEvent(new Event('input', {bubbles: true}));
+    input.dispatchEvent(new KeyboardEvent('keyup', {key: char, bubbles: true}));
+}
+
+input.dispatchEvent(new Event('change', {bubbles: true}));
+
+return { success: true, value: input.value };
+"""
+
+def digitar_texto_js(driver, alvo, texto, limpar=True, clicar=False, esconder_overlays=False):
+    """Digita o texto inteiro com eventos de teclado em uma única chamada ao driver.
+    
+    alvo: WebElement ou seletor CSS. Retorna o valor final do campo lido na
+    mesma chamada, ou None se o campo não foi encontrado.
+    """
+    opcoes = {'limpar': limpar, 'clicar': clicar, 'esconderOverlays': esconder_overlays}
+    resultado = executar_js_safe(driver, JS_DIGITAR_TEXTO, alvo, texto, opcoes)
     
-    const el = findDeep(document, query, mode === 'text');
-    if (!el) return { success: false };
+    if resultado and resultado.get('success'):
+        return resultado.get('value', '')
     
+    if resultado:
+        log_debug(f"Digitação falhou: {resultado.get('error')}")
+    return None
+
+# Condições de prontidão: nome -> (expressão JS verdadeira quando a página
+# está pronta, timeout em s). Substituem as pausas fixas entre as ações.
+CONDICOES_ESPERA = {
+    'registro_cliente': (
+        "location.href.includes('/lightning/r/') && !!document.querySelector(%s)"
+        % json.dumps(SELETORES_REGISTRO_CARREGADO), TIMEOUT_DEFAULT),
+    'busca_pronta': (
+        "location.pathname.startsWith('/lightning/page/home') && "
+        "Array.from(document.querySelectorAll(%s)).some(i => !i.disabled && !i.readOnly && i.offsetParent !== null)"
+        % json.dumps(', '.join(SELETORES_BUSCA_CPF)), TIMEOUT_DEFAULT),
+    'botao_novo_caso': (
+        "!!window.__sfa.findBySelector('button[name=\"NewCase\"]')", 5),
+    'formulario_caso': (
+        "!!window.__sfa.findTextarea()", 8),
+    'caso_salvo': (
+        "sumiu('salvar', !!window.__sfa.findBySelector('button[name=\"SaveEdit\"]')) || toastSucessoNovo()", 10),
+    'feed_aberto': (
+        "Array.from(document.querySelectorAll('span.title')).some(s => s.textContent.trim() === 'Email')", 5),
+    'composer_email': (
+        "!!document.querySelector('a.select[role=\"combobox\"]')", 5),
+    'destinatario_email': (
+        "!!document.querySelector('input[role=\"combobox\"][aria-autocomplete=\"list\"]')", 5),
+    'email_enviado': (
+        "sumiu('enviar', Array.from(document.querySelectorAll('span.label.bBody'))"
+        ".some(s => s.textContent.trim() === 'Enviar')) || toastSucessoNovo()", 10),
+    'acao_concluir_caso': (
+        "Array.from(document.querySelectorAll('span.uiOutputText'))"
+        ".some(s => s.textContent.includes('Marcar Status do caso como concluído'))", 5),
+    'busca_filas': (
+        "!!document.querySelector('input[placeholder*=\"Pesquisar Filas\"]')", 5),
+    'opcoes_fila': (
+        "window.__sfa.opcoesDaBusca('input[placeholder*=\"Pesquisar Filas\"]').length >= 2", 5),
+    'botao_transferir_fila': (
+        "Array.from(document.querySelectorAll('button.slds-button_brand'))"
+        ".some(b => b.textContent.includes('Transferir Fila') && !b.disabled)", 5),
+    'confirmar_transferencia': (
+        "!!document.querySelector('button[title=\"Transferir\"]')", 5),
+    'transferencia_concluida': (
+        "sumiu('transferir', !!document.querySelector('button[title=\"Transferir\"]')) || toastSucessoNovo()", 5),
+}
+
+JS_AGUARDAR_CONDICAO = """
+const timeoutMs = arguments[0];
+const done = arguments[arguments.length - 1];
+const inicio = performance.now();
+
+let finalizado = false;
+let agendado = false;
+let observer = null;
+let intervalo = null;
+let timer = null;
+
+// Condições de conclusão não podem ser só "o botão não está lá": ele
+// precisa ter sido visto nesta espera e sumido, ou um toast de sucesso
+// novo (que não existia quando a espera começou) precisa aparecer
+const SELETOR_TOAST_SUCESSO = '.forceToastMessage.success, .slds-notify_toast.slds-theme_success';
+const toastsAntes = new Set(document.querySelectorAll(SELETOR_TOAST_SUCESSO));
+const vistos = {};
+
+function sumiu(chave, presente) {
+    if (presente) vistos[chave] = true;
+    return !presente && !!vistos[chave];
+}
+
+function toastSucessoNovo() {
+    return Array.from(document.querySelectorAll(SELETOR_TOAST_SUCESSO)).some(t => !toastsAntes.has(t));
+}
+
+function pronta() {
     try {
-        el.scrollIntoView({block: 'center'});
-        el.click();
-        return { success: true };
+        return !!(/*CONDICAO*/);
     } catch(e) {
-        try {
-            ['mousedown', 'click'].forEach(ev => {
-                el.dispatchEvent(new MouseEvent(ev, {bubbles: true}));
-            });
-            return { success: true };
-        } catch(e2) {
-            return { success: false };
-        }
+        return false;
+    }
+}
+
+function finalizar(ok) {
+    if (finalizado) return;
+    finalizado = true;
+    if (observer) observer.disconnect();
+    clearInterval(intervalo);
+    clearTimeout(timer);
+    done({ ok: ok, ms: Math.round(performance.now() - inicio) });
+}
+
+function verificar() {
+    agendado = false;
+    if (!finalizado && pronta()) finalizar(true);
+}
+
+function agendar() {
+    if (!agendado) {
+        agendado = true;
+        setTimeout(verificar, 16);
     }
+}
+
+observer = new MutationObserver(agendar);
+observer.observe(document.documentElement, { childList: true, subtree: true, attributes: true });
+
+// Mutações em shadow roots e mudanças de URL não chegam ao observer
+intervalo = setInterval(agendar, 100);
+timer = setTimeout(() => finalizar(false), timeoutMs);
+
+verificar();
+"""
+
+_ESTATISTICAS_ESPERA = {}
+_LOCK_ESPERA = threading.Lock()
+
+def registrar_espera(nome, ms, ok):
+    """Guarda a latência de uma espera na janela de estatísticas da condição"""
+    with _LOCK_ESPERA:
+        _ESTATISTICAS_ESPERA.setdefault(nome, deque(maxlen=JANELA_ESTATISTICA_ESPERA)).append((ms, ok))
+
+def aguardar_condicao(driver, nome, timeout=None):
+    """Espera a condição nomeada de CONDICOES_ESPERA valer na página.
+    
+    Retorna True assim que ela vale e False no timeout; a latência de cada
+    espera entra nas estatísticas (resumo_esperas).
     """
+    expressao, timeout_padrao = CONDICOES_ESPERA[nome]
+    timeout = timeout or timeout_padrao
+    script = JS_AGUARDAR_CONDICAO.replace('/*CONDICAO*/', expressao)
+    
+    inicio = time.perf_counter()
+    limite = inicio + timeout
+    ok = False
+    while True:
+        restante = limite - time.perf_counter()
+        if restante <= 0:
+            break
+        resultado = executar_js_async_safe(driver, script, int(restante * 1000))
+        # None: o documento foi trocado durante a espera; tenta de novo no novo
+        if resultado is not None:
+            ok = bool(resultado.get('ok'))
+            break
+        time.sleep(0.1)
     
-    js_fill_input = """
-    const selector = arguments[0];
-    const value = arguments[1];
+    ms = int((time.perf_counter() - inicio) * 1000)
+    registrar_espera(nome, ms, ok)
     
-    function findDeep(root, sel) {
-        try {
-            const el = root.querySelector(sel);
-            if (el && el.offsetWidth > 0) return el;
-        } catch(e){}
+    if not ok:
+        log_debug(f"Espera '{nome}' não confirmou em {ms} ms")
+    return ok
+
+def _percentil(ordenados, p):
+    """Percentil por posição mais próxima de uma lista já ordenada"""
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+def resumo_esperas():
+    """Loga p50/p95/máx de cada condição, da que mais consumiu tempo para a que menos"""
+    with _LOCK_ESPERA:
+        amostras = {nome: list(valores) for nome, valores in _ESTATISTICAS_ESPERA.items()}
+    if not amostras:
+        return
+    
+    log_info(f"Esperas (últimas {JANELA_ESTATISTICA_ESPERA} de cada condição):")
+    for nome, valores in sorted(amostras.items(), key=lambda item: -sum(ms for ms, _ in item[1])):
+        tempos = sorted(ms for ms, _ in valores)
+        timeouts = sum(1 for _, ok in valores if not ok)
+        log_info(f"  {nome:<24} n={len(tempos):<4} p50 {_percentil(tempos, 50):>6} ms  "
+                 f"p95 {_percentil(tempos, 95):>6} ms  máx {tempos[-1]:>6} ms  timeouts {timeouts}")
+
+def verificar_pagina_inicial(driver, timeout=10):
+    """Confirma que está na página Início com o campo de busca interativo"""
+    log_info("Verificando página atual...")
+    
+    if aguardar_condicao(driver, 'busca_pronta', timeout):
+        log_ok("Página Início detectada")
+        return True
+    
+    log_warn("Não identificou a página")
+    return False
+
+JS_FUNCAO_TOAST_ERRO_CPF = """
+function verificarToastErroCpf() {
+    const toasts = document.querySelectorAll('.forceToastMessage');
+    
+    for (const toast of toasts) {
+        const isVisible = toast.offsetWidth > 0 && toast.offsetHeight > 0;
         
-        const all = root.querySelectorAll('*');
-        for (const elem of all) {
-            try {
-                if (elem.shadowRoot) {
-                    const found = findDeep(elem.shadowRoot, sel);
-                    if (found) return found;
+        if (isVisible) {
+            const isError = toast.classList.contains('slds-theme--error');
+            const isWarning = toast.classList.contains('slds-theme--warning');
+            
+            if (isError || isWarning) {
+                const messageElement = toast.querySelector('.toastMessage');
+                if (messageElement) {
+                    const message = (messageElement.innerText || messageElement.textContent || '').trim();
+                    
+                    if (message.toLowerCase().includes('cpf inválido') || 
+                        message.toLowerCase().includes('cpf invalido')) {
+                        return { hasError: true, type: 'invalid', message: message };
+                    }
+                    
+                    if (message.toLowerCase().includes('cliente não encontrado') ||
+                        message.toLowerCase().includes('cliente nao encontrado') ||
+                        message.toLowerCase().includes('não encontrado') ||
+                        message.toLowerCase().includes('nao encontrado')) {
+                        return { hasError: true, type: 'not_found', message: message };
+                    }
                 }
-            } catch(e){}
+            }
         }
-        return null;
     }
     
-    const input = findDeep(document, selector);
-    if (!input) return { success: false, error: 'Input não encontrado' };
-    
-    try {
-        input.focus();
-        input.value = value;
-        input.dispatchEvent(new Event('input', {bubbles: true}));
-        input.dispatchEvent(new Event('change', {bubbles: true}));
-        return { success: true };
-    } catch(e) {
-        return { success: false, error: String(e) };
+    return { hasError: false };
+}
+"""
+
+JS_FUNCAO_RESULTADO_BUSCA = """
+const SELETORES_RESULTADO = [
+    "//a[contains(@class, 'slds-p-') or contains(@class, 'slds-m-')]",
+    "//a[contains(@href, '#') and string-length(text()) > 10]",
+    "//a[contains(text(), ' ') and not(contains(text(), 'Pular')) and not(contains(text(), 'Início')) and not(contains(text(), 'Ações'))]",
+    "//div[contains(@class, 'search')]//a",
+    "//div[contains(@class, 'result')]//a",
+    "//lightning-formatted-name//a",
+    "//span[contains(@class, 'uiOutputText')]/..//a"
+];
+
+const PALAVRAS_IGNORADAS = ['pular', 'skip', 'navegação', 'navigation',
+                            'início', 'inicio', 'cases', 'contas',
+                            'configurações', 'home', 'help', 'ajuda',
+                            'ações globais', 'global actions', 'ações'];
+
+function linksCandidatos() {
+    const encontrados = new Set();
+    for (const xpath of SELETORES_RESULTADO) {
+        const snap = document.evaluate(xpath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        for (let i = 0; i < snap.snapshotLength; i++) {
+            encontrados.add(snap.snapshotItem(i));
+        }
+    }
+    return encontrados;
+}
+
+// Cada regra que casar soma pontos e vai para o log (para calibrar)
+function pontuarCandidato(el) {
+    if (!(el.offsetWidth || el.offsetHeight || el.getClientRects().length)) {
+        return { score: 0, regras: ['invisivel'] };
     }
-    """
     
-    js_select_radio_conta_bemol = """
-    const labels = Array.from(document.querySelectorAll('label, span'));
-    for (const label of labels) {
-        const text = (label.innerText || label.textContent || '').trim();
-        if (text === 'Conta Bemol' || text.includes('Conta Bemol')) {
-            const input = label.querySelector('input[type="radio"]') ||
-                         document.querySelector(`input[id="${label.getAttribute('for')}"]`);
-            if (input) {
-                try {
-                    input.checked = true;
-                    input.click();
-                    input.dispatchEvent(new Event('change', {bubbles: true}));
-                    return { success: true };
-                } catch(e) {}
-            }
-        }
+    // Abas do console (clientes anteriores) nunca são o resultado da busca
+    if (el.getAttribute('role') === 'tab' || el.closest('[role="tablist"]')) {
+        return { score: 0, regras: ['aba_console'] };
     }
-    return { success: false };
-    """
     
-    def click_element(query, mode='selector', tries=3):
-        for i in range(tries):
-            res = executar_js_safe(driver, js_click, query, mode)
-            if res and res.get('success'):
-                log_ok(f"Clicado: {query}")
-                return True
-            time.sleep(0.2)
-        log_warn(f"Falha: {query}")
-        return False
+    const texto = (el.innerText || '').trim();
+    if (!texto || texto.length < 6) return { score: 0, regras: ['texto_curto'] };
     
-    def get_saudacao():
-        """Retorna saudação baseada no horário"""
-        hora = datetime.now().hour
-        if 5 <= hora < 12:
-            return "bom dia"
-        elif 12 <= hora < 18:
-            return "boa tarde"
-        else:
-            return "boa noite"
+    const textoLower = texto.toLowerCase();
+    const palavra = PALAVRAS_IGNORADAS.find(p => textoLower.includes(p));
+    if (palavra) return { score: 0, regras: ['ignorada:' + palavra] };
     
-    print("\n" + "="*70)
-    print("   REGISTRO CONTA BEMOL")
-    print("="*70 + "\n")
+    if (!texto.includes(' ') || texto === textoLower || /^\\d+$/.test(texto)) {
+        return { score: 0, regras: ['sem_formato_nome'] };
+    }
     
-    # 1. Abrir Casos
-    log_info("1. Abrindo Casos...")
-    if not click_element('a[data-tab-value="flexipage_tab3"]'):
-        click_element('Casos', 'text')
-    time.sleep(0.3)
-    
-    # 2. Criar novo caso
-    log_info("2. Clicando Criar...")
-    if not click_element('button[name="NewCase"]'):
-        click_element('Criar', 'text')
-    time.sleep(0.5)
-    
-    # 3. Aguardar e selecionar radio "Conta Bemol"
-    log_info("3. Aguardando formulário e selecionando Conta Bemol...")
-    time.sleep(1)
-    
-    res_radio = executar_js_safe(driver, js_select_radio_conta_bemol)
-    if res_radio and res_radio.get('success'):
-        log_ok("Radio 'Conta Bemol' selecionado")
-    else:
-        log_warn("Não conseguiu selecionar 'Conta Bemol' automaticamente")
-        input("Selecione 'Conta Bemol' manualmente e pressione Enter...")
+    let score = 10;
+    const regras = ['nome_proprio'];
     
-    time.sleep(0.2)
+    const href = el.getAttribute('href') || '';
+    if (/\\/lightning\\/r\\/(Account|Contact)\\//.test(href)) {
+        score += 5;
+        regras.push('link_registro');
+    }
+    if (el.closest('lightning-formatted-name')) {
+        score += 3;
+        regras.push('formatted_name');
+    }
+    if (el.closest('div[class*="search"], div[class*="result"]')) {
+        score += 2;
+        regras.push('container_busca');
+    }
     
-    # 4. Avançar
-    log_info("4. Avançar...")
-    for _ in range(4):
-        if click_element('Avançar', 'text', tries=2):
-            break
-        time.sleep(0.05)
-    time.sleep(0.8)
+    return { score: score, regras: regras };
+}
+
+function ranquearResultados(opcoes) {
+    opcoes = opcoes || {};
+    const antes = window.__sfaCandidatosAntes || new Set();
+    
+    const candidatos = [];
+    let ordem = 0;
+    for (const el of linksCandidatos()) {
+        const novo = !antes.has(el);
+        if (!novo && !opcoes.incluirAntes) continue;
+        
+        const pontos = pontuarCandidato(el);
+        candidatos.push({
+            el: el,
+            texto: (el.innerText || '').trim().substring(0, 80),
+            href: (el.getAttribute('href') || '').substring(0, 120),
+            score: pontos.score,
+            regras: pontos.regras,
+            novo: novo,
+            ordem: ordem++
+        });
+    }
     
-    # 5. Coletar telefone e email
-    print("\n" + "="*70)
-    try:
-        telefone_conta = input("Digite o TELEFONE do cliente: ").strip()
-        email_conta = input("Digite o EMAIL do cliente: ").strip()
-        cpf_cliente = input("Digite o CPF do cliente: ").strip()
-        nome_cliente = input("Digite o NOME do cliente: ").strip()
-    except (EOFError, KeyboardInterrupt):
-        telefone_conta = ""
-        email_conta = ""
-        cpf_cliente = ""
-        nome_cliente = ""
-    
-    if not telefone_conta or not email_conta or not cpf_cliente or not nome_cliente:
-        log_error("Telefone, Email, CPF e Nome são obrigatórios!")
-        return False
+    // Empate fica com a ordem dos seletores, como na varredura antiga
+    candidatos.sort((a, b) => (b.score - a.score) || (a.ordem - b.ordem));
     
-    # 6. Preencher Assunto (combobox 11)
-    log_info("5. Selecionando Assunto (11ª opção)...")
-    selecionar_combobox_melhorado(driver, 'Assunto', 11, 'Assunto')
-    time.sleep(0.2)
+    const melhor = candidatos.length && candidatos[0].score > 0 ? candidatos[0] : null;
     
-    # 7. Preencher Descrição
-    log_info("6. Preenchendo Descrição...")
-    descricao_texto = f"Cliente em contato solicitou a atualização do seu número de telefone, o mesmo informa que não possui acesso ao número antigo.\n\nTEL: {telefone_conta}\nemail: {email_conta}\n\nTodos os dados foram confirmados pelo cliente"
+    let clicado = false;
+    if (melhor && opcoes.clicar) {
+        try {
+            melhor.el.scrollIntoView({block: 'center'});
+            melhor.el.click();
+            clicado = true;
+        } catch(e) {}
+    }
     
-    js_fill_textarea = """
-    const text = arguments[0];
+    return {
+        elemento: melhor ? melhor.el : null,
+        texto: melhor ? melhor.texto : '',
+        href: melhor ? melhor.href : '',
+        score: melhor ? melhor.score : 0,
+        regras: melhor ? melhor.regras : [],
+        clicado: clicado,
+        candidatos: candidatos.slice(0, opcoes.limite || 5).map(c => ({
+            texto: c.texto, href: c.href, score: c.score, regras: c.regras, novo: c.novo
+        }))
+    };
+}
+
+// Links que já existiam antes do clique em Buscar não são o resultado desta busca
+function marcarCandidatosAntesDaBusca() {
+    window.__sfaCandidatosAntes = linksCandidatos();
+}
+"""
+
+JS_AGUARDAR_RESULTADO_BUSCA = JS_FUNCAO_TOAST_ERRO_CPF + JS_FUNCAO_RESULTADO_BUSCA + """
+const timeoutMs = arguments[0];
+const clicar = arguments[1];
+const done = arguments[arguments.length - 1];
+const inicio = performance.now();
+
+let finalizado = false;
+let agendado = false;
+let observer = null;
+let intervalo = null;
+let timer = null;
+
+function finalizar(resultado) {
+    if (finalizado) return;
+    finalizado = true;
+    if (observer) observer.disconnect();
+    clearInterval(intervalo);
+    clearTimeout(timer);
+    resultado.elapsedMs = Math.round(performance.now() - inicio);
+    done(resultado);
+}
+
+function verificar() {
+    agendado = false;
+    if (finalizado) return;
+    
+    const erro = verificarToastErroCpf();
+    if (erro.hasError) {
+        finalizar({ tipo: erro.type, mensagem: erro.message });
+        return;
+    }
     
-    function findDeep(root) {
-        const textareas = Array.from(root.querySelectorAll('textarea'));
-        for (const ta of textareas) {
-            const rect = ta.getBoundingClientRect();
-            if (rect.width > 0 && rect.height > 0) return ta;
-        }
-        
-        const all = root.querySelectorAll('*');
-        for (const el of all) {
-            try {
-                if (el.shadowRoot) {
-                    const found = findDeep(el.shadowRoot);
-                    if (found) return found;
-                }
-            } catch(e){}
+    const ranking = ranquearResultados({ clicar: clicar });
+    if (ranking.elemento) {
+        ranking.tipo = 'resultado';
+        finalizar(ranking);
+    }
+}
+
+function agendar() {
+    // Agrupa rajadas de mutações do Lightning em uma verificação por quadro
+    if (!agendado) {
+        agendado = true;
+        setTimeout(verificar, 16);
+    }
+}
+
+observer = new MutationObserver(agendar);
+observer.observe(document.body, { childList: true, subtree: true, characterData: true, attributes: true, attributeFilter: ['class', 'style'] });
+
+// Rede de segurança: mutações dentro de shadow roots não chegam ao observer do document
+intervalo = setInterval(agendar, 250);
+
+timer = setTimeout(() => {
+    // Os pré-existentes entram só no log: nunca são clicados
+    finalizar({ tipo: 'timeout', candidatos: ranquearResultados({ incluirAntes: true }).candidatos });
+}, timeoutMs);
+
+verificar();
+"""
+
+# Procura o CPF (com ou sem pontuação) no texto da página, shadow roots inclusive
+JS_REGISTRO_MOSTRA_CPF = """
+const alvo = arguments[0];
+const padrao = /\\d{3}\\.?\\d{3}\\.?\\d{3}-?\\d{2}/g;
+
+function procurar(raiz) {
+    const walker = document.createTreeWalker(raiz, NodeFilter.SHOW_ELEMENT | NodeFilter.SHOW_TEXT);
+    for (let n = walker.currentNode; n; n = walker.nextNode()) {
+        if (n.nodeType === 3) {
+            for (const m of n.nodeValue.match(padrao) || []) {
+                if (m.replace(/\\D/g, '') === alvo) return true;
+            }
+        } else if (n.shadowRoot && procurar(n.shadowRoot)) {
+            return true;
         }
-        return null;
     }
+    return false;
+}
+
+return procurar(document.body);
+"""
+
+def registro_mostra_cpf(driver, cpf, timeout=CACHE_CPF_CONFIRMACAO_S):
+    """Confere se o registro aberto mostra o CPF buscado (os campos carregam depois do título)"""
+    try:
+        return WebDriverWait(driver, timeout, poll_frequency=0.25).until(
+            lambda d: executar_js_safe(d, JS_REGISTRO_MOSTRA_CPF, cpf))
+    except TimeoutException:
+        return False
+
+def _conexao_cache_cpf():
+    conn = sqlite3.connect(ARQUIVO_CACHE_CPF, timeout=5)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS cliente_url ("
+        " cpf_hash TEXT PRIMARY KEY,"
+        " url TEXT NOT NULL,"
+        " criado_em REAL NOT NULL,"
+        " acessado_em REAL NOT NULL)"
+    )
+    # Entradas da versão anterior (SHA-256 sem chave) são apagadas
+    if conn.execute("PRAGMA user_version").fetchone()[0] < CACHE_CPF_VERSAO:
+        with conn:
+            conn.execute("DELETE FROM cliente_url")
+            conn.execute(f"PRAGMA user_version = {CACHE_CPF_VERSAO}")
+    return conn
+
+def _criar_chave_cache_cpf(caminho):
+    """Grava uma chave nova à parte e a liga ao nome final: se dois processos
+    criarem juntos vale a primeira, e ninguém lê o arquivo pela metade"""
+    tmp = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(os.urandom(32).hex())
+    try:
+        os.link(tmp, caminho)
+        log_info(f"Chave do cache de CPF criada em {caminho}")
+    except FileExistsError:
+        pass
+    finally:
+        os.remove(tmp)
+
+def _chave_cache_cpf():
+    """Chave do HMAC: SF_CHAVE_CACHE_CPF (hex) ou ARQUIVO_CHAVE_CACHE_CPF, criado no primeiro uso"""
+    global _CHAVE_CACHE_CPF
+    with _LOCK_CHAVE_CACHE_CPF:
+        if _CHAVE_CACHE_CPF is None:
+            chave = os.environ.get('SF_CHAVE_CACHE_CPF', '').strip()
+            if not chave:
+                if not os.path.isfile(ARQUIVO_CHAVE_CACHE_CPF):
+                    _criar_chave_cache_cpf(ARQUIVO_CHAVE_CACHE_CPF)
+                with open(ARQUIVO_CHAVE_CACHE_CPF, encoding='utf-8') as f:
+                    chave = f.read().strip()
+            _CHAVE_CACHE_CPF = bytes.fromhex(chave)
+        return _CHAVE_CACHE_CPF
+
+def _hash_cpf(cpf):
+    return hmac.new(_chave_cache_cpf(), cpf.encode('utf-8'), hashlib.sha256).hexdigest()
+
+def cache_cpf_obter(cpf):
+    """URL da conta em cache para o CPF, ou None se não houver ou tiver expirado"""
+    if not USAR_CACHE_CPF:
+        return None
+    try:
+        agora = time.time()
+        with closing(_conexao_cache_cpf()) as conn, conn:
+            conn.execute("DELETE FROM cliente_url WHERE criado_em < ?", (agora - CACHE_CPF_TTL,))
+            linha = conn.execute(
+                "SELECT url FROM cliente_url WHERE cpf_hash = ?", (_hash_cpf(cpf),)
+            ).fetchone()
+            if linha:
+                conn.execute(
+                    "UPDATE cliente_url SET acessado_em = ? WHERE cpf_hash = ?", (agora, _hash_cpf(cpf))
+                )
+                return linha[0]
+    except (sqlite3.Error, OSError, ValueError) as e:
+        log_debug(f"Cache de CPF indisponível: {str(e)[:80]}")
+    return None
+
+def cache_cpf_salvar(cpf, url):
+    if not USAR_CACHE_CPF:
+        return
+    try:
+        agora = time.time()
+        with closing(_conexao_cache_cpf()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cliente_url (cpf_hash, url, criado_em, acessado_em) VALUES (?, ?, ?, ?)",
+                (_hash_cpf(cpf), url, agora, agora)
+            )
+            # Limite de tamanho: descarta os menos usados recentemente
+            conn.execute(
+                "DELETE FROM cliente_url WHERE cpf_hash IN ("
+                " SELECT cpf_hash FROM cliente_url ORDER BY acessado_em DESC LIMIT -1 OFFSET ?)",
+                (CACHE_CPF_MAX_ENTRADAS,)
+            )
+    except (sqlite3.Error, OSError, ValueError) as e:
+        log_debug(f"Não foi possível gravar no cache de CPF: {str(e)[:80]}")
+
+def cache_cpf_invalidar(cpf):
+    try:
+        with closing(_conexao_cache_cpf()) as conn, conn:
+            conn.execute("DELETE FROM cliente_url WHERE cpf_hash = ?", (_hash_cpf(cpf),))
+    except (sqlite3.Error, OSError, ValueError) as e:
+        log_debug(f"Não foi possível invalidar o cache de CPF: {str(e)[:80]}")
+
+@rastrear('cache')
+def abrir_cliente_do_cache(driver, cpf, timeout=TIMEOUT_DEFAULT):
+    """Abre direto a conta do CPF se ela estiver no cache.
     
-    const textarea = findDeep(document);
-    if (!textarea) return { success: false };
-    
-    try {
-        textarea.focus();
-        textarea.value = text;
-        textarea.dispatchEvent(new Event('input', {bubbles: true}));
-        textarea.dispatchEvent(new Event('change', {bubbles: true}));
-        return { success: true };
-    } catch(e) {
-        return { success: false };
-    }
+    Se a página do registro não carregar, a entrada é invalidada e a função
+    retorna False para que a busca normal seja feita.
     """
+    url = cache_cpf_obter(cpf)
+    if not url:
+        return False
     
-    res_desc = executar_js_safe(driver, js_fill_textarea, descricao_texto)
-    if res_desc and res_desc.get('success'):
-        log_ok("Descrição preenchida")
+    log_info("CPF no cache - abrindo a conta diretamente...")
+    inicio = time.perf_counter()
     
-    # 8-11. Preencher campos do formulário
-    log_info("7. Sistema Operacional (3ª opção)...")
-    selecionar_combobox_melhorado(driver, 'Sistema Operacional', 3, 'Sistema Operacional')
+    if navegar_para_registro(driver, url, timeout):
+        marcar_cliente_atual(driver)
+        log_ok(f"✓ Conta aberta pelo cache em {int((time.perf_counter() - inicio) * 1000)} ms")
+        return True
     
-    log_info("8. Origem do caso (2ª opção)...")
-    selecionar_combobox_melhorado(driver, 'Origem do caso', 2, 'Origem do caso')
+    log_warn("Conta do cache não carregou - entrada removida")
+    cache_cpf_invalidar(cpf)
+    return False
+
+def _log_erro_cpf(erro_tipo, mensagem):
+    if erro_tipo == 'invalid':
+        log_error(f"❌ {mensagem}")
+    elif erro_tipo == 'not_found':
+        log_warn(f"⚠️ {mensagem}")
+
+@rastrear('resultado')
+def aguardar_resultado_busca(driver, timeout=TIMEOUT_RESULTADO_BUSCA, clicar=False):
+    """Espera em página pelo primeiro desfecho da busca.
+    
+    Um MutationObserver resolve assim que aparece o link do cliente ou um
+    toast de erro de CPF, em uma única chamada ao driver. Retorna dict com
+    'tipo' ('resultado', 'invalid', 'not_found' ou 'timeout'), 'elapsedMs'
+    e, para resultado, os campos de ranquearResultados.
+    """
+    resultado = executar_js_async_safe(driver, JS_AGUARDAR_RESULTADO_BUSCA, int(timeout * 1000), clicar)
+    return resultado or {'tipo': 'erro', 'elapsedMs': None}
+
+def _log_candidatos(resultado):
+    for c in resultado.get('candidatos') or []:
+        novo = "" if c.get('novo') else " (pré-existente)"
+        log_debug(f"  {c.get('score', 0):>2} {'+'.join(c.get('regras', []))}{novo} | {c.get('texto', '')[:40]}")
+
+@rastrear('buscar_cpf')
+def buscar_cpf_automatico(driver, cpf, max_tentativas=3):
+    wait = WebDriverWait(driver, TIMEOUT_SEARCH)
     
-    log_info("9. Motivo do contato (2ª opção)...")
-    selecionar_combobox_melhorado(driver, 'Motivo do contato', 2, 'Motivo do contato')
+    log_info(f"Buscando CPF {cpf}...")
+    
+    try:
+        # Termina no header do Lightning ou, se a sessão caiu, na tela de login
+        wait.until(lambda d: na_tela_de_login(d) or d.find_elements(
+            By.XPATH, "//header[contains(@class,'slds-global-header')]"
+        ))
+    except TimeoutException:
+        log_error("Timeout Lightning")
+        return False
+    
+    if na_tela_de_login(driver):
+        log_error("Sessão expirada - página de login no lugar do Lightning")
+        return 'session_expired'
+    
+    log_info("Aguardando carregamento completo da página...")
+    time.sleep(0.1)
+    
+    for tentativa in range(1, max_tentativas + 1):
+        log_info(f"Tentativa {tentativa}/{max_tentativas}...")
+        
+        try:
+            log_debug("Localizando input para digitação...")
+            
+            input_element = None
+            
+            wait = WebDriverWait(driver, 1)
+            for seletor in SELETORES_BUSCA_CPF:
+                try:
+                    input_element = wait.until(
+                        EC.element_to_be_clickable((By.CSS_SELECTOR, seletor))
+                    )
+                    break
+                except:
+                    continue
+            
+            if not input_element:
+                log_warn("Input não encontrado ou não está clicável")
+                continue
+            
+            if input_element:
+                log_debug("Input encontrado e clicável!")
+                
+                try:
+                    valor_digitado = digitar_texto_js(driver, input_element, cpf,
+                                                      clicar=True, esconder_overlays=True)
+                    
+                    if valor_digitado is None:
+                        log_warn("Campo de busca sumiu durante a digitação")
+                        continue
+                    
+                    if valor_digitado and cpf in valor_digitado.replace('-', '').replace('.', ''):
+                        log_ok(f"CPF digitado com sucesso: {valor_digitado}")
+                    else:
+                        log_warn(f"CPF pode não ter sido digitado corretamente. Valor no campo: '{valor_digitado}'")
+                    
+                except Exception as e:
+                    log_warn(f"Erro na digitação: {str(e)[:100]}")
+                    continue
+            else:
+                log_warn("Input não foi localizado")
+                continue
+            
+            script_buscar = JS_FUNCAO_RESULTADO_BUSCA + """
+            marcarCandidatosAntesDaBusca();
+            
+            let searchButton = null;
+            
+            const brandButtons = Array.from(document.querySelectorAll('button.slds-button_brand, button[class*="slds-button"]'));
+            for (const btn of brandButtons) {
+                const text = (btn.innerText || btn.textContent || '').trim().toLowerCase();
+                const title = (btn.getAttribute('title') || '').toLowerCase();
+                
+                if (text === 'buscar' || title === 'submit' || text.includes('buscar')) {
+                    searchButton = btn;
+                    break;
+                }
+            }
+            
+            if (!searchButton) {
+                const searchInShadow = (root) => {
+                    const buttons = root.querySelectorAll('button');
+                    for (const btn of buttons) {
+                        const text = (btn.innerText || btn.textContent || '').trim().toLowerCase();
+                        const title = (btn.getAttribute('title') || '').toLowerCase();
+                        if (text === 'buscar' || text.includes('buscar') || title === 'submit') {
+                            return btn;
+                        }
+                    }
+                    
+                    const allElements = root.querySelectorAll('*');
+                    for (const el of allElements) {
+                        if (el.shadowRoot) {
+                            const found = searchInShadow(el.shadowRoot);
+                            if (found) return found;
+                        }
+                    }
+                    return null;
+                };
+                
+                searchButton = searchInShadow(document);
+            }
+            
+            if (!searchButton) {
+                const input = document.querySelector(arguments[0]);
+                if (input) {
+                    const parent = input.closest('form, div, lightning-card') || input.parentElement;
+                    if (parent) {
+                        const nearButtons = parent.querySelectorAll('button');
+                        for (const btn of nearButtons) {
+                            const text = (btn.innerText || btn.textContent || '').trim().toLowerCase();
+                            if (text && text.length < 20) {
+                                searchButton = btn;
+                                break;
+                            }
+                        }
+                    }
+                }
+            }
+            
+            if (!searchButton) {
+                return { success: false, error: 'Botão Buscar não encontrado após 3 métodos' };
+            }
+            
+            searchButton.scrollIntoView({block: 'center'});
+            searchButton.click();
+            searchButton.dispatchEvent(new MouseEvent('click', {bubbles: true}));
+            
+            return { success: true, buttonText: searchButton.innerText || searchButton.textContent };
+            """
+            
+            resultado_click = executar_js_safe(driver, script_buscar, ', '.join(SELETORES_BUSCA_CPF))
+            
+            if not resultado_click or not resultado_click.get('success'):
+                log_warn(f"Erro ao clicar Buscar: {resultado_click.get('error') if resultado_click else 'sem resposta'}")
+                
+                log_debug("Tentando via Selenium...")
+                try:
+                    executar_js_safe(driver, JS_FUNCAO_RESULTADO_BUSCA + "marcarCandidatosAntesDaBusca();")
+                    btn_selenium = driver.find_element(By.XPATH, "//button[contains(text(), 'Buscar') or @title='Submit']")
+                    btn_selenium.click()
+                    log_ok("Botão Buscar clicado via Selenium")
+                except Exception as e:
+                    log_debug(f"Selenium também falhou: {str(e)[:60]}")
+                    time.sleep(1)
+                    continue
+            else:
+                log_ok(f"Botão Buscar clicado: {resultado_click.get('buttonText', 'Buscar')}")
+            
+            log_info("Aguardando resposta da busca...")
+            resposta = aguardar_resultado_busca(driver, clicar=True)
+            tipo_resposta = resposta.get('tipo')
+            
+            if tipo_resposta in ('invalid', 'not_found'):
+                _log_erro_cpf(tipo_resposta, resposta.get('mensagem'))
+                return tipo_resposta
+            
+            if tipo_resposta == 'timeout':
+                # Um link que já estava na página (aba, item recente) pode ser
+                # de outro cliente: a busca é refeita em vez de clicá-lo
+                log_debug("Candidatos descartados:")
+                _log_candidatos(resposta)
+            
+            if tipo_resposta != 'resultado':
+                log_warn(f"Resultado não apareceu após {TIMEOUT_RESULTADO_BUSCA}s")
+                time.sleep(0.5)
+                continue
+            
+            elemento_resultado = resposta.get('elemento')
+            log_ok(f"✓ Resultado encontrado em {resposta.get('elapsedMs', '?')} ms: {resposta.get('texto', '')[:40]}")
+            log_debug(f"Regra: {'+'.join(resposta.get('regras', []))} (score {resposta.get('score')})")
+            
+            clicado = bool(resposta.get('clicado'))
+            
+            if not clicado and elemento_resultado:
+                log_info("Clicando no resultado...")
+                try:
+                    driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", elemento_resultado)
+                    time.sleep(0.5)
+                    
+                    try:
+                        elemento_resultado.click()
+                        clicado = True
+                    except Exception:
+                        pass
+                    
+                    if not clicado:
+                        try:
+                            actions = ActionChains(driver)
+                            actions.move_to_element(elemento_resultado).click().perform()
+                            clicado = True
+                        except Exception:
+                            pass
+                except Exception as e:
+                    log_error(f"Erro ao clicar: {str(e)[:100]}")
+            
+            if clicado:
+                aguardar_condicao(driver, 'registro_cliente')
+                
+                try:
+                    url_atual = driver.current_url
+                    if '/lightning/r/' in url_atual or '/Account/' in url_atual or '/Contact/' in url_atual or '/view' in url_atual:
+                        log_ok("✓ Navegação confirmada para página do cliente!")
+                        # Armazena a URL do cliente para referência futura
+                        marcar_cliente_atual(driver, url_atual)
+                        # O cache vale por dias: só guarda a conta que confirmadamente é deste CPF
+                        if '/lightning/r/' in url_atual and registro_mostra_cpf(driver, cpf):
+                            cache_cpf_salvar(cpf, url_atual)
+                        elif '/lightning/r/' in url_atual:
+                            log_warn("CPF não aparece no registro aberto - conta não vai para o cache")
+                        return True
+                    else:
+                        log_warn(f"Ainda na página: {url_atual[:60]}")
+                except:
+                    pass
+                
+                return True
+            
+            log_error(f"Não conseguiu clicar no resultado na tentativa {tentativa}")
+            time.sleep(1)
+            
+        except Exception as e:
+            log_debug(f"Exceção: {str(e)[:100]}")
+            time.sleep(1)
     
-    log_info("10. Categoria (5ª opção)...")
-    selecionar_combobox_melhorado(driver, 'Categoria', 5, 'Categoria')
+    log_error(f"Falha após {max_tentativas} tentativas")
+    return False
+
+def _org_do_driver(driver):
+    try:
+        return driver.current_url.split('/')[2]
+    except Exception:
+        return ''
+
+def _cache_picklist():
+    """Carrega o cache de picklists do disco na primeira vez; descarta versão antiga"""
+    global _CACHE_PICKLIST
+    if _CACHE_PICKLIST is None:
+        dados = {}
+        try:
+            with open(ARQUIVO_CACHE_PICKLIST, encoding='utf-8') as f:
+                dados = json.load(f)
+        except (OSError, ValueError):
+            pass
+        
+        if not isinstance(dados, dict) or dados.get('versao') != PICKLIST_CACHE_VERSAO:
+            dados = {'versao': PICKLIST_CACHE_VERSAO, 'orgs': {}}
+        _CACHE_PICKLIST = dados
+    return _CACHE_PICKLIST
+
+def _gravar_cache_picklist():
+    try:
+        tmp = f"{ARQUIVO_CACHE_PICKLIST}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(_cache_picklist(), f, ensure_ascii=False, indent=1)
+        os.replace(tmp, ARQUIVO_CACHE_PICKLIST)
+    except OSError as e:
+        log_debug(f"Cache de picklists não gravado: {str(e)[:80]}")
+
+def chave_picklist(label, tipo_registro='', controle=None):
+    """Chave do cache: 'Tipo/Label', com '[Controlador=valor]' nas dependentes.
     
-    log_info("11. Subcategoria (5ª opção)...")
-    selecionar_combobox_melhorado(driver, 'Subcategoria', 5, 'Subcategoria')
+    Tipos de registro diferentes têm listas diferentes para o mesmo label, e
+    uma dependente muda com o valor do campo que a controla.
+    """
+    chave = f"{tipo_registro}/{label}"
+    if controle:
+        chave += "[{}={}]".format(*controle)
+    return chave
+
+def picklist_opcoes(org, chave):
+    """Opções conhecidas da picklist (na ordem da tela) ou None"""
+    if not USAR_CACHE_PICKLIST:
+        return None
+    with _LOCK_PICKLIST:
+        entrada = _cache_picklist()['orgs'].get(org, {}).get(chave)
+    if not entrada or time.time() - entrada['coletado_em'] > PICKLIST_CACHE_TTL:
+        return None
+    return entrada['opcoes']
+
+def picklist_registrar(org, chave, opcoes):
+    """Grava as opções colhidas da tela; só escreve no disco quando mudaram"""
+    if not USAR_CACHE_PICKLIST or not opcoes:
+        return
+    with _LOCK_PICKLIST:
+        orgs = _cache_picklist()['orgs']
+        anterior = orgs.get(org, {}).get(chave)
+        if anterior and anterior['opcoes'] == opcoes and time.time() - anterior['coletado_em'] < PICKLIST_CACHE_TTL:
+            return
+        if anterior and anterior['opcoes'] != opcoes:
+            log_warn(f"Picklist '{chave}' mudou desde a última coleta - cache atualizado")
+        orgs.setdefault(org, {})[chave] = {'opcoes': list(opcoes), 'coletado_em': int(time.time())}
+        _gravar_cache_picklist()
+
+def conferir_opcao_picklist(org, chave, opcao):
+    """Avisa quando o texto fixado não está mais entre as opções colhidas.
     
-    # 12. Verificar em (próximo dia)
-    log_info("12. Preenchendo data 'Verificar em' (próximo dia)...")
-    tomorrow = datetime.now() + timedelta(days=1)
-    data_formatada = tomorrow.strftime("%d/%m/%Y")
+    Só o texto é estável: a posição é a da tela no momento da seleção e
+    troca de valor se a picklist for reordenada. Nenhuma das duas é
+    traduzida pelo cache.
+    """
+    if not isinstance(opcao, str):
+        log_debug(f"'{chave}' selecionado pela posição {opcao} na tela")
+        return
+    opcoes = picklist_opcoes(org, chave)
+    if opcoes and opcao.lower() not in (o.lower() for o in opcoes):
+        log_warn(f"'{opcao}' não está entre as opções de '{chave}' - confira o fluxo")
+
+def selecionar_combobox_melhorado(driver, label, arrow_count, descricao="", max_tentativas=3, chave=None):
+    """Seleciona uma opção do combobox; arrow_count é a posição (1 = primeira) ou o texto da opção.
     
-    js_fill_date = """
-    const dateStr = arguments[0];
+    chave: entrada do cache de picklists (chave_picklist); padrão o label.
+    """
+    org = _org_do_driver(driver)
+    chave = chave or chave_picklist(label)
+    conferir_opcao_picklist(org, chave, arrow_count)
+    log_info(f"Selecionando '{label}' (opção {arrow_count})")
     
-    function findDeep(root, selector) {
-        try {
-            const el = root.querySelector(selector);
-            if (el && el.offsetWidth > 0) return el;
-        } catch(e){}
+    for tentativa in range(1, max_tentativas + 1):
+        try:
+            prep = chamar_sfa(driver, 'prepararCombobox', label)
+            if not prep or not prep.get('success'):
+                if tentativa < max_tentativas:
+                    time.sleep(0.05)
+                continue
+            
+            # Clique mais direto e rápido
+            abriu = chamar_sfa(driver, 'abrirCombobox')
+            if not abriu or not abriu.get('success'):
+                chamar_sfa(driver, 'limparCombobox')
+                if tentativa < max_tentativas:
+                    time.sleep(0.05)
+                continue
+            
+            # Aguarda brevemente para dropdown abrir
+            time.sleep(0.1)
+            
+            verif = chamar_sfa(driver, 'comboboxAberto')
+            
+            if not verif:
+                if tentativa < max_tentativas:
+                    time.sleep(0.05)
+                continue
+            
+            # Se não abriu, tenta novamente
+            if not verif.get('opened') and tentativa < max_tentativas:
+                chamar_sfa(driver, 'abrirCombobox')
+                time.sleep(0.1)
+                verif = chamar_sfa(driver, 'comboboxAberto')
+                if not verif or not verif.get('opened'):
+                    continue
+            
+            if isinstance(arrow_count, str):
+                resultado = chamar_sfa(driver, 'clicarOpcaoPorTexto', arrow_count)
+            else:
+                resultado = chamar_sfa(driver, 'clicarOpcao', arrow_count - 1)
+            
+            if resultado:
+                picklist_registrar(org, chave, resultado.get('opcoes'))
+            
+            if resultado and resultado.get('success'):
+                valor = resultado.get('value', descricao)
+                log_ok(f"Selecionado: {valor}")
+                return True
+            
+        except Exception:
+            if tentativa < max_tentativas:
+                time.sleep(0.05)
+    
+    log_warn(f"Automação falhou após {max_tentativas} tentativas")
+    
+    manual = perguntar(f"\nSelecionar '{descricao}' MANUALMENTE? (s/n): ", 'n').strip().lower()
+    
+    if manual == 's':
+        perguntar(f"Selecione '{descricao}' e pressione Enter...")
+        log_ok(f"Seleção manual: {descricao}")
+        return True
+    
+    log_warn(f"'{label}' não foi selecionado")
+    return False
+
+def preencher_comboboxes(driver, campos, max_tentativas=3, tipo_registro='', dependentes=None):
+    """Preenche vários comboboxes do formulário em uma única rotina em página.
+    
+    campos: {label: opção}, na ordem de preenchimento; opção é o texto ou a
+    posição na tela (1 = primeira válida).
+    tipo_registro/dependentes ({label: label do controlador}): escopo das
+    opções no cache de picklists.
+    Campos que falharem caem para selecionar_combobox_melhorado. Retorna o
+    relatório por campo (valor, tentativas, ms).
+    """
+    inicio = time.perf_counter()
+    org = _org_do_driver(driver)
+    chaves = {}
+    for label, opcao in campos.items():
+        controlador = (dependentes or {}).get(label)
+        controle = (controlador, campos.get(controlador)) if controlador else None
+        chaves[label] = chave_picklist(label, tipo_registro, controle)
+        conferir_opcao_picklist(org, chaves[label], opcao)
+    spec = [{'label': label, 'opcao': opcao} for label, opcao in campos.items()]
+    
+    relatorio = chamar_sfa_async(driver, 'preencherComboboxes', spec, {'maxTentativas': max_tentativas})
+    if not isinstance(relatorio, list):
+        log_warn("Preenchimento em lote falhou - seguindo campo a campo")
+        relatorio = []
+    
+    preenchidos = {r['label'] for r in relatorio if r.get('success')}
+    for r in relatorio:
+        picklist_registrar(org, chaves[r['label']], r.pop('opcoes', None))
+        if r.get('success'):
+            log_ok(f"{r['label']}: {r.get('valor')} ({r['ms']} ms, {r['tentativas']} tentativa(s))")
+        else:
+            log_warn(f"{r['label']}: {r.get('erro')} após {r['tentativas']} tentativa(s)")
+    
+    log_info(f"Comboboxes em lote: {len(preenchidos)}/{len(campos)} em {int((time.perf_counter() - inicio) * 1000)} ms")
+    
+    for label, opcao in campos.items():
+        if label not in preenchidos:
+            ok = selecionar_combobox_melhorado(driver, label, opcao, label, max_tentativas, chaves[label])
+            relatorio = [r for r in relatorio if r['label'] != label]
+            relatorio.append({'label': label, 'opcao': opcao, 'success': ok, 'valor': None,
+                              'erro': None if ok else 'falhou', 'tentativas': None, 'ms': None})
+    
+    return relatorio
+
+def _id_registro(url):
+    m = re.search(r'/lightning/r/\w+/(\w{15,18})/', url or '')
+    return m.group(1) if m else None
+
+def marcar_cliente_atual(driver, url=None):
+    """Guarda a URL do cliente aberto e associa o registro à aba do console"""
+    url = url or driver.current_url
+    recursos_do_driver(driver)['cliente_url'] = url
+    chamar_sfa(driver, 'registrarAbaAtual')
+    return url
+
+@rastrear('navegar_registro')
+def navegar_para_registro(driver, url=None, timeout=TIMEOUT_DEFAULT):
+    """Leva o console ao registro da url (sem url, à primeira aba de conta/contato).
+    
+    Tenta a aba já aberta e depois force:navigateToSObject, confirmando pela
+    troca de rota com o registro renderizado. A URL só é recarregada quando
+    o console não consegue navegar.
+    """
+    record_id = _id_registro(url)
+    res = chamar_sfa_async(driver, 'navegarParaRegistro', record_id,
+                           SELETORES_REGISTRO_CARREGADO, int(timeout * 1000))
+    
+    if isinstance(res, dict) and res.get('success'):
+        registrar_espera('navegacao_registro', res.get('ms', 0), True)
+        log_ok(f"✓ Registro aberto ({res.get('metodo')}) em {res.get('ms')} ms")
+        return True
+    
+    if isinstance(res, dict) and res.get('metodo'):
+        registrar_espera('navegacao_registro', int(timeout * 1000), False)
+        log_debug(f"Navegação pelo console ({res['metodo']}) não confirmou")
+    
+    if not url:
+        return False
+    
+    log_info("Carregando o registro pela URL...")
+    try:
+        driver.get(url)
+    except Exception as e:
+        log_debug(f"Erro com URL direta: {str(e)[:60]}")
+        return False
+    return aguardar_condicao(driver, 'registro_cliente', timeout)
+
+def chaves_abas(driver):
+    """Identificadores (id do registro) das abas de registro abertas agora no console"""
+    abas = chamar_sfa(driver, 'listarAbas')
+    return {a['chave'] for a in abas} if isinstance(abas, list) else set()
+
+def coletar_abas(driver, antes, manter_url=None, limite=0):
+    """Fecha as abas que a automação abriu e não estão mais em uso.
+    
+    antes: chaves_abas() tirado antes da busca/fluxo; o que surgiu depois é
+    da automação (abas que o operador abriu nunca são fechadas). A aba ativa
+    e a do registro manter_url ficam; das demais só as 'limite' mais
+    recentes continuam abertas. Loga nós do DOM e heap JS a cada ciclo.
+    """
+    recursos = recursos_do_driver(driver)
+    abas = chamar_sfa(driver, 'listarAbas')
+    if not isinstance(abas, list):
+        return 0
+    
+    recursos['abas_automacao'] |= {a['chave'] for a in abas} - set(antes)
+    manter_id = _id_registro(manter_url)
+    terminadas = [a['chave'] for a in abas
+                  if a['chave'] in recursos['abas_automacao'] and not a['ativa'] and a['id'] != manter_id]
+    fechar = terminadas[:max(0, len(terminadas) - limite)]
+    
+    fechadas = 0
+    if fechar:
+        res = chamar_sfa(driver, 'fecharAbas', fechar)
+        fechadas = res.get('fechadas', 0) if isinstance(res, dict) else 0
+        recursos['abas_automacao'] -= set(fechar)
+    
+    m = chamar_sfa(driver, 'metricasPagina') or {}
+    heap = f"{m['heapMb']} MB" if m.get('heapMb') is not None else "n/d"
+    log_info(f"Abas: {fechadas} fechada(s), {m.get('abas', '?')} aberta(s) | "
+             f"DOM {m.get('nos', '?')} nós | heap JS {heap}")
+    return fechadas
+
+def voltar_para_cliente(driver, forcar_retorno=False):
+    """Navega de volta para a aba do cliente (Account) após salvar um caso"""
+    recursos = recursos_do_driver(driver)
+    
+    log_info("Retornando para a página do cliente...")
+    
+    # PRIMEIRO: Verificar se JÁ está na página do cliente (pular se forcar_retorno=True)
+    if not forcar_retorno and verificar_se_esta_na_pagina_cliente(driver):
+        log_ok("✓ Já está na página do cliente!")
+        marcar_cliente_atual(driver)
+        return True
+    
+    if navegar_para_registro(driver, recursos.get('cliente_url')) and verificar_se_esta_na_pagina_cliente(driver):
+        marcar_cliente_atual(driver)
+        log_ok("✓ Confirmado na página do cliente!")
+        return True
+    
+    log_error("✗ Não conseguiu voltar automaticamente")
+    return False
+
+
+def verificar_se_esta_na_pagina_cliente(driver):
+    """Verifica se realmente está na página do cliente"""
+    try:
+        url_atual = driver.current_url
+        
+        if '/lightning/r/Account/' in url_atual or '/lightning/r/Contact/' in url_atual:
+            log_debug("✓ Está na página do cliente")
+            return True
+        
+        log_debug(f"✗ NÃO está na página do cliente. URL: {url_atual[:60]}")
+        return False
+    except Exception as e:
+        log_debug(f"Erro ao verificar página: {str(e)[:60]}")
+        return False
+
+# Campos do passo que são modelos ({descricao}, {email}...); seletores e
+# demais textos vão literais e podem ter chaves
+CAMPOS_MODELO_PASSO = ('valor', 'ok', 'falha', 'manual', 'titulo', 'linhas')
+
+def _formatar_passo(passo, ctx):
+    """Aplica as entradas do fluxo nos campos-modelo do passo"""
+    formatado = dict(passo)
+    for campo in CAMPOS_MODELO_PASSO:
+        valor = passo.get(campo)
+        if isinstance(valor, str):
+            formatado[campo] = valor.format_map(ctx)
+        elif isinstance(valor, list):
+            formatado[campo] = [v.format_map(ctx) for v in valor]
+    return formatado
+
+def _saudacao():
+    """Retorna saudação baseada no horário"""
+    hora = datetime.now().hour
+    if 5 <= hora < 12:
+        return "bom dia"
+    elif 12 <= hora < 18:
+        return "boa tarde"
+    else:
+        return "boa noite"
+
+def _sucesso(res):
+    return bool(res) and (not isinstance(res, dict) or bool(res.get('success')))
+
+def _acao_clicar(driver, passo, ctx):
+    for alvo in passo['alvos']:
+        if 'busca' in alvo:
+            res = chamar_sfa(driver, 'clicarOpcaoDaBusca', alvo['busca'], alvo.get('indice', 0))
+        elif 'texto' in alvo and 'seletor' not in alvo:
+            res = chamar_sfa(driver, 'click', alvo['texto'], 'text')
+        elif 'texto' in alvo or 'indice' in alvo:
+            res = chamar_sfa(driver, 'clicarElemento', alvo['seletor'], alvo.get('texto'),
+                             alvo.get('exato', False), alvo.get('indice', 0))
+        else:
+            res = chamar_sfa(driver, 'click', alvo['seletor'], 'selector')
+        if _sucesso(res):
+            return True
+    return False
+
+def _acao_aguardar_radio(driver, passo, ctx):
+    res = chamar_sfa_async(driver, 'aguardarRadio', passo['textos'], passo.get('timeout_ms', 5000))
+    if isinstance(res, dict):
+        registrar_espera('radios_tipo_registro', res.get('ms', 0), bool(res.get('success')))
+        if res.get('success'):
+            log_ok(f"Formulário carregado ({res.get('ms')} ms)")
+    return res
+
+def _acao_radio(driver, passo, ctx):
+    return chamar_sfa(driver, 'selecionarRadio', passo['textos'])
+
+def _acao_textarea(driver, passo, ctx):
+    return chamar_sfa(driver, 'fillTextarea', passo['valor'])
+
+def _acao_comboboxes(driver, passo, ctx):
+    relatorio = preencher_comboboxes(driver, passo['campos'], tipo_registro=ctx['_tipo_registro'],
+                                     dependentes=passo.get('dependentes'))
+    # O que ficou em cada campo, para o resumo ({selecionado[Label]})
+    for r in relatorio:
+        if r['success']:
+            valor = r.get('valor') or r.get('opcao')
+            ctx['selecionado'][r['label']] = valor if isinstance(valor, str) else f"{valor}ª opção"
+    return all(r['success'] for r in relatorio)
+
+def _acao_input(driver, passo, ctx):
+    return chamar_sfa(driver, 'fillInput', passo['seletor'], passo['valor'], passo.get('blur', False))
+
+def _acao_digitar(driver, passo, ctx):
+    return digitar_texto_js(driver, passo['seletor'], passo['valor']) is not None
+
+def _acao_editor(driver, passo, ctx):
+    return chamar_sfa(driver, 'preencherEditor', passo['seletor'], passo['valor'])
+
+def _acao_lookup(driver, passo, ctx):
+    return chamar_sfa(driver, 'preencherLookup', passo['seletor'], passo['valor'])
+
+def _acao_menu(driver, passo, ctx):
+    return chamar_sfa_async(driver, 'escolherNoMenu', passo['abrir'], passo['opcoes'],
+                            passo['indice'], passo.get('timeout_ms', 3000))
+
+def _acao_desmarcar(driver, passo, ctx):
+    return chamar_sfa(driver, 'desmarcarCheckboxes', passo['termos'])
+
+def _acao_coletar(driver, passo, ctx):
+    """Pergunta as entradas que quem chamou não informou; aplica o padrão se vazias"""
+    completo = True
+    for nome in passo['campos']:
+        spec = ctx['_entradas'][nome]
+        if nome in ctx:
+            valor = ctx[nome]
+        else:
+            try:
+                valor = perguntar(spec.get('pergunta', f"{nome}: "))
+            except KeyboardInterrupt:
+                valor = ''
+        
+        valor = str(valor or '').strip()
+        if not valor and spec.get('padrao'):
+            valor = spec['padrao']
+            log_info(f"'{nome}': valor padrão aplicado")
+        if not valor and spec.get('obrigatoria'):
+            completo = False
+        ctx[nome] = valor
+    return completo
+
+def _acao_resumo(driver, passo, ctx):
+    print("\n" + "="*70)
+    log_ok("FORMULÁRIO COMPLETO!")
+    print("="*70)
+    if passo.get('linhas'):
+        print()
+        for linha in passo['linhas']:
+            print(linha)
+        print("="*70)
+    print()
+    return True
+
+def _acao_secao(driver, passo, ctx):
+    print("\n" + "="*70)
+    print(f"   {passo['titulo']}")
+    print("="*70 + "\n")
+    return True
+
+def _acao_esperar(driver, passo, ctx):
+    time.sleep(passo['ms'] / 1000)
+    return True
+
+# Ações disponíveis nos passos do fluxos_casos.json: (driver, passo, ctx) -> sucesso
+ACOES_FLUXO = {
+    'clicar': _acao_clicar,
+    'aguardar_radio': _acao_aguardar_radio,
+    'radio': _acao_radio,
+    'textarea': _acao_textarea,
+    'comboboxes': _acao_comboboxes,
+    'input': _acao_input,
+    'digitar': _acao_digitar,
+    'editor': _acao_editor,
+    'lookup': _acao_lookup,
+    'menu': _acao_menu,
+    'desmarcar': _acao_desmarcar,
+    'coletar': _acao_coletar,
+    'resumo': _acao_resumo,
+    'secao': _acao_secao,
+    'esperar': _acao_esperar,
+}
+
+def _validar_fluxos(fluxos, caminho):
+    for chave, fluxo in fluxos.items():
+        for campo in ('nome', 'menu', 'passos'):
+            if campo not in fluxo:
+                raise ValueError(f"{caminho}: fluxo '{chave}' sem '{campo}'")
+        entradas = fluxo.get('entradas', {})
+        for i, passo in enumerate(fluxo['passos'], 1):
+            acao = passo.get('acao')
+            if acao not in ACOES_FLUXO:
+                raise ValueError(f"{caminho}: fluxo '{chave}' passo {i}: ação desconhecida '{acao}'")
+            if passo.get('aguardar') and passo['aguardar'] not in CONDICOES_ESPERA:
+                raise ValueError(f"{caminho}: fluxo '{chave}' passo {i}: condição desconhecida '{passo['aguardar']}'")
+            for nome in passo.get('campos', []) if acao == 'coletar' else []:
+                if nome not in entradas:
+                    raise ValueError(f"{caminho}: fluxo '{chave}' passo {i}: entrada '{nome}' não declarada")
+
+def carregar_fluxos(caminho=None):
+    """Lê as definições dos fluxos de caso; relê só quando o arquivo muda"""
+    global _CACHE_FLUXOS
+    caminho = caminho or ARQUIVO_FLUXOS
+    mtime = os.path.getmtime(caminho)
+    
+    with _LOCK_FLUXOS:
+        if _CACHE_FLUXOS and _CACHE_FLUXOS[0] == (caminho, mtime):
+            return _CACHE_FLUXOS[1]
         
-        const all = root.querySelectorAll('*');
-        for (const elem of all) {
-            try {
-                if (elem.shadowRoot) {
-                    const found = findDeep(elem.shadowRoot, selector);
-                    if (found) return found;
-                }
-            } catch(e){}
-        }
-        return null;
-    }
-    
-    const input = findDeep(document, 'input[name="CheckIn__c"]');
-    if (!input) return { success: false, error: 'Input não encontrado' };
-    
-    try {
-        input.focus();
-        input.value = '';
-        input.value = dateStr;
-        input.dispatchEvent(new Event('input', {bubbles: true}));
-        input.dispatchEvent(new Event('change', {bubbles: true}));
-        input.dispatchEvent(new Event('blur', {bubbles: true}));
-        return { success: true, date: dateStr };
-    } catch(e) {
-        return { success: false, error: String(e) };
-    }
+        with open(caminho, encoding='utf-8') as f:
+            dados = json.load(f)
+        fluxos = dados.get('fluxos', {})
+        _validar_fluxos(fluxos, caminho)
+        _CACHE_FLUXOS = ((caminho, mtime), fluxos)
+        return fluxos
+
+def _log_relatorio_fluxo(relatorio, total_ms):
+    log_info("Tempo por passo:")
+    for r in relatorio:
+        status = "ok" if r['ok'] else "FALHOU"
+        log_info(f"  {r['passo'][:45]:<45} {r['ms']:>6} ms + espera {r['espera_ms']:>5} ms  {r['tentativas']}x  {status}")
+    log_info(f"  {'Total':<45} {total_ms:>6} ms")
+
+@rastrear('fluxo')
+def executar_fluxo(driver, chave, entradas=None):
+    """Executa um fluxo de caso do fluxos_casos.json na página do cliente.
+    
+    entradas: valores já conhecidos (descricao, telefone...); os que faltarem
+    são perguntados no passo 'coletar'. Cada passo é repetido até
+    'tentativas' vezes e o tempo/tentativas de cada um fica em
+    recursos['relatorio_fluxo']. Retorna False se um passo obrigatório falhar.
     """
+    fluxo = carregar_fluxos()[chave]
+    ctx = {'amanha': (datetime.now() + timedelta(days=1)).strftime("%d/%m/%Y"),
+           'saudacao': _saudacao(), '_entradas': fluxo.get('entradas', {}),
+           '_tipo_registro': fluxo.get('tipo_registro', chave),
+           'selecionado': defaultdict(lambda: 'não selecionado')}
+    ctx.update(entradas or {})
+    
+    log_info(f"Iniciando {fluxo['nome']}...")
+    relatorio = []
+    recursos_do_driver(driver)['relatorio_fluxo'] = relatorio
+    inicio_fluxo = time.perf_counter()
+    concluido = True
+    
+    for i, passo in enumerate(fluxo['passos'], 1):
+        log_info(f"{i}. {passo['nome']}...")
+        inicio = time.perf_counter()
+        tentativas = 0
+        ok = False
+        
+        if passo.get('confirmar'):
+            resposta = perguntar(passo['confirmar'], 's').strip().lower()
+            if resposta not in ('s', ''):
+                log_info(passo.get('recusa', "Passo ignorado"))
+                break
+        
+        # Registrado antes da ação: se o job for interrompido no meio (sessão
+        # caiu), _caso_salvo sabe até onde o fluxo chegou
+        registro = {'passo': passo['nome'], 'acao': passo['acao'], 'ok': False,
+                    'tentativas': 0, 'ms': 0, 'espera_ms': 0}
+        relatorio.append(registro)
+        
+        try:
+            passo = _formatar_passo(passo, ctx)
+            acao = ACOES_FLUXO[passo['acao']]
+            with etapa(passo['nome'], acao=passo['acao']) as span:
+                for tentativas in range(1, passo.get('tentativas', 1) + 1):
+                    registro['tentativas'] = tentativas
+                    if _sucesso(acao(driver, passo, ctx)):
+                        ok = True
+                        break
+                    if tentativas < passo.get('tentativas', 1):
+                        time.sleep(passo.get('intervalo_ms', 100) / 1000)
+                span.update(ok=ok, tentativas=tentativas)
+        except (KeyError, ValueError) as e:
+            log_warn(f"Passo mal definido: {e}")
+        
+        if ok:
+            if passo.get('ok'):
+                log_ok(passo['ok'])
+        elif passo.get('manual'):
+            log_warn(passo.get('falha', "Não conseguiu automaticamente"))
+            perguntar(passo['manual'])
+            ok = True
+        elif passo.get('obrigatorio') or sessao_expirada(driver):
+            # Com a sessão expirada os próximos passos só queimariam timeouts
+            log_error(passo.get('falha', f"Falha: {passo['nome']}"))
+            concluido = False
+        else:
+            log_warn(passo.get('falha', f"Falha: {passo['nome']}"))
+        
+        registro.update(ok=ok, ms=int((time.perf_counter() - inicio) * 1000))
+        
+        if not concluido:
+            break
+        
+        # 'aguardar' espera a página ficar pronta; 'depois_ms' é pausa fixa
+        inicio = time.perf_counter()
+        pronta = False
+        if passo.get('aguardar') and ok:
+            with etapa('aguardar', condicao=passo['aguardar']) as span:
+                pronta = span['ok'] = aguardar_condicao(driver, passo['aguardar'])
+        elif passo.get('depois_ms'):
+            time.sleep(passo['depois_ms'] / 1000)
+        registro['espera_ms'] = int((time.perf_counter() - inicio) * 1000)
+        
+        capturar_dom(driver, f"{chave}_{i:02d}_{passo['nome']}", passo['aguardar'] if pronta else None)
+    
+    _log_relatorio_fluxo(relatorio, int((time.perf_counter() - inicio_fluxo) * 1000))
+    return concluido
+
+def menu_principal(fluxos):
+    """Menu com um item por 'menu' dos fluxos, mais busca e saída"""
+    opcoes = list(dict.fromkeys(f['menu'] for f in fluxos.values())) + ["Buscar outro CPF", "Sair"]
     
-    res_date = executar_js_safe(driver, js_fill_date, data_formatada)
-    if res_date and res_date.get('success'):
-        log_ok(f"Data preenchida: {data_formatada}")
+    if HAS_QUESTIONARY:
+        return questionary.select("Escolha uma ação:", choices=opcoes).ask()
     else:
-        log_warn(f"Não conseguiu preencher automaticamente")
-        input("Pressione Enter após preencher a data...")
-    
-    # 13. Desmarcar checkbox de notificação
-    log_info("13. Desmarcando notificação por email...")
-    driver.execute_script("""
-        const allLightningInputs = document.querySelectorAll('lightning-input');
-        for (const input of allLightningInputs) {
-            const title = input.getAttribute('title') || '';
-            if (title.includes('email') || title.includes('notificação')) {
-                input.removeAttribute('checked');
-                try {
-                    if (input.shadowRoot) {
-                        const primitive = input.shadowRoot.querySelector('lightning-primitive-input-checkbox');
-                        if (primitive && primitive.shadowRoot) {
-                            const realInput = primitive.shadowRoot.querySelector('input[type="checkbox"]');
-                            if (realInput) {
-                                realInput.checked = false;
-                                realInput.dispatchEvent(new Event('change', {bubbles: true}));
-                            }
-                        }
-                    }
-                } catch(e) {}
-            }
-        }
-    """)
+        print("\n" + "="*30)
+        print("      AUTOMAÇÃO SALESFORCE")
+        print("="*30)
+        for i, opcao in enumerate(opcoes, 1):
+            print(f"{i}) {opcao}")
+        print("="*30)
+        escolha = input(f"Escolha ({'/'.join(str(i) for i in range(1, len(opcoes) + 1))}): ").strip()
+        if escolha.isdigit() and 1 <= int(escolha) <= len(opcoes):
+            return opcoes[int(escolha) - 1]
+        return "Sair"
+
+def escolher_fluxo(fluxos, menu):
+    """Fluxo do item de menu; pergunta qual quando há subopções. None = voltar"""
+    candidatos = [(chave, f) for chave, f in fluxos.items() if f['menu'] == menu]
+    if len(candidatos) == 1 and not candidatos[0][1].get('opcao'):
+        return candidatos[0][0]
     
-    print("\n" + "="*70)
-    log_ok("FORMULÁRIO COMPLETO!")
-    print("="*70 + "\n")
+    choices = [{"name": f.get('opcao') or f['nome'], "value": chave} for chave, f in candidatos]
+    choices.append({"name": "Voltar", "value": "voltar"})
     
-    # Salvar caso
-    log_info("Salvando caso...")
-    if click_element('button[name="SaveEdit"]') or click_element('Salvar', 'text'):
-        log_ok("CASO SALVO COM SUCESSO!")
-        time.sleep(1.5)
+    if HAS_QUESTIONARY:
+        escolha = questionary.select("Escolha uma opção abaixo: ", choices=choices).ask()
     else:
-        log_error("Erro ao salvar")
-        return False
+        for i, c in enumerate(choices, 1):
+            print(f"{i}) {c['name']}")
+        numero = input("Escolha: ").strip()
+        escolha = choices[int(numero) - 1]['value'] if numero.isdigit() and 1 <= int(numero) <= len(choices) else None
     
-    # ========== NOVO FLUXO DE EMAIL ==========
-    print("\n" + "="*70)
-    print("   FLUXO DE EMAIL")
-    print("="*70 + "\n")
+    return escolha if escolha and escolha != "voltar" else None
+
+@rastrear('inicio')
+def navegar_para_inicio(driver, timeout=TIMEOUT_DEFAULT):
+    """Vai para a página Início sem recarregar o Lightning e espera a busca.
     
-    # 1. Clicar na aba Feed
-    log_info("1. Abrindo aba Feed...")
-    js_click_feed = """
-    const feedTab = document.querySelector('a[data-tab-value="feedTab"]');
-    if (feedTab) {
-        feedTab.scrollIntoView({block: 'center'});
-        feedTab.click();
-        return {success: true};
-    }
-    return {success: false};
-    """
-    if executar_js_safe(driver, js_click_feed):
-        log_ok("Feed aberto")
-        time.sleep(1)
-    else:
-        click_element('Feed', 'text')
-        time.sleep(1)
-    
-    # 2. Clicar em Email
-    log_info("2. Clicando em Email...")
-    js_click_email = """
-    const spans = Array.from(document.querySelectorAll('span.title'));
-    for (const span of spans) {
-        if (span.textContent.trim() === 'Email') {
-            span.scrollIntoView({block: 'center'});
-            span.click();
-            return {success: true};
-        }
-    }
-    return {success: false};
-    """
-    if executar_js_safe(driver, js_click_email):
-        log_ok("Email clicado")
-        time.sleep(1)
-    else:
-        click_element('Email', 'text')
-        time.sleep(1)
-    
-    # 3. Clicar no combobox e selecionar 5ª opção
-    log_info("3. Selecionando 5ª opção no combobox...")
-    js_select_5th = """
-    const combobox = document.querySelector('a.select[role="combobox"]');
-    if (combobox) {
-        combobox.click();
-        setTimeout(() => {
-            const options = document.querySelectorAll('ul[role="presentation"] li a');
-            if (options && options.length >= 5) {
-                options[4].click();
-            }
-        }, 300);
-        return {success: true};
-    }
-    return {success: false};
-    """
-    executar_js_safe(driver, js_select_5th)
-    time.sleep(0.8)
-    
-    # 4. Preencher email do destinatário
-    log_info("4. Preenchendo email do destinatário...")
-    js_fill_recipient = f"""
-    const input = document.querySelector('input[role="combobox"][aria-autocomplete="list"]');
-    if (input) {{
-        input.focus();
-        input.value = '{email_conta}';
-        input.dispatchEvent(new Event('input', {{bubbles: true}}));
-        input.dispatchEvent(new KeyboardEvent('keydown', {{key: 'Enter', bubbles: true}}));
-        return {{success: true}};
-    }}
-    return {{success: false}};
-    """
-    executar_js_safe(driver, js_fill_recipient)
-    time.sleep(0.5)
-    
-    # 5. Preencher assunto
-    log_info("5. Preenchendo assunto...")
-    assunto = f"Retorno de atendimento - {cpf_cliente} - {nome_cliente}"
-    js_fill_subject = f"""
-    const input = document.querySelector('input[placeholder*="Insira o assunto"]');
-    if (input) {{
-        input.focus();
-        input.value = '{assunto}';
-        input.dispatchEvent(new Event('input', {{bubbles: true}}));
-        input.dispatchEvent(new Event('change', {{bubbles: true}}));
-        return {{success: true}};
-    }}
-    return {{success: false}};
+    Troca a rota dentro do app (menu Início ou force:navigateToURL); o
+    driver.get da página só acontece quando o app não navega.
     """
-    executar_js_safe(driver, js_fill_subject)
-    time.sleep(0.3)
-    
-    # 6. Preencher corpo do email
-    log_info("6. Preenchendo corpo do email...")
-    saudacao = get_saudacao()
-    corpo_email = f"""Olá, {nome_cliente}, {saudacao}!
- 
-Esperamos que esteja bem, ficamos felizes com o seu contato, é um prazer receber você aqui na Conta Bemol.
- 
-Por gentileza, por motivos de segurança e validação de dados, para alteração do número de contato, favor encaminhar:
- 
-- Número de Contato ATUAL:
- 
-Após recebermos os dados acima, seguiremos com a análise do seu caso e retornaremos o mais breve possível.
- 
-Conta Bemol - A sua confiança vale muito!
- 
-Atenciosamente,"""
-    
-    js_fill_body = """
-    const body = document.querySelector('body[role="textbox"][contenteditable="true"]');
-    if (body) {
-        body.focus();
-        body.innerHTML = arguments[0].replace(/\\n/g, '<br>');
-        body.dispatchEvent(new Event('input', {bubbles: true}));
-        return {success: true};
-    }
-    return {success: false};
-    """
-    executar_js_safe(driver, js_fill_body, corpo_email)
-    time.sleep(0.5)
-    
-    # 7. Clicar em Enviar
-    log_info("7. Enviando email...")
-    js_click_send = """
-    const spans = Array.from(document.querySelectorAll('span.label.bBody'));
-    for (const span of spans) {
-        if (span.textContent.trim() === 'Enviar') {
-            span.click();
-            return {success: true};
-        }
-    }
-    return {success: false};
-    """
-    if executar_js_safe(driver, js_click_send):
-        log_ok("Email enviado!")
-        time.sleep(2)
-    else:
-        click_element('Enviar', 'text')
-        time.sleep(2)
+    log_info("Navegando para a página inicial...")
+    inicio = time.perf_counter()
     
-    # 8. Clicar em "Pendente cliente"
-    log_info("8. Clicando em 'Pendente cliente'...")
-    js_click_pendente = """
-    const link = document.querySelector('a[data-tab-name="Pendente cliente"]');
-    if (link) {
-        link.click();
-        return {success: true};
-    }
-    return {success: false};
-    """
-    executar_js_safe(driver, js_click_pendente)
-    time.sleep(0.8)
-    
-    # 9. Marcar status como concluído
-    log_info("9. Marcando status como concluído...")
-    js_click_concluido = """
-    const spans = Array.from(document.querySelectorAll('span.uiOutputText'));
-    for (const span of spans) {
-        if (span.textContent.includes('Marcar Status do caso como concluído')) {
-            span.click();
-            return {success: true};
-        }
-    }
-    return {success: false};
-    """
-    executar_js_safe(driver, js_click_concluido)
-    time.sleep(1)
-    
-    # 10. Preencher campo de busca com "CAB"
-    log_info("10. Buscando fila CAB...")
-    js_search_cab = """
-    const input = document.querySelector('input[placeholder*="Pesquisar Filas"]');
-    if (input) {
-        input.focus();
-        input.value = 'CAB';
-        input.dispatchEvent(new Event('input', {bubbles: true}));
-        return {success: true};
-    }
-    return {success: false};
-    """
-    executar_js_safe(driver, js_search_cab)
-    time.sleep(1.5)
-    
-    # 11. Selecionar segunda opção
-    log_info("11. Selecionando segunda opção...")
-    js_select_second = """
-    const options = document.querySelectorAll('[role="option"]');
-    if (options && options.length >= 2) {
-        options[1].click();
-        return {success: true};
-    }
-    return {success: false};
-    """
-    executar_js_safe(driver, js_select_second)
-    time.sleep(0.5)
-    
-    # 12. Clicar em "Transferir Fila"
-    log_info("12. Clicando em 'Transferir Fila'...")
-    js_click_transferir_fila = """
-    const buttons = Array.from(document.querySelectorAll('button.slds-button_brand'));
-    for (const btn of buttons) {
-        if (btn.textContent.includes('Transferir Fila')) {
-            btn.click();
-            return {success: true};
-        }
-    }
-    return {success: false};
-    """
-    executar_js_safe(driver, js_click_transferir_fila)
-    time.sleep(0.8)
-    
-    # 13. Confirmar transferência
-    log_info("13. Confirmando transferência...")
-    js_click_transferir_final = """
-    const buttons = Array.from(document.querySelectorAll('button[title="Transferir"]'));
-    for (const btn of buttons) {
-        btn.click();
-        return {success: true};
-    }
-    return {success: false};
-    """
-    if executar_js_safe(driver, js_click_transferir_final):
-        log_ok("Transferência confirmada!")
-        time.sleep(1)
+    res = chamar_sfa(driver, 'irParaInicio')
+    metodo = res.get('metodo') if isinstance(res, dict) else None
+    if metodo and aguardar_condicao(driver, 'busca_pronta', timeout):
+        log_ok(f"Página Início pronta ({metodo}) em {int((time.perf_counter() - inicio) * 1000)} ms")
+        return True
     
-    print("\n" + "="*70)
-    log_ok("FLUXO COMPLETO FINALIZADO COM SUCESSO!")
-    print("="*70 + "\n")
+    log_info("Carregando a página Início pela URL...")
+    try:
+        current_url = driver.current_url
+        base_url = current_url.split('/lightning/')[0] if '/lightning/' in current_url else current_url.split('.com')[0] + '.com'
+        driver.get(base_url + '/lightning/page/home')
+    except Exception as e:
+        log_warn(f"Não conseguiu navegar para início: {str(e)[:60]}")
+    
+    if sessao_expirada(driver):
+        log_warn("Sessão expirada - página Início indisponível")
+        return False
     
+    if not verificar_pagina_inicial(driver, TIMEOUT_SEARCH):
+        log_warn("Não está na página Início. Continuando mesmo assim...")
+        return False
     return True
 
-def menu_principal():
-    if HAS_QUESTIONARY:
-        return questionary.select(
-            "Escolha uma ação:",
-            choices=[
-                "Registrar informação", 
-                "Registrar Conta Bemol", 
-                "Buscar outro CPF",
-                "Sair"
-            ]
-        ).ask()
-    else:
-        print("\n" + "="*30)
-        print("      AUTOMAÇÃO SALESFORCE")
-        print("="*30)
-        print("1) Registrar informação")
-        print("2) Registrar Conta Bemol")
-        print("3) Buscar outro CPF")
-        print("4) Sair")
-        print("="*30)
-        escolha = input("Escolha (1/2/3/4): ").strip()
-        if escolha == "1":
-            return "Registrar informação"
-        elif escolha == "2":
-            return "Registrar Conta Bemol"
-        elif escolha == "3":
-            return "Buscar outro CPF"
-        else:
-            return "Sair"
-
+@rastrear('busca')
 def buscar_novo_cpf(driver):
     """Função para buscar um novo CPF sem sair do sistema"""
     max_tentativas_cpf = 5
@@ -2387,22 +4149,15 @@ def buscar_novo_cpf(driver):
                 return False
             continue
         
-        log_ok(f"CPF validado: {cpf[:3]}.***.***-{cpf[-2:]}")
+        log_ok(f"CPF validado: {mascarar_cpf(cpf)}")
         
         log_info("\nBUSCA DE CLIENTE")
         
-        # Primeiro, tentar navegar para a página inicial
-        log_info("Navegando para a página inicial...")
-        try:
-            current_url = driver.current_url
-            base_url = current_url.split('/lightning/')[0] if '/lightning/' in current_url else current_url.split('.com')[0] + '.com'
-            driver.get(base_url + '/lightning/page/home')
-            time.sleep(0.5)
-        except Exception as e:
-            log_warn(f"Não conseguiu navegar para início: {str(e)[:60]}")
+        if abrir_cliente_do_cache(driver, cpf):
+            log_ok("\n✓ Cliente encontrado com sucesso!")
+            return True
         
-        if not verificar_pagina_inicial(driver):
-            log_warn("Não está na página Início. Continuando mesmo assim...")
+        navegar_para_inicio(driver)
         
         resultado_busca = buscar_cpf_automatico(driver, cpf, max_tentativas=3)
         
@@ -2486,8 +4241,375 @@ def buscar_novo_cpf(driver):
     
     return cpf_encontrado
 
+def ler_jobs_lote(caminho):
+    """Lê jobs de um TXT (um CPF por linha) ou CSV, um de cada vez.
+    
+    Colunas: cpf[, fluxo[, dados...]]. Os dados são as entradas do fluxo na
+    ordem do fluxos_casos.json, sem o cpf: para 'informacao' a descrição;
+    para 'conta_bemol' telefone, email e nome.
+    """
+    with open(caminho, newline='', encoding='utf-8-sig') as f:
+        amostra = f.read(2048)
+        f.seek(0)
+        try:
+            dialeto = csv.Sniffer().sniff(amostra, delimiters=',;\t')
+        except csv.Error:
+            dialeto = csv.excel
+        
+        for linha in csv.reader(f, dialeto):
+            if not linha or not linha[0].strip():
+                continue
+            valor = linha[0].strip()
+            # Cabeçalho ("cpf", "documento"...) não tem dígitos
+            if not limpar_cpf(valor):
+                continue
+            yield {
+                'cpf': valor,
+                'fluxo': linha[1].strip().lower() if len(linha) > 1 else '',
+                'dados': [c.strip() for c in linha[2:]],
+            }
+
+def buscar_cpf_lote(driver, cpf_raw):
+    """Busca um CPF sem nenhuma interação e devolve a linha de resultado"""
+    inicio = time.perf_counter()
+    cpf = limpar_cpf(cpf_raw)
+    linha = {'cpf': cpf or cpf_raw, 'status': 'error', 'url': '', 'elapsed_ms': 0,
+             'fluxo': '', 'caso': '', 'mensagem': ''}
+    
+    if not validar_cpf(cpf):
+        linha['status'] = 'invalid'
+        linha['mensagem'] = 'CPF inválido localmente'
+    else:
+        recursos = recursos_do_driver(driver)
+        try:
+            recursos['cliente_url'] = None
+            
+            if abrir_cliente_do_cache(driver, cpf):
+                resultado = True
+                linha['mensagem'] = 'cache'
+            else:
+                if navegar_para_inicio(driver):
+                    capturar_dom(driver, 'inicio', 'busca_pronta')
+                resultado = buscar_cpf_automatico(driver, cpf, max_tentativas=3)
+            
+            if resultado == 'invalid':
+                linha['status'] = 'invalid'
+                linha['mensagem'] = 'CPF rejeitado pelo Salesforce'
+            elif resultado == 'not_found':
+                linha['status'] = 'not_found'
+            elif resultado == 'session_expired':
+                linha['mensagem'] = 'Sessão expirada'
+            elif resultado == True:
+                linha['status'] = 'found'
+                linha['url'] = recursos.get('cliente_url') or driver.current_url
+            else:
+                linha['mensagem'] = 'Falha na busca automática'
+            
+            capturar_dom(driver, f"busca_{linha['status']}",
+                         'registro_cliente' if linha['status'] == 'found' else None)
+        except Exception as e:
+            linha['mensagem'] = str(e)[:200]
+    
+    linha['elapsed_ms'] = int((time.perf_counter() - inicio) * 1000)
+    return linha
+
+def executar_fluxo_lote(driver, job, cpf):
+    """Roda o fluxo de caso do job na página do cliente já aberta"""
+    fluxos = carregar_fluxos()
+    fluxo = job['fluxo']
+    if fluxo not in fluxos:
+        raise ValueError(f"Fluxo desconhecido: {fluxo} (use {', '.join(fluxos)})")
+    
+    # Nada pode ser perguntado: entradas sem coluna no CSV ficam vazias
+    entradas = {'cpf': cpf}
+    livres = [nome for nome in fluxos[fluxo].get('entradas', {}) if nome not in entradas]
+    for nome, valor in zip(livres, job['dados'] + [''] * len(livres)):
+        entradas[nome] = valor
+    
+    return executar_fluxo(driver, fluxo, entradas)
+
+def _caso_salvo(driver, chave):
+    """O último fluxo pode ter salvo o caso?
+    
+    Basta o clique no Salvar (passo com aguardar 'caso_salvo') ter sido
+    tentado: a sessão pode cair depois do clique e antes da confirmação, e
+    refazer o fluxo nesse caso cria um caso duplicado.
+    """
+    relatorio = recursos_do_driver(driver).get('relatorio_fluxo') or []
+    passos = carregar_fluxos()[chave]['passos']
+    return any(p.get('aguardar') == 'caso_salvo' and r['tentativas'] for p, r in zip(passos, relatorio))
+
+@rastrear('job')
+def processar_job(driver, job):
+    """Busca o CPF do job e, se achou o cliente, executa o fluxo de caso pedido.
+    
+    Se a sessão expirar, refaz o login uma vez e retoma o job no passo que
+    falhou (busca ou fluxo) em vez de seguir queimando timeouts.
+    """
+    zerar_perfil(driver)
+    antes = chaves_abas(driver)
+    inicio = time.perf_counter()
+    linha = buscar_cpf_lote(driver, job['cpf'])
+    
+    if linha['status'] == 'error' and sessao_expirada(driver) and relogar(driver):
+        antes = chaves_abas(driver)
+        linha = buscar_cpf_lote(driver, job['cpf'])
+    
+    if job['fluxo'] and linha['status'] == 'found':
+        linha['fluxo'] = job['fluxo']
+        for tentativa in (1, 2):
+            try:
+                linha['caso'] = 'ok' if executar_fluxo_lote(driver, job, linha['cpf']) else 'erro'
+            except Exception as e:
+                linha['caso'] = 'erro'
+                linha['mensagem'] = str(e)[:200]
+            
+            if linha['caso'] == 'ok' or tentativa == 2 or not sessao_expirada(driver):
+                break
+            if _caso_salvo(driver, job['fluxo']):
+                # Refazer o fluxo criaria um caso duplicado
+                linha['mensagem'] = 'Sessão expirou após o clique em Salvar - conferir o caso e concluir manualmente'
+                break
+            if not relogar(driver):
+                linha['mensagem'] = 'Sessão expirada'
+                break
+            
+            antes = chaves_abas(driver)
+            if not navegar_para_registro(driver, linha['url']):
+                linha['mensagem'] = 'Não voltou ao cliente após refazer o login'
+                break
+            log_info(f"Retomando o fluxo {job['fluxo']}...")
+            linha['mensagem'] = ''
+    
+    linha['elapsed_ms'] = int((time.perf_counter() - inicio) * 1000)
+    coletar_abas(driver, antes)
+    resumo_perfil(driver, f"job {mascarar_cpf(linha['cpf'])}")
+    return linha
+
+def _abrir_saida_lote(saida):
+    f = open(saida, 'w', newline='', encoding='utf-8')
+    writer = csv.DictWriter(f, fieldnames=COLUNAS_LOTE)
+    writer.writeheader()
+    return f, writer
+
+def _resumo_lote(contagem, inicio):
+    total = sum(contagem.values())
+    print("\n" + "="*70)
+    log_ok(f"LOTE FINALIZADO: {total} CPFs em {int(time.time() - inicio)}s")
+    print("="*70)
+    for status, qtd in contagem.items():
+        print(f"{status}: {qtd}")
+    print("="*70 + "\n")
+
+def processar_lote(driver, entrada, saida):
+    """Processa um arquivo de CPFs sem interação, gravando uma linha por CPF"""
+    global MODO_NAO_INTERATIVO
+    MODO_NAO_INTERATIVO = True
+    
+    contagem = {'found': 0, 'invalid': 0, 'not_found': 0, 'error': 0}
+    inicio = time.time()
+    
+    print("\n" + "="*70)
+    print("   BUSCA EM LOTE")
+    print("="*70 + "\n")
+    log_info(f"Entrada: {entrada}")
+    log_info(f"Saída: {saida}")
+    
+    f, writer = _abrir_saida_lote(saida)
+    with f:
+        for n, job in enumerate(ler_jobs_lote(entrada), 1):
+            linha = processar_job(driver, job)
+            writer.writerow(linha)
+            # Flush a cada linha: resultado parcial sobrevive a uma queda no meio da noite
+            f.flush()
+            
+            contagem[linha['status']] += 1
+            log_info(f"[{n}] {mascarar_cpf(linha['cpf'])} -> {linha['status']} ({linha['elapsed_ms']} ms)")
+    
+    _resumo_lote(contagem, inicio)
+    return contagem
+
+def _worker_pool(n, usuario, senha, usar_sessao, opcoes, fila, writer, f, lock_saida, contagem):
+    """Worker do pool: um Edge com perfil próprio consumindo jobs da fila"""
+    recursos = novos_recursos()
+    
+    try:
+        try:
+            driver = criar_driver(recursos=recursos, **opcoes)
+        except Exception as e:
+            log_error(f"Worker {n} não iniciou o Edge: {e}")
+            return
+        
+        if not garantir_login(driver, usuario, senha, usar_sessao):
+            log_error(f"Worker {n} não conseguiu logar - encerrando")
+            return
+        
+        log_ok(f"Worker {n} pronto")
+        
+        while True:
+            job = fila.get()
+            try:
+                if job is None:
+                    return
+                
+                linha = processar_job(driver, job)
+                
+                with lock_saida:
+                    writer.writerow(linha)
+                    f.flush()
+                    contagem[linha['status']] += 1
+                
+                log_info(f"{mascarar_cpf(linha['cpf'])} -> {linha['status']} ({linha['elapsed_ms']} ms)")
+            finally:
+                fila.task_done()
+    finally:
+        liberar_recursos(recursos)
+
+def executar_pool(usuario, senha, entrada, saida, n_workers, usar_sessao=False, opcoes=None):
+    """Distribui os jobs do arquivo entre N navegadores independentes.
+    
+    opcoes: argumentos de criar_driver de cada worker (opcoes_driver()).
+    """
+    global MODO_NAO_INTERATIVO
+    MODO_NAO_INTERATIVO = True
+    
+    print("\n" + "="*70)
+    print(f"   POOL DE {n_workers} WORKERS")
+    print("="*70 + "\n")
+    log_info(f"Entrada: {entrada}")
+    log_info(f"Saída: {saida}")
+    
+    # Fila limitada: o arquivo é lido conforme os workers consomem
+    fila = queue.Queue(maxsize=n_workers * 4)
+    lock_saida = threading.Lock()
+    contagem = {'found': 0, 'invalid': 0, 'not_found': 0, 'error': 0}
+    inicio = time.time()
+    
+    def enfileirar(item):
+        # Se todos os workers morreram (ex.: login falhou) não há quem consuma
+        while any(t.is_alive() for t in workers):
+            try:
+                fila.put(item, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    f, writer = _abrir_saida_lote(saida)
+    with f:
+        workers = [
+            threading.Thread(
+                target=_worker_pool,
+                name=f"W{n}",
+                args=(n, usuario, senha, usar_sessao, opcoes or {}, fila, writer, f, lock_saida, contagem),
+                daemon=True,
+            )
+            for n in range(1, n_workers + 1)
+        ]
+        for t in workers:
+            t.start()
+        
+        for job in ler_jobs_lote(entrada):
+            if not enfileirar(job):
+                log_error("Nenhum worker ativo - lote interrompido")
+                break
+        
+        for _ in workers:
+            enfileirar(None)
+        
+        for t in workers:
+            t.join()
+    
+    _resumo_lote(contagem, inicio)
+    return contagem
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Automação Salesforce")
+    parser.add_argument('--lote', metavar='ARQUIVO',
+                        help="CSV/TXT de CPFs para buscar sem interação")
+    parser.add_argument('--saida', metavar='ARQUIVO',
+                        help="CSV de resultados do lote (padrão: resultado_lote_<data>.csv)")
+    parser.add_argument('--workers', type=int, default=1, metavar='N',
+                        help="Navegadores em paralelo para o lote (padrão: 1)")
+    parser.add_argument('--sem-cache', action='store_true',
+                        help="Ignora o cache local CPF -> conta e sempre faz a busca")
+    parser.add_argument('--sessao', action='store_true',
+                        help="Reaproveita a sessão salva e pula login/MFA enquanto ela valer")
+    parser.add_argument('--max-abas', type=int, default=None, metavar='N',
+                        help=f"Abas abertas pela automação mantidas após uma busca (padrão: {MAX_ABAS})")
+    parser.add_argument('--fluxos', metavar='ARQUIVO',
+                        help="Definições dos fluxos de caso (padrão: fluxos_casos.json)")
+    parser.add_argument('--perfil', action='store_true',
+                        help="Conta e cronometra os comandos do WebDriver e resume por job")
+    parser.add_argument('--capturar-dom', nargs='?', const='capturas_dom', metavar='PASTA',
+                        help="Grava o DOM mascarado a cada passo para o replay offline (padrão: capturas_dom)")
+    parser.add_argument('--trace', metavar='ARQUIVO',
+                        help="Grava as etapas de cada job em JSON do Chrome trace (chrome://tracing, Perfetto)")
+    parser.add_argument('--headless', action='store_true',
+                        help="Edge sem janela e sem imagens, fontes e telemetria (com --lote ou --comparar-bloqueio)")
+    parser.add_argument('--bloquear', action='append', default=[], metavar='PADRAO',
+                        help="Padrão de URL a mais para o bloqueio do --headless ('*' é curinga; repetível)")
+    parser.add_argument('--sem-bloqueio', action='store_true',
+                        help="Com --headless, não bloqueia nenhuma URL")
+    parser.add_argument('--comparar-bloqueio', action='store_true',
+                        help="Após o login, mede bytes e tempo de carga das páginas sem e com o bloqueio e sai "
+                             "(com --headless, no perfil dos lotes)")
+    args = parser.parse_args(argv)
+    
+    if args.workers < 1:
+        parser.error("--workers deve ser pelo menos 1")
+    
+    if args.sem_bloqueio and (args.bloquear or args.comparar_bloqueio):
+        parser.error("--sem-bloqueio não combina com --bloquear nem com --comparar-bloqueio")
+    
+    if args.comparar_bloqueio and args.lote:
+        parser.error("--comparar-bloqueio é uma medição avulsa: não combina com --lote")
+    
+    # Sem janela não há como o operador responder as perguntas do modo
+    # interativo; a comparação do bloqueio não pergunta nada
+    if args.headless and not (args.lote or args.comparar_bloqueio):
+        parser.error("--headless é para lotes sem operador: use com --lote ou --comparar-bloqueio")
+    
+    if args.lote and not args.saida:
+        args.saida = f"resultado_lote_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    
+    return args
+
 # PARTE MODIFICADA DO MAIN():
-def main():
+def main(argv=None):
+    global USAR_CACHE_CPF, ARQUIVO_FLUXOS, MAX_ABAS, PERFIL_DRIVER, ARQUIVO_TRACE, PASTA_CAPTURA_DOM
+    args = parse_args(argv)
+    
+    if args.sem_cache:
+        USAR_CACHE_CPF = False
+    
+    if args.perfil:
+        PERFIL_DRIVER = True
+    
+    if args.trace:
+        ARQUIVO_TRACE = args.trace
+    
+    if args.capturar_dom:
+        PASTA_CAPTURA_DOM = args.capturar_dom
+    
+    bloqueio = [] if args.sem_bloqueio else BLOQUEIO_HEADLESS + args.bloquear
+    opcoes = opcoes_driver(args.headless, bloqueio)
+    
+    if args.max_abas is not None:
+        MAX_ABAS = max(0, args.max_abas)
+    
+    if args.fluxos:
+        ARQUIVO_FLUXOS = args.fluxos
+    try:
+        carregar_fluxos()
+    except (OSError, ValueError) as e:
+        log_error(f"Definições de fluxo inválidas: {e}")
+        return
+    
+    if args.lote and not os.path.isfile(args.lote):
+        log_error(f"Arquivo de lote não encontrado: {args.lote}")
+        return
+    
     print("\n" + "="*40)
     print("   AUTOMAÇÃO SALESFORCE")
     print("="*40 + "\n")
@@ -2496,135 +4618,112 @@ def main():
     SENHA = 'saymonGG00!'
     
     try:
+        if args.lote and args.workers > 1:
+            executar_pool(USUARIO, SENHA, args.lote, args.saida, args.workers, args.sessao, opcoes)
+            return
+        
         log_info("\nIniciando navegador Edge...")
-        driver = criar_driver()
+        driver = criar_driver(**opcoes)
         
         log_info("\nRealizando login no Salesforce...")
-        if logar_salesforce_robusto(driver, USUARIO, SENHA):
-            if verificar_login_salesforce(driver):
-                log_ok("Pronto para automação!")
-            else:
-                log_error("Verificação de login falhou")
-                return
-        else:
-            log_error("Login falhou após todas as tentativas")
+        if not garantir_login(driver, USUARIO, SENHA, args.sessao):
+            return
+        log_ok("Pronto para automação!")
+        
+        if args.comparar_bloqueio:
+            origem = "{0.scheme}://{0.netloc}".format(urlsplit(driver.current_url))
+            if not args.headless:
+                log_warn("Comparação no perfil com janela - use --headless para medir o perfil dos lotes")
+            comparar_bloqueio(driver, [origem + caminho for caminho in PAGINAS_COMPARACAO_BLOQUEIO], bloqueio)
+            return
+        
+        if args.lote:
+            processar_lote(driver, args.lote, args.saida)
             return
-        log_ok(f"Login realizado com sucesso")
         
         # Busca inicial do CPF
         log_info("\n>>> BUSCA INICIAL DE CLIENTE <<<")
+        zerar_perfil(driver)
+        antes = chaves_abas(driver)
         if not buscar_novo_cpf(driver):
             log_info("Nenhum cliente carregado. Encerrando...")
             return
+        coletar_abas(driver, antes, recursos_do_driver(driver)['cliente_url'], MAX_ABAS)
+        resumo_perfil(driver, "busca inicial")
         
         # Loop principal do menu
         while True:
-            escolha = menu_principal()
+            fluxos = carregar_fluxos()
+            escolha = menu_principal(fluxos)
             
-            if escolha == "Registrar informação":
-                print("\n" + "="*70)
-                print("   INICIANDO REGISTRO DE INFORMAÇÃO")
-                print("="*70 + "\n")
-                
-                # VERIFICAR SE ESTÁ NA PÁGINA DO CLIENTE ANTES DE COMEÇAR
-                if not verificar_se_esta_na_pagina_cliente(driver):
-                    log_warn("\n⚠️ Você não está na página do cliente!")
-                    log_info("Tentando voltar automaticamente...")
-                    
-                    if not voltar_para_cliente(driver, forcar_retorno=True):
-                        log_error("Não conseguiu voltar automaticamente.")
-                        input("\n👉 Por favor, NAVEGUE MANUALMENTE para a aba do cliente e pressione Enter...")
-                        
-                        # Verificar novamente após instrução manual
-                        if not verificar_se_esta_na_pagina_cliente(driver):
-                            log_error("Ainda não está na página do cliente. Pulando esta ação.")
-                            continue
-                    
-                    log_ok("✓ Agora está na página do cliente!")
-                    time.sleep(0.5)
-                
-                if registrar_informacao_automatico(driver):
-                    log_ok("\nProcesso concluído com sucesso!")
-                else:
-                    log_warn("\nProcesso foi concluído, porém retornou algum erro.")
-                
-                continuar = input("\nDeseja registrar outro caso? (s/n): ").strip().lower()
-                if continuar == 's':
-                    log_info("\nPreparando para criar novo caso...")
-                    
-                    # FORÇAR retorno para o cliente
-                    if not voltar_para_cliente(driver, forcar_retorno=True):
-                        log_warn("Não conseguiu voltar automaticamente.")
-                        input("\n👉 Navegue manualmente para a aba do cliente e pressione Enter...")
-                    else:
-                        log_ok("✓ Pronto para novo caso!")
-                    
-                    time.sleep(0.5)
-                    
-            elif escolha == "Registrar Conta Bemol":
-                escolha_conta = questionary.select(
-                    "Escolha uma opção abaixo: ",
-                    choices=[
-                        {"name": "Atualização de número de telefone", "value": "atualizacao_telefone"},
-                        {"name": "Voltar", "value": "voltar"},
-                    ]
-                ).ask()
-                
-                if escolha_conta == "atualizacao_telefone":
-                    print("\n" + "="*70)
-                    print("   INICIANDO REGISTRO DE CONTA BEMOL")
-                    print("="*70 + "\n")
-                    
-                    # VERIFICAR SE ESTÁ NA PÁGINA DO CLIENTE
-                    if not verificar_se_esta_na_pagina_cliente(driver):
-                        log_warn("\n⚠️ Você não está na página do cliente!")
-                        log_info("Tentando voltar automaticamente...")
-                        
-                        if not voltar_para_cliente(driver, forcar_retorno=True):
-                            log_error("Não conseguiu voltar automaticamente.")
-                            input("\n👉 Por favor, NAVEGUE MANUALMENTE para a aba do cliente e pressione Enter...")
-                            
-                            if not verificar_se_esta_na_pagina_cliente(driver):
-                                log_error("Ainda não está na página do cliente. Pulando esta ação.")
-                                continue
-                        
-                        log_ok("✓ Agora está na página do cliente!")
-                        time.sleep(0.5)
-                    
-                    if registrar_conta_bemol_automatico(driver):
-                        log_ok("\nProcesso de Conta Bemol concluído com sucesso!")
-                    else:
-                        log_warn("\nProcesso de Conta Bemol foi concluído, porém retornou algum erro.")
-                    
-                    continuar = input("\nDeseja registrar outra Conta Bemol? (s/n): ").strip().lower()
-                    if continuar == 's':
-                        log_info("\nPreparando para criar nova Conta Bemol...")
-                        
-                        if not voltar_para_cliente(driver, forcar_retorno=True):
-                            log_warn("Não conseguiu voltar automaticamente.")
-                            input("\n👉 Navegue manualmente para a aba do cliente e pressione Enter...")
-                        else:
-                            log_ok("✓ Pronto para nova Conta Bemol!")
-                        
-                        time.sleep(0.5)
-                else:
-                    continue
-                    
-            elif escolha == "Buscar outro CPF":
+            if escolha in (None, "Sair"):
+                log_info("Encerrando automação...")
+                break
+            
+            if escolha == "Buscar outro CPF":
                 print("\n" + "="*70)
                 print("   BUSCAR NOVO CLIENTE")
                 print("="*70 + "\n")
                 
+                zerar_perfil(driver)
+                antes = chaves_abas(driver)
                 if buscar_novo_cpf(driver):
+                    coletar_abas(driver, antes, recursos_do_driver(driver)['cliente_url'], MAX_ABAS)
                     log_ok("\n✓ Novo cliente carregado com sucesso!")
                     log_info("Retornando ao menu principal...")
                 else:
                     log_warn("\nBusca cancelada ou sem sucesso.")
                     log_info("Retornando ao menu principal...")
+                resumo_perfil(driver, "busca")
+                continue
+            
+            chave = escolher_fluxo(fluxos, escolha)
+            if not chave:
+                continue
+            nome_fluxo = fluxos[chave]['nome']
+            
+            print("\n" + "="*70)
+            print(f"   INICIANDO {nome_fluxo.upper()}")
+            print("="*70 + "\n")
+            
+            # VERIFICAR SE ESTÁ NA PÁGINA DO CLIENTE ANTES DE COMEÇAR
+            if not verificar_se_esta_na_pagina_cliente(driver):
+                log_warn("\n⚠️ Você não está na página do cliente!")
+                log_info("Tentando voltar automaticamente...")
                 
-            else:  # Sair
-                log_info("Encerrando automação...")
-                break
+                if not voltar_para_cliente(driver, forcar_retorno=True):
+                    log_error("Não conseguiu voltar automaticamente.")
+                    input("\n👉 Por favor, NAVEGUE MANUALMENTE para a aba do cliente e pressione Enter...")
+                    
+                    # Verificar novamente após instrução manual
+                    if not verificar_se_esta_na_pagina_cliente(driver):
+                        log_error("Ainda não está na página do cliente. Pulando esta ação.")
+                        continue
+                
+                log_ok("✓ Agora está na página do cliente!")
+                time.sleep(0.5)
+            
+            zerar_perfil(driver)
+            antes = chaves_abas(driver)
+            if executar_fluxo(driver, chave):
+                log_ok(f"\n{nome_fluxo} concluído com sucesso!")
+            else:
+                log_warn(f"\n{nome_fluxo} foi concluído, porém retornou algum erro.")
+            coletar_abas(driver, antes, recursos_do_driver(driver)['cliente_url'])
+            resumo_perfil(driver, nome_fluxo)
+            
+            continuar = input("\nDeseja registrar outro caso? (s/n): ").strip().lower()
+            if continuar == 's':
+                log_info("\nPreparando para criar novo caso...")
+                
+                # FORÇAR retorno para o cliente
+                if not voltar_para_cliente(driver, forcar_retorno=True):
+                    log_warn("Não conseguiu voltar automaticamente.")
+                    input("\n👉 Navegue manualmente para a aba do cliente e pressione Enter...")
+                else:
+                    log_ok("✓ Pronto para novo caso!")
+                
+                time.sleep(0.5)
         
         log_info("\nAutomação finalizada.")
         input("Pressione Enter para fechar o navegador e encerrar o script...")
@@ -2639,6 +4738,8 @@ def main():
         traceback.print_exc()
         print("="*70)
     finally:
+        resumo_esperas()
+        gravar_trace()
         log_info("\nLimpando recursos...")
         cleanup_all_resources()
         log_ok("Limpeza concluída!")